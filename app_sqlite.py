@@ -3,116 +3,268 @@ Flask Backend - SQLite
 Basitleştirilmiş Demo
 """
 
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, send_from_directory, g
 from flask_cors import CORS
 import sqlite3
-from datetime import datetime
-import joblib
+from datetime import datetime, timedelta, timezone
 import numpy as np
 import os
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-import requests
 import json
+import multiprocessing
+import threading
+import time
+from collections import deque
+
+import container_stats
+import db_pool
+import event_bus
+import feature_pipeline
+import fill_forecast
+import fleet_sim
+import fleet_sweep
+import http_utils
+import leaderboard as leaderboard_module
+import map_codec
+import metrics
+import model_registry
+import prediction_cache as prediction_cache_module
+import report_queue
+import retrain_worker
+import route_plan
+import route_solver
+import routing_backend
+import spatial_index
+import ttl_cache
 
 app = Flask(__name__, static_folder='public', static_url_path='')
 CORS(app)
 
 DB_PATH = 'nilufer_waste.db'
-MODEL_PATH = 'models/fill_predictor.pkl'
+MODEL_DIR = 'models'
+MODEL_HISTORY_LIMIT = 5
+
+# Tüm endpoint'ler ve arka plan işleri bu havuzdan bağlantı alır (WAL + ayarlı pragmalar)
+db = db_pool.ConnectionPool(DB_PATH)
+
+def get_db():
+    """İstek boyunca tek havuz bağlantısı; istek bitince havuza döner"""
+    if 'db_conn' not in g:
+        g.db_conn = db.acquire()
+    return g.db_conn
+
+@app.teardown_appcontext
+def release_db(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db.release(conn)
+
+# ============== METRICS ==============
+# Prometheus biçiminde /metrics; SLOW_REQUEST_MS verilirse yavaş istekler sorgu planlarıyla kaydedilir
+SLOW_REQUEST_MS = float(os.environ['SLOW_REQUEST_MS']) if os.environ.get('SLOW_REQUEST_MS') else None
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 50))
+SLOW_LOG_SIZE = 100
+SLOW_LOG_STATEMENTS = 5
+
+REQUEST_SECONDS = metrics.Histogram(
+    'http_request_duration_seconds', 'Endpoint yanıt süresi (akışlarda ilk bayta kadar)', ['endpoint', 'method', 'status']
+)
+REQUEST_SQL_STATEMENTS = metrics.Histogram(
+    'http_request_sql_statements', 'İstek başına SQL ifadesi sayısı', ['endpoint'], buckets=metrics.COUNT_BUCKETS
+)
+REQUEST_SQL_SECONDS = metrics.Histogram('http_request_sql_duration_seconds', 'İstek başına toplam SQL süresi (çalıştırma + okuma)', ['endpoint'])
+INFERENCE_SECONDS = metrics.Histogram('model_inference_duration_seconds', 'Doluluk modeli tahmin süresi (toplu çağrı)')
+INFERENCE_ROWS = metrics.Counter('model_inference_rows_total', 'Modelle skorlanan konteyner sayısı')
+RETRAIN_SECONDS = metrics.Histogram(
+    'model_retrain_duration_seconds', 'Yeniden eğitim süresi', ['result'],
+    buckets=(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+slow_requests = deque(maxlen=SLOW_LOG_SIZE)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_trace_token = db_pool.start_trace(SLOW_QUERY_MS / 1000 if SLOW_REQUEST_MS is not None else None)
+
+@app.after_request
+def record_request_metrics(response):
+    """Süre ve SQL sayaçlarını endpoint kalıbına göre kaydet (sıkıştırma dahil: en son çalışır)"""
+    from flask import request
+    
+    token = g.pop('sql_trace_token', None)
+    if token is None:
+        return response
+    trace = db_pool.end_trace(token)
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.labels(endpoint, request.method, response.status_code).observe(elapsed)
+    REQUEST_SQL_STATEMENTS.labels(endpoint).observe(trace.queries)
+    REQUEST_SQL_SECONDS.labels(endpoint).observe(trace.seconds)
+    
+    if SLOW_REQUEST_MS is not None and (elapsed * 1000 >= SLOW_REQUEST_MS or trace.slow):
+        log_slow_request(request, response, endpoint, elapsed, trace)
+    return response
+
+def log_slow_request(request, response, endpoint, elapsed, trace):
+    """Yavaş isteği ve en yavaş SQL ifadelerinin sorgu planlarını kaydet"""
+    statements = []
+    for sql, parameters, seconds in sorted(trace.slow, key=lambda item: -item[2])[:SLOW_LOG_STATEMENTS]:
+        try:
+            plan = db_pool.explain(get_db(), sql, parameters)
+        except sqlite3.Error as e:
+            plan = [f'plan alınamadı: {e}']
+        statements.append({'sql': ' '.join(sql.split())[:1000], 'ms': round(seconds * 1000, 2), 'plan': plan})
+    
+    entry = {
+        'at': datetime.now().isoformat(),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'ms': round(elapsed * 1000, 2),
+        'sql_statements': trace.queries,
+        'sql_ms': round(trace.seconds * 1000, 2),
+        'slow_statements': statements
+    }
+    slow_requests.append(entry)
+    print(f"⚠️ Yavaş istek: {entry['method']} {entry['path']} {entry['ms']} ms "
+          f"({entry['sql_statements']} SQL, {entry['sql_ms']} ms)")
+    for statement in statements:
+        print(f"   {statement['ms']} ms: {statement['sql'][:200]}")
+        for detail in statement['plan']:
+            print(f"      {detail}")
 
-# Model yükle
-model_data = None
+# Sorguların ihtiyaç duyduğu ek indeksler (mevcut veritabanlarına da uygulanır)
+SCHEMA_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_reports_submitted ON citizen_reports(submitted_at)",
+    "CREATE INDEX IF NOT EXISTS idx_events_date ON collection_events(collection_date)",
+    "CREATE INDEX IF NOT EXISTS idx_events_container ON collection_events(container_id)",
+    "CREATE INDEX IF NOT EXISTS idx_predictions_container ON predictions(container_id, predicted_at)",
+    # Liderlik tablosu yüklemesi: sadece bildirim yapmış vatandaşlar, sıralı
+    """CREATE INDEX IF NOT EXISTS idx_users_leaderboard ON users(trust_score DESC, total_reports DESC)
+       WHERE role = 'citizen' AND total_reports > 0"""
+]
+
+def ensure_indexes():
+    """Eksik indeksleri, konteyner geçmiş istatistikleri tablosunu ve yeni sütunları oluştur"""
+    try:
+        with db.connection() as conn:
+            for statement in SCHEMA_INDEXES:
+                conn.execute(statement)
+            if container_stats.ensure_stats_schema(conn):
+                print("✓ container_stats tablosu olaylardan kuruldu")
+            fleet_sim.ensure_sim_schema(conn)
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ İndeks oluşturulamadı: {e}")
+
+ensure_indexes()
+
+# Dashboard toplamları: kısa TTL, yazma yollarında geçersizleştirilir
+STATS_CACHE_TTL = 5
+REFERENCE_CACHE_TTL = 60  # Filo ve tonaj sadece yükleyici ile değişir
+stats_cache = ttl_cache.TTLCache(default_ttl=STATS_CACHE_TTL)
+
+def invalidate_dashboard():
+    """Bildirim/toplama yazmalarından sonra dashboard önbelleğini boşalt"""
+    stats_cache.invalidate('dashboard_stats')
+
+# Konteyner konumları için bellek içi mekânsal indeks (yazmalarda artımlı güncellenir)
+container_index = spatial_index.ContainerIndex()
 try:
-    model_data = joblib.load(MODEL_PATH)
-    print(f"✓ Model yüklendi")
-except:
-    print(f"⚠️ Model bulunamadı")
+    with db.connection() as conn:
+        print(f"✓ Mekânsal indeks: {container_index.load(conn)} konteyner")
+except sqlite3.Error as e:
+    print(f"⚠️ Mekânsal indeks kurulamadı: {e}")
+
+# Canlı akış: yazma yolları değişiklikleri yayınlar, /api/stream SSE istemcilerine dağıtılır
+events = event_bus.EventBus()
+
+# Vatandaş liderlik tablosu: açılışta yüklenir, bildirim commit'lerinde artımlı güncellenir
+citizen_board = leaderboard_module.Leaderboard()
+try:
+    with db.connection() as conn:
+        print(f"✓ Liderlik tablosu: {citizen_board.load(conn)} vatandaş")
+except sqlite3.Error as e:
+    print(f"⚠️ Liderlik tablosu kurulamadı: {e}")
+
+NEARBY_MAX_K = 500
+BBOX_MAX_RESULTS = 20000
+
+# Model kayıt defteri: aktif sürüm ilk tahminde yüklenir, manifest değişince yenilenir
+registry = model_registry.ModelRegistry(MODEL_DIR, history_limit=MODEL_HISTORY_LIMIT)
 
 # Model eğitim sayacı (her 10 doğru bildirimde bir eğit)
 training_counter = {'verified_count': 0, 'threshold': 10}
 
 def retrain_model():
     """Model'i güncel verilerle yeniden eğit"""
-    global model_data
+    started = time.perf_counter()
+    result = _retrain_model()
+    RETRAIN_SECONDS.labels(result).observe(time.perf_counter() - started)
+    return result == 'success'
+
+def _retrain_model():
+    # sklearn sadece eğitimde gerekir; servis derlenmiş motorla çalışır
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
     
     try:
-        conn = sqlite3.connect(DB_PATH)
-        
-        # Eğitim verilerini hazırla - hem eski hem yeni veriler
-        query = """
-        SELECT 
-            c.container_id,
-            c.container_type,
-            c.capacity_liters,
-            c.current_fill_level,
-            n.population_density,
-            CASE 
-                WHEN c.current_fill_level >= 0.75 THEN 1 
-                ELSE 0 
-            END as is_full
-        FROM containers c
-        LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
-        WHERE c.status = 'active'
-        """
-        
-        df = pd.read_sql_query(query, conn)
+        # Eğitim verilerini hazırla - servis ile aynı özellik hattı
+        with db.connection() as conn:
+            df = feature_pipeline.fetch_training_frame(conn)
         
         if len(df) < 50:  # Minimum veri kontrolü
-            conn.close()
-            return False
-        
-        # Feature engineering
-        df['type_glass'] = (df['container_type'] == 'Cam').astype(int)
-        df['type_paper'] = (df['container_type'] == 'Kağıt').astype(int)
-        df['type_plastic'] = (df['container_type'] == 'Plastik').astype(int)
-        df['type_metal'] = (df['container_type'] == 'Metal').astype(int)
-        df['type_organic'] = (df['container_type'] == 'Organik').astype(int)
-        df['type_general'] = (df['container_type'] == 'Genel').astype(int)
-        
-        df['capacity_large'] = (df['capacity_liters'] >= 1100).astype(int)
-        df['capacity_medium'] = ((df['capacity_liters'] >= 800) & (df['capacity_liters'] < 1100)).astype(int)
-        df['density_high'] = (df['population_density'] > 10000).astype(int)
+            return 'skipped'
         
-        # Features ve target
-        feature_cols = ['container_id', 'capacity_liters', 'population_density',
-                       'type_glass', 'type_paper', 'type_plastic', 'type_metal', 
-                       'type_organic', 'type_general', 'capacity_large', 
-                       'capacity_medium', 'density_high', 'current_fill_level']
-        
-        X = df[feature_cols].fillna(0)
-        y = df['is_full']
+        X = feature_pipeline.build_feature_matrix(df)
+        y = feature_pipeline.build_labels(df)
         
         # Train-test split
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
         # Model eğit
-        model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
+        model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10, class_weight='balanced')
         model.fit(X_train, y_train)
         
         # Accuracy hesapla
         train_accuracy = model.score(X_train, y_train)
         test_accuracy = model.score(X_test, y_test)
         
-        # Model'i kaydet
-        model_data = {
-            'model': model,
-            'feature_columns': feature_cols,
+        # Yeni sürüm dosyası + manifest; istekler bir sonraki active() çağrısında yeni modeli görür
+        version = registry.publish(model, metrics={
             'train_accuracy': train_accuracy,
-            'test_accuracy': test_accuracy,
-            'trained_at': datetime.now().isoformat()
-        }
+            'test_accuracy': test_accuracy
+        }, source='retrain', validation_X=X_test)
         
-        joblib.dump(model_data, MODEL_PATH)
-        conn.close()
-        
-        print(f"✅ Model yeniden eğitildi! Train: {train_accuracy:.3f}, Test: {test_accuracy:.3f}")
-        return True
+        print(f"✅ Model yeniden eğitildi ({version})! Train: {train_accuracy:.3f}, Test: {test_accuracy:.3f}")
+        return 'success'
         
     except Exception as e:
         print(f"❌ Model eğitim hatası: {e}")
-        return False
+        return 'error'
+
+def _reset_training_counter():
+    training_counter['verified_count'] = 0
+
+# Yeniden eğitim arka planda, birleştirmeli kuyrukla çalışır
+retrainer = retrain_worker.RetrainWorker(retrain_model, on_success=_reset_training_counter)
+
+@app.after_request
+def compress_response(response):
+    """JSON yanıtlarını istemcinin desteklediği kodlamayla (br/gzip) sıkıştır"""
+    from flask import request
+    
+    return http_utils.compress_response(response, request.headers.get('Accept-Encoding'))
+
+@app.route('/api/db/stats')
+def db_stats():
+    """Bağlantı havuzu ve önbellek isabet oranları, bekleme süreleri"""
+    return jsonify({
+        'pool': db.stats(),
+        'cache': stats_cache.stats(),
+        'predictions': {**prediction_cache.stats(), 'writer': prediction_writer.stats, 'write_pending': prediction_writer.pending()},
+        'stream': {**events.stats(), 'watcher': dataset_watcher.stats}
+    })
 
 @app.route('/')
 def index():
@@ -125,58 +277,44 @@ def admin():
 @app.route('/api/dashboard/stats')
 def dashboard_stats():
     """Dashboard istatistikleri - Gerçek veritabanı verileri"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Toplam konteyner
-    cursor.execute("SELECT COUNT(*) FROM containers WHERE status='active'")
-    total = cursor.fetchone()[0]
-    
-    # Dolu konteynerler
-    cursor.execute("SELECT COUNT(*) FROM containers WHERE current_fill_level >= 0.75")
-    full = cursor.fetchone()[0]
-    
-    # Toplam araç
-    cursor.execute("SELECT COUNT(*) FROM vehicles")
-    vehicles = cursor.fetchone()[0]
-    
-    # Mahalleler
-    cursor.execute("SELECT COUNT(*) FROM neighborhoods")
-    neighborhoods = cursor.fetchone()[0]
-    
-    # Bugünkü bildirimler (gerçek veri)
-    cursor.execute("""
-        SELECT COUNT(*) FROM citizen_reports 
-        WHERE DATE(submitted_at) = DATE('now')
-    """)
-    today_reports = cursor.fetchone()[0]
-    
-    # Bugünkü toplama olayları (gerçek veri)
-    cursor.execute("""
-        SELECT COUNT(*) FROM collection_events 
-        WHERE DATE(collection_date) = DATE('now')
-    """)
-    today_collections = cursor.fetchone()[0]
+    return jsonify(stats_cache.get_or_compute('dashboard_stats', _compute_dashboard_stats))
+
+def _compute_dashboard_stats(conn=None):
+    """Tüm dashboard toplamlarını tek sorguda, her tabloyu bir kez tarayarak hesapla"""
+    cursor = (conn or get_db()).cursor()
     
-    # Bu ay tonaj (gerçek veri - tonnage_statistics tablosundan)
+    # Bugünün sayımları ayrı aralık sorguları: submitted_at / collection_date indeksleriyle
+    # sadece bugünün satırları okunur (tam tarama içindeki SUM indeks kullanamaz)
     cursor.execute("""
-        SELECT total_tonnage FROM tonnage_statistics 
-        ORDER BY rowid DESC LIMIT 1
+        SELECT
+            COALESCE(c.total, 0),
+            COALESCE(c.full, 0),
+            v.total,
+            nb.total,
+            rt.today,
+            e.today,
+            t.total_tonnage,
+            r.total,
+            COALESCE(r.verified, 0)
+        FROM
+            (SELECT SUM(status = 'active') as total,
+                    SUM(current_fill_level >= 0.75) as full
+             FROM containers) c,
+            (SELECT COUNT(*) as total FROM vehicles) v,
+            (SELECT COUNT(*) as total FROM neighborhoods) nb,
+            (SELECT COUNT(*) as total,
+                    SUM(is_verified = 1) as verified
+             FROM citizen_reports) r,
+            (SELECT COUNT(*) as today FROM citizen_reports
+             WHERE submitted_at >= DATE('now') AND submitted_at < DATE('now', '+1 day')) rt,
+            (SELECT COUNT(*) as today FROM collection_events
+             WHERE collection_date >= DATE('now') AND collection_date < DATE('now', '+1 day')) e
+        LEFT JOIN (SELECT total_tonnage FROM tonnage_statistics ORDER BY rowid DESC LIMIT 1) t ON 1 = 1
     """)
-    tonnage_row = cursor.fetchone()
-    month_tonnage = tonnage_row[0] if tonnage_row else 0
-    
-    # Toplam bildiri sayısı
-    cursor.execute("SELECT COUNT(*) FROM citizen_reports")
-    total_reports = cursor.fetchone()[0]
-    
-    # Doğrulanmış bildiri sayısı
-    cursor.execute("SELECT COUNT(*) FROM citizen_reports WHERE is_verified = 1")
-    verified_reports = cursor.fetchone()[0]
-    
-    conn.close()
+    (total, full, vehicles, neighborhoods, today_reports, today_collections,
+     month_tonnage, total_reports, verified_reports) = cursor.fetchone()
     
-    return jsonify({
+    return {
         'total_containers': total,
         'full_containers': full,
         'fill_rate': full / total if total > 0 else 0,
@@ -184,146 +322,293 @@ def dashboard_stats():
         'neighborhoods': neighborhoods,
         'today_reports': today_reports,
         'today_collections': today_collections,
-        'month_tonnage': float(month_tonnage),
+        'month_tonnage': float(month_tonnage or 0),
         'total_reports': total_reports,
         'verified_reports': verified_reports,
         'verification_rate': verified_reports / total_reports if total_reports > 0 else 0
-    })
+    }
 
 @app.route('/api/leaderboard')
 def leaderboard():
-    """Kullanıcı liderlik tablosu"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT name, trust_score, total_reports
-        FROM users
-        WHERE role = 'citizen' AND total_reports > 0
-        ORDER BY trust_score DESC, total_reports DESC
-        LIMIT 10
-    """)
-    
-    users = cursor.fetchall()
-    conn.close()
-    
-    return jsonify({
-        'leaderboard': [
-            {
-                'rank': idx + 1,
-                'name': u[0],
-                'trust_score': float(u[1]),
-                'total_reports': u[2]
-            }
-            for idx, u in enumerate(users)
-        ]
-    })
+    """Kullanıcı liderlik tablosu (bellekten, bildirim yazmalarında güncellenir)"""
+    return jsonify({'leaderboard': list(citizen_board.top())})
+
+# Tahmin önbelleği: (konteyner, model sürümü) anahtarlı; bildirim yazmaları ve model
+# değişimi geçersizleştirir. Hesaplanan skorlar predictions tablosuna toplu yazılır;
+# tabloda sadece aktif sürümün son PREDICTION_RETENTION_DAYS günü tutulur.
+prediction_cache = prediction_cache_module.PredictionCache()
+prediction_writer = prediction_cache_module.PredictionWriter(db.connection)
+
+def score_containers(conn, current_model, container_ids):
+    """Konteyner id listesi için tahminler ({id: kayıt}); sadece önbellekte olmayanlar hesaplanır"""
+    version = current_model['version']
+    found, missing = prediction_cache.get_many(container_ids, version)
+    if not missing:
+        return found
+    
+    generations = prediction_cache.snapshot(missing)
+    # Değişken limitine takılmamak için id listesi tek JSON parametresi olarak gönderilir
+    df = feature_pipeline.fetch_feature_frame(
+        conn,
+        "WHERE c.container_id IN (SELECT value FROM json_each(?)) ORDER BY c.container_id",
+        (json.dumps(missing),)
+    )
+    if df.empty:
+        return found
+    
+    features = feature_pipeline.build_feature_matrix(df)
+    with INFERENCE_SECONDS.time():
+        probabilities = current_model['model'].predict_proba(features)
+    INFERENCE_ROWS.inc(len(features))
+    fill_probabilities = probabilities[:, 1]
+    confidences = probabilities.max(axis=1)
+    predicted_at = datetime.now().isoformat()
+    
+    computed = {
+        int(cid): {
+            'container_id': int(cid),
+            'neighborhood': nh,
+            'container_type': ctype,
+            'capacity_liters': int(capacity),
+            'current_fill_level': float(fill),
+            'fill_probability': float(p),
+            'is_full': bool(p >= 0.75),
+            'confidence': float(conf),
+            'latitude': float(lat),
+            'longitude': float(lng),
+            'predicted_at': predicted_at
+        }
+        for cid, nh, ctype, capacity, fill, lat, lng, p, conf in zip(
+            df['container_id'], df['neighborhood_name'], df['container_type'], df['capacity_liters'],
+            df['current_fill_level'], df['latitude'], df['longitude'], fill_probabilities, confidences
+        )
+    }
+    prediction_cache.put_many(computed, version, generations)
+    prediction_writer.submit(
+        (cid, version, item['fill_probability'], item['confidence'], int(item['is_full']))
+        for cid, item in computed.items()
+    )
+    found.update(computed)
+    return found
+
+BATCH_PREDICTION_FIELDS = (
+    'container_id', 'neighborhood', 'current_fill_level', 'fill_probability',
+    'is_full', 'confidence', 'latitude', 'longitude'
+)
 
 @app.route('/api/predict/<int:container_id>')
 def predict_container(container_id):
-    """Tek konteyner tahmini - Gerçek ML modeli ile"""
-    if not model_data:
+    """Tek konteyner tahmini - Gerçek ML modeli ile (önbellekli)"""
+    current_model = registry.active()  # Arka plan eğitimi modeli değiştirse de istek boyunca sabit
+    if not current_model:
         return jsonify({'error': 'Model yüklü değil'}), 503
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Konteyner bilgilerini ve tarihsel verileri çek
-    cursor.execute("""
-        SELECT 
-            c.container_id,
-            c.container_type,
-            c.capacity_liters,
-            c.last_collection_date,
-            c.current_fill_level,
-            c.latitude,
-            c.longitude,
-            n.neighborhood_name,
-            n.population,
-            n.population_density,
-            n.area_km2
-        FROM containers c
-        LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
-        WHERE c.container_id = ?
-    """, (container_id,))
-    
-    row = cursor.fetchone()
-    
-    if not row:
-        conn.close()
+    item = score_containers(get_db(), current_model, [container_id]).get(container_id)
+    if item is None:
         return jsonify({'error': 'Konteyner bulunamadı'}), 404
     
-    # Tarihsel toplama verilerini çek (gerçek veri)
+    return jsonify({
+        **{k: v for k, v in item.items() if k != 'predicted_at'},
+        'model_version': current_model['version'],
+        'prediction_timestamp': item['predicted_at']
+    })
+
+@app.route('/api/predict/batch', methods=['GET', 'POST'])
+def predict_batch():
+    """Toplu konteyner tahmini - önbellekte olmayanlar tek sorgu, tek predict_proba çağrısı
+
+    POST {"container_ids": [...]} veya GET ?ids=1,2,3 verilen konteynerleri,
+    id verilmezse tüm aktif konteynerleri skorlar.
+    """
+    from flask import request
+
+    current_model = registry.active()
+    if not current_model:
+        return jsonify({'error': 'Model yüklü değil'}), 503
+
+    if request.method == 'POST':
+        container_ids = (request.json or {}).get('container_ids')
+    else:
+        ids_param = request.args.get('ids', '').strip()
+        container_ids = ids_param.split(',') if ids_param else None
+
+    try:
+        container_ids = [int(cid) for cid in container_ids] if container_ids else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Geçersiz konteyner id listesi'}), 400
+
+    conn = get_db()
+    if container_ids is None:
+        container_ids = [row[0] for row in conn.execute(
+            "SELECT container_id FROM containers WHERE status = 'active' ORDER BY container_id"
+        )]
+    else:
+        container_ids = sorted(set(container_ids))
+
+    scored = score_containers(conn, current_model, container_ids)
+    predictions = [
+        {field: scored[cid][field] for field in BATCH_PREDICTION_FIELDS}
+        for cid in container_ids if cid in scored
+    ]
+
+    return jsonify({
+        'count': len(predictions),
+        'model_version': current_model['version'],
+        'prediction_timestamp': datetime.now().isoformat(),
+        'predictions': predictions
+    })
+
+@app.route('/api/predict/history/<int:container_id>')
+def prediction_history(container_id):
+    """Konteynerin kayıtlı tahmin geçmişi (sapma izleme için), yeniden eskiye"""
+    from flask import request
+    
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    cursor = get_db().cursor()
     cursor.execute("""
-        SELECT 
-            AVG(tonnage_collected) as avg_tonnage,
-            AVG(fill_level_before) as avg_fill_before,
-            COUNT(*) as collection_count
-        FROM collection_events
+        SELECT model_version, predicted_fill_level, confidence_score, is_full, predicted_at
+        FROM predictions
         WHERE container_id = ?
-    """, (container_id,))
-    
-    historical = cursor.fetchone()
-    avg_tonnage = historical[0] if historical and historical[0] else 0.5
-    avg_fill_before = historical[1] if historical and historical[1] else 0.5
-    collection_count = historical[2] if historical and historical[2] else 10
-    
-    conn.close()
+        ORDER BY predicted_at DESC
+        LIMIT ?
+    """, (container_id, limit))
     
-    # Özellikleri oluştur (gerçek verilerle)
-    if row[3]:
+    return jsonify({
+        'container_id': container_id,
+        'history': [
+            {
+                'model_version': row[0],
+                'fill_probability': row[1],
+                'confidence': row[2],
+                'is_full': bool(row[3]),
+                'predicted_at': row[4]
+            }
+            for row in cursor.fetchall()
+        ]
+    })
+
+# Doluluk tahmini: dolum hızları ve mevsim katsayıları periyodik yeniden hesaplanır,
+# tahmin her istekte o anki doluluklarla tüm şehir için tek çağrıda yapılır
+FORECAST_REFIT_S = 600
+FORECAST_DEFAULT_HOURS = '6,24,48'
+FORECAST_MAX_HORIZONS = 24
+FORECAST_MAX_HOURS = 60 * 24
+forecaster = fill_forecast.FillForecaster()
+forecast_refit_lock = threading.Lock()
+
+def current_forecaster(conn=None):
+    """Tahminciyi döndür; eskidiyse yenile (yenileme sürerken diğer istekler eski katsayıları kullanır)
+
+    İstek zaten havuzdan bağlantı tutuyorsa conn olarak verilmeli; iç içe
+    ikinci bir bağlantı beklemek yük altında havuzu kilitleyebilir.
+    """
+    fitted_at = forecaster.fitted_at
+    stale = fitted_at is None or (datetime.now() - fitted_at).total_seconds() > FORECAST_REFIT_S
+    if stale and forecast_refit_lock.acquire(blocking=fitted_at is None):
         try:
-            last_date = datetime.fromisoformat(row[3])
-            hours_since = (datetime.now() - last_date).total_seconds() / 3600
-        except:
-            hours_since = 168
+            if conn is not None:
+                forecaster.fit(conn)
+            else:
+                with db.connection() as own_conn:
+                    forecaster.fit(own_conn)
+        except sqlite3.Error as e:
+            print(f"⚠️ Doluluk tahmini yenilenemedi: {e}")
+        finally:
+            forecast_refit_lock.release()
+    return forecaster
+
+@app.route('/api/forecast')
+def forecast_containers():
+    """İleri tarihli doluluk ve eşiğe kalan süre tahmini
+
+    ?ids=1,2,3 (varsayılan: tüm aktif konteynerler), ?hours=6,24,48,
+    ?threshold=0.75, ?limit=N (en acil N konteyner). Sonuçlar eşiğe kalan
+    süreye göre sıralıdır.
+    """
+    from flask import request
+    
+    try:
+        ids_param = request.args.get('ids', '').strip()
+        container_ids = [int(cid) for cid in ids_param.split(',')] if ids_param else None
+        horizons = [float(h) for h in request.args.get('hours', FORECAST_DEFAULT_HOURS).split(',') if h.strip()]
+        threshold = float(request.args.get('threshold', feature_pipeline.FULL_THRESHOLD))
+        limit = request.args.get('limit', type=int)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz parametre'}), 400
+    
+    if len(horizons) > FORECAST_MAX_HORIZONS or any(h < 0 or h > FORECAST_MAX_HOURS for h in horizons):
+        return jsonify({'error': f'En fazla {FORECAST_MAX_HORIZONS} ufuk, 0-{FORECAST_MAX_HOURS} saat arası'}), 400
+    if not 0 < threshold <= 1.5:
+        return jsonify({'error': 'threshold 0-1.5 arasında olmalı'}), 400
+    
+    conn = get_db()
+    model = current_forecaster(conn)
+    if container_ids is None:
+        df = feature_pipeline.fetch_feature_frame(conn, "WHERE c.status = 'active'")
     else:
-        hours_since = 168
+        df = feature_pipeline.fetch_feature_frame(
+            conn, "WHERE c.container_id IN (SELECT value FROM json_each(?))", (json.dumps(container_ids),)
+        )
     
-    days_since = hours_since / 24
     now = datetime.now()
-    day_of_week = now.weekday()
-    is_weekend = int(now.weekday() >= 5)
-    month = now.month
-    season = (month % 12) // 3
-    
-    capacity = row[2] or 770
-    container_type_map = {'underground': 4, '770lt': 3, '400lt': 2, 'plastic': 1}
-    container_type_encoded = container_type_map.get(row[1], 2)
-    
-    population = row[8] if row[8] else 10000
-    pop_density = row[9] if row[9] else 5000
-    area = row[10] if row[10] else 2.0
-    
-    # Kapasite kullanım oranı (gerçek veri)
-    capacity_usage_rate = avg_tonnage / (capacity / 1000) if capacity > 0 else 0.5
-    
-    features = [
-        hours_since, days_since, day_of_week, is_weekend, month, season,
-        capacity, container_type_encoded, population, pop_density, area,
-        avg_tonnage, avg_fill_before, collection_count, capacity_usage_rate
-    ]
-    
-    # Tahmin
-    model = model_data['model']
-    probabilities = model.predict_proba([features])[0]
-    fill_probability = probabilities[1]
+    result = model.forecast(df, horizons, threshold=threshold, now=now)
+    hours_left = result['hours_until_threshold']
+    scheduled = result['hours_until_scheduled_collection']
+    order = np.argsort(hours_left, kind='stable')
+    if limit is not None and limit >= 0:
+        order = order[:limit]
+    
+    forecasts = []
+    for i in order.tolist():
+        next_collection = None if np.isnan(scheduled[i]) else float(scheduled[i])
+        forecasts.append({
+            'container_id': int(result['container_id'][i]),
+            'neighborhood': df['neighborhood_name'].iat[i],
+            'current_fill_level': float(result['current_fill_level'][i]),
+            'fill_rate_per_hour': round(float(result['fill_rate_per_hour'][i]), 6),
+            'hours_until_threshold': round(float(hours_left[i]), 2),
+            'threshold_at': (now + timedelta(hours=float(hours_left[i]))).isoformat(timespec='minutes'),
+            'hours_until_scheduled_collection': next_collection,
+            # Takvimli toplama yoksa ya da eşik ondan önce aşılıyorsa ayrıca sefer gerekir
+            'overflow_risk': next_collection is None or bool(hours_left[i] < next_collection),
+            'fill_forecast': {f"{h:g}": round(float(result['forecast'][h][i]), 4) for h in horizons}
+        })
     
     return jsonify({
-        'container_id': container_id,
-        'neighborhood': row[7],
-        'container_type': row[1],
-        'capacity_liters': row[2],
-        'current_fill_level': float(row[4]),
-        'fill_probability': float(fill_probability),
-        'is_full': bool(fill_probability >= 0.75),
-        'confidence': float(max(probabilities)),
-        'latitude': float(row[5]),
-        'longitude': float(row[6]),
-        'model_version': model_data['version'],
-        'prediction_timestamp': datetime.now().isoformat()
+        'count': len(forecasts),
+        'threshold': threshold,
+        'generated_at': now.isoformat(),
+        'fitted_at': model.fitted_at.isoformat() if model.fitted_at else None,
+        'forecasts': forecasts
+    })
+
+@app.route('/api/model/status')
+def model_status():
+    """Aktif model sürümü, kayıtlı sürümler ve arka plan eğitim durumu"""
+    current_model = registry.active()
+    return jsonify({
+        'model_loaded': bool(current_model),
+        'model_version': current_model['version'] if current_model else None,
+        'trained_at': current_model['trained_at'] if current_model else None,
+        'inference_engine': registry.engine,
+        'versions': registry.versions(),
+        'verified_since_training': training_counter['verified_count'],
+        'retrain_pending': retrainer.pending(),
+        'retrain': retrainer.stats
     })
 
+@app.route('/api/model/activate', methods=['POST'])
+def model_activate():
+    """Kayıtlı bir sürümü yeniden başlatmadan aktif yap; sürüm verilmezse bir öncekine dön"""
+    from flask import request
+    
+    version = (request.json or {}).get('version') if request.is_json else None
+    try:
+        active = registry.activate(version) if version else registry.rollback()
+    except model_registry.RegistryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'model_version': active})
+
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     """Kullanıcı kaydı - TC numarası ile"""
@@ -341,13 +626,12 @@ def register():
     if len(tc) != 11 or not tc.isdigit():
         return jsonify({'error': 'TC numarası 11 haneli olmalıdır'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     # TC kontrolü
     cursor.execute("SELECT user_id FROM users WHERE tc_number = ?", (tc,))
     if cursor.fetchone():
-        conn.close()
         return jsonify({'error': 'Bu TC numarası zaten kayıtlı'}), 400
     
     # Şifre hash
@@ -362,7 +646,6 @@ def register():
     
     conn.commit()
     user_id = cursor.lastrowid
-    conn.close()
     
     return jsonify({
         'success': True,
@@ -383,7 +666,7 @@ def login():
     
     tc = str(data['tc_number']).strip()
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -392,7 +675,6 @@ def login():
     """, (tc,))
     
     user = cursor.fetchone()
-    conn.close()
     
     if not user or not check_password_hash(user[3], data['password']):
         return jsonify({'error': 'TC numarası veya şifre hatalı'}), 401
@@ -412,7 +694,7 @@ def login():
 @app.route('/api/containers/full')
 def full_containers():
     """Dolu konteynerleri listele"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -431,7 +713,6 @@ def full_containers():
     """)
     
     containers = cursor.fetchall()
-    conn.close()
     
     return jsonify({
         'count': len(containers),
@@ -448,138 +729,272 @@ def full_containers():
         ]
     })
 
+# Konteyner listeleri: tam liste, container_id ile sayfalama (?after_id=&limit=) ya da
+# akış (?stream=ndjson|json). ETag konteyner tablosunun veritabanı imzasına bağlı
+# (yükleyiciler ve diğer işçilerin yazmaları dahil); değişmemişse 304.
+CONTAINER_PAGE_MAX = 5000
+STREAM_BATCH_ROWS = 500
+CONTAINER_SIGNATURE_SQL = """
+    SELECT COUNT(*), MAX(rowid), SUM(status = 'active'), TOTAL(current_fill_level), MAX(last_collection_date)
+    FROM containers
+"""
+container_signature = event_bus.DataSignature(DB_PATH, CONTAINER_SIGNATURE_SQL)
+
+CONTAINER_LISTINGS = {
+    'all': {
+        'select': """
+            SELECT 
+                c.container_id,
+                c.container_type,
+                c.current_fill_level,
+                c.latitude,
+                c.longitude,
+                c.capacity_liters,
+                c.status,
+                n.neighborhood_name
+            FROM containers c
+            LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
+            WHERE c.status = 'active'
+        """,
+        'order': "c.container_id ASC",
+        'row': lambda c: {
+            'id': c[0],
+            'type': c[1],
+            'fill_level': float(c[2]),
+            'latitude': float(c[3]),
+            'longitude': float(c[4]),
+            'capacity': c[5],
+            'status': c[6],
+            'neighborhood': c[7]
+        }
+    },
+    'map': {
+        'select': """
+            SELECT 
+                c.container_id,
+                c.container_type,
+                c.current_fill_level,
+                c.latitude,
+                c.longitude,
+                c.capacity_liters,
+                n.neighborhood_name,
+                c.last_collection_date
+            FROM containers c
+            LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
+            WHERE c.status = 'active' 
+            AND c.latitude IS NOT NULL 
+            AND c.longitude IS NOT NULL
+        """,
+        'order': "c.current_fill_level DESC",
+        'row': lambda c: {
+            'id': c[0],
+            'type': c[1],
+            'fill_level': float(c[2]),
+            'lat': float(c[3]),
+            'lng': float(c[4]),
+            'capacity': c[5],
+            'neighborhood': c[6],
+            'last_collection': c[7]
+        }
+    }
+}
+
+def _stream_listing(sql, params, to_dict, mode):
+    """Satırları imleçten parça parça JSON/NDJSON olarak üret (kendi havuz bağlantısıyla)"""
+    with db.connection() as conn:
+        cursor = conn.execute(sql, params)
+        if mode == 'json':
+            yield b'{"containers":['
+        count = 0
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_ROWS)
+            if not rows:
+                break
+            items = [json.dumps(to_dict(row), ensure_ascii=False) for row in rows]
+            if mode == 'json':
+                chunk = (',' if count else '') + ','.join(items)
+            else:
+                chunk = ''.join(item + '\n' for item in items)
+            count += len(rows)
+            yield chunk.encode('utf-8')
+        if mode == 'json':
+            yield f'],"count":{count}}}'.encode('utf-8')
+
+def _container_listing(kind):
+    from flask import request, Response, stream_with_context
+    
+    listing = CONTAINER_LISTINGS[kind]
+    stream = request.args.get('stream')
+    if stream not in (None, 'json', 'ndjson'):
+        return jsonify({'error': 'stream json ya da ndjson olmalı'}), 400
+    # Harita için sıkı biçimler: columnar (sütunlu JSON) ya da binary (paketlenmiş diziler)
+    payload_format = request.args.get('format', 'objects')
+    if payload_format not in ('objects', 'columnar', 'binary') or (payload_format != 'objects' and (kind != 'map' or stream)):
+        return jsonify({'error': 'Geçersiz format'}), 400
+    try:
+        after_id = int(request.args['after_id']) if 'after_id' in request.args else None
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Geçersiz parametre'}), 400
+    paginated = after_id is not None or limit is not None
+    if paginated:
+        limit = min(max(limit or CONTAINER_PAGE_MAX, 1), CONTAINER_PAGE_MAX)
+    
+    etag = http_utils.make_etag(kind, map_codec.CODEC_VERSION, container_signature.current(), sorted(request.args.items()))
+    if http_utils.etag_matches(request.headers.get('If-None-Match'), etag):
+        response = Response(status=304)
+        response.headers['ETag'] = etag
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    sql = listing['select']
+    params = []
+    if paginated:
+        # Anahtar tabanlı sayfalama: OFFSET yok, her sayfa indeksten doğrudan başlar
+        if after_id is not None:
+            sql += " AND c.container_id > ?"
+            params.append(after_id)
+        sql += " ORDER BY c.container_id ASC LIMIT ?"
+        params.append(limit + 1 if not stream else limit)
+    else:
+        sql += f" ORDER BY {listing['order']}"
+    
+    if stream:
+        encoding = http_utils.preferred_encoding(request.headers.get('Accept-Encoding'))
+        body = http_utils.compress_stream(_stream_listing(sql, params, listing['row'], stream), encoding)
+        mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['ETag'] = etag
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    
+    payload = {}
+    if paginated:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        payload['has_more'] = has_more
+        payload['next_after_id'] = rows[-1][0] if has_more else None
+    containers = [listing['row'](row) for row in rows]
+    
+    if payload_format == 'objects':
+        payload['count'] = len(rows)
+        payload['containers'] = containers
+        response = jsonify(payload)
+    else:
+        payload.update(map_codec.encode_columnar(containers))
+        if payload_format == 'binary':
+            try:
+                body = map_codec.encode_binary(payload)
+            except ValueError as e:
+                return jsonify({'error': f'İkili biçim kodlanamadı, format=columnar kullanın: {e}'}), 500
+            response = Response(body, mimetype='application/octet-stream')
+        else:
+            response = jsonify(payload)
+    response.headers['ETag'] = etag
+    return response
+
 @app.route('/api/containers/all')
 def all_containers():
     """Tüm konteynerleri listele"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            c.container_id,
-            c.container_type,
-            c.current_fill_level,
-            c.latitude,
-            c.longitude,
-            c.capacity_liters,
-            c.status,
-            n.neighborhood_name
-        FROM containers c
-        LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
-        WHERE c.status = 'active'
-        ORDER BY c.container_id ASC
-    """)
-    
-    containers = cursor.fetchall()
-    conn.close()
-    
-    return jsonify({
-        'count': len(containers),
-        'containers': [
-            {
-                'id': c[0],
-                'type': c[1],
-                'fill_level': float(c[2]),
-                'latitude': float(c[3]),
-                'longitude': float(c[4]),
-                'capacity': c[5],
-                'status': c[6],
-                'neighborhood': c[7]
-            }
-            for c in containers
-        ]
-    })
+    return _container_listing('all')
 
 @app.route('/api/containers/map')
 def containers_map():
     """Harita için tüm konteynerlerin lokasyonlarını döndür"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    return _container_listing('map')
+
+def _parse_float_args(names):
+    """Sorgu parametrelerini float olarak oku; eksik ya da geçersizse None"""
+    from flask import request
     
-    cursor.execute("""
-        SELECT 
-            c.container_id,
-            c.container_type,
-            c.current_fill_level,
-            c.latitude,
-            c.longitude,
-            c.capacity_liters,
-            n.neighborhood_name,
-            c.last_collection_date
-        FROM containers c
-        LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
-        WHERE c.status = 'active' 
-        AND c.latitude IS NOT NULL 
-        AND c.longitude IS NOT NULL
-        ORDER BY c.current_fill_level DESC
-    """)
+    try:
+        return [float(request.args[name]) for name in names]
+    except (KeyError, ValueError):
+        return None
+
+@app.route('/api/containers/nearby')
+def containers_nearby():
+    """Verilen konuma en yakın k aktif konteyner (?lat=&lng=&k=&max_km=)"""
+    from flask import request
     
-    containers = cursor.fetchall()
-    conn.close()
+    coords = _parse_float_args(['lat', 'lng'])
+    if coords is None:
+        return jsonify({'error': 'lat ve lng gerekli'}), 400
+    lat, lng = coords
+    try:
+        k = min(max(int(request.args.get('k', 10)), 1), NEARBY_MAX_K)
+        max_km = float(request.args['max_km']) if 'max_km' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Geçersiz parametre'}), 400
     
+    containers = container_index.nearby(lat, lng, k=k, max_km=max_km)
     return jsonify({
         'count': len(containers),
-        'containers': [
-            {
-                'id': c[0],
-                'type': c[1],
-                'fill_level': float(c[2]),
-                'lat': float(c[3]),
-                'lng': float(c[4]),
-                'capacity': c[5],
-                'neighborhood': c[6],
-                'last_collection': c[7]
-            }
-            for c in containers
-        ]
+        'containers': containers
     })
 
-@app.route('/api/reports/submit', methods=['POST'])
-def submit_report():
-    """Vatandaş bildirimi gönder"""
+@app.route('/api/containers/bbox')
+def containers_bbox():
+    """Harita görünümündeki aktif konteynerler (?min_lat=&min_lng=&max_lat=&max_lng=&limit=)"""
     from flask import request
     
-    data = request.json
-    
-    # Zorunlu alanlar
-    if not all(k in data for k in ['user_id', 'container_id', 'fill_level']):
-        return jsonify({'error': 'Eksik bilgi'}), 400
-    
-    user_id = data['user_id']
-    container_id = data['container_id']
-    fill_level = float(data['fill_level']) / 100.0  # Yüzdeyi 0-1 arasına çevir
-    notes = data.get('notes', '')
-    has_photo = data.get('has_photo', False)
+    bounds = _parse_float_args(['min_lat', 'min_lng', 'max_lat', 'max_lng'])
+    if bounds is None:
+        return jsonify({'error': 'min_lat, min_lng, max_lat ve max_lng gerekli'}), 400
+    min_lat, min_lng, max_lat, max_lng = bounds
+    if min_lat > max_lat or min_lng > max_lng:
+        return jsonify({'error': 'Geçersiz alan'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', BBOX_MAX_RESULTS)), 1), BBOX_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz parametre'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    containers = container_index.bbox(min_lat, min_lng, max_lat, max_lng, limit=limit + 1)
+    return jsonify({
+        'count': min(len(containers), limit),
+        'truncated': len(containers) > limit,
+        'containers': containers[:limit]
+    })
+
+def apply_report(conn, report):
+    """Bildirimi açık işlem içinde uygula: kayıt, güven puanı, gerekirse konteyner doluluğu
+
+    Bildirim kaydı ilk yazmadır: yazma kilidi alındıktan sonra okunan güven
+    puanı güncel kalır, kullanıcı sayaçları SQL içinde atomik artırılır.
+    Kullanıcı veya konteyner yoksa LookupError (çağıran geri alır).
+    """
+    user_id = report['user_id']
+    container_id = report['container_id']
+    fill_level = report['fill_level']
     cursor = conn.cursor()
     
-    # Kullanıcı bilgilerini al
-    cursor.execute("SELECT trust_score, total_reports FROM users WHERE user_id = ?", (user_id,))
-    user_info = cursor.fetchone()
-    
-    if not user_info:
-        conn.close()
-        return jsonify({'error': 'Kullanıcı bulunamadı'}), 404
-    
-    current_trust = user_info[0]
-    total_reports = user_info[1] if user_info[1] else 0
-    
-    # Konteyner mevcut doluluk seviyesini al
-    cursor.execute("SELECT current_fill_level FROM containers WHERE container_id = ?", (container_id,))
+    # Konteyner mevcut doluluk seviyesini ve konumunu al
+    cursor.execute("""
+        SELECT current_fill_level, latitude, longitude, container_type, capacity_liters, neighborhood_id, status
+        FROM containers WHERE container_id = ?
+    """, (container_id,))
     container_info = cursor.fetchone()
     
     if not container_info:
-        conn.close()
-        return jsonify({'error': 'Konteyner bulunamadı'}), 404
+        raise LookupError('Konteyner bulunamadı')
     
     actual_fill = container_info[0]
     
+    # Bildirim konumu: istemci gönderdiyse o, yoksa konteynerin kayıtlı konumu
+    report_lat = report['latitude'] if report['latitude'] is not None else container_info[1]
+    report_lng = report['longitude'] if report['longitude'] is not None else container_info[2]
+    
     # Doğruluk hesapla (fark ne kadar küçükse o kadar doğru)
     accuracy = 1.0 - abs(fill_level - actual_fill)
     accuracy = max(0.0, min(1.0, accuracy))  # 0-1 arası sınırla
     
-    # Güven puanını güncelle
     # Doğru bildirim (+0.05), yanlış bildirim (-0.03)
     if accuracy >= 0.7:  # Doğru bildirim
         trust_change = 0.05
@@ -591,134 +1006,574 @@ def submit_report():
         trust_change = -0.03
         status = 'rejected'
     
-    # Fotoğraf varsa bonus
-    if has_photo and current_trust < 0.7:
-        trust_change += 0.02
-    
-    new_trust = current_trust + trust_change
-    new_trust = max(0.0, new_trust)  # Sadece 0'ın altına düşmesin, üst sınır yok
-    
     # Bildirimi kaydet (citizen_reports tablosu kullan)
     cursor.execute("""
         INSERT INTO citizen_reports 
         (user_id, container_id, fill_level_estimate, latitude, longitude, 
          notes, prediction_diff, is_verified, actual_full, submitted_at)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (user_id, container_id, fill_level, 40.2, 28.9, 
-          notes, abs(fill_level - actual_fill), 
+    """, (user_id, container_id, fill_level, report_lat, report_lng, 
+          report['notes'], abs(fill_level - actual_fill), 
           1 if status == 'verified' else 0, 
           int(actual_fill >= 0.75),
-          datetime.now().isoformat()))
+          report['submitted_at']))
+    
+    # Kullanıcının puanı (işlem yazma kilidini tutuyor, değer commit'e kadar değişmez)
+    cursor.execute("SELECT trust_score FROM users WHERE user_id = ?", (user_id,))
+    user_info = cursor.fetchone()
     
-    # Kullanıcı istatistiklerini güncelle
+    if not user_info:
+        raise LookupError('Kullanıcı bulunamadı')
+    
+    # Fotoğraf varsa bonus
+    if report['has_photo'] and (user_info[0] or 0.0) < 0.7:
+        trust_change += 0.02
+    
+    # Kullanıcı istatistiklerini SQL içinde atomik güncelle (okunan değer geri yazılmaz)
+    # Güven puanı sadece 0'ın altına düşmesin, üst sınır yok
     cursor.execute("""
         UPDATE users 
-        SET trust_score = ?, 
-            total_reports = ?,
-            accurate_reports = CASE WHEN ? = 'verified' THEN accurate_reports + 1 ELSE accurate_reports END
+        SET trust_score = MAX(0.0, trust_score + ?), 
+            total_reports = COALESCE(total_reports, 0) + 1,
+            accurate_reports = COALESCE(accurate_reports, 0) + ?
         WHERE user_id = ?
-    """, (new_trust, total_reports + 1, status, user_id))
+        RETURNING name, role, trust_score, total_reports
+    """, (trust_change, 1 if status == 'verified' else 0, user_id))
+    user_name, user_role, new_trust, total_reports = cursor.fetchone()
     
     # Eğer bildirim doğrulanmışsa, konteyner doluluk seviyesini güncelle
+    container_updated = None
+    container_state = None
     if status == 'verified' and accuracy >= 0.8:  # Çok doğru tahminlerde güncelle
+        container_updated = datetime.now().isoformat()
         cursor.execute("""
             UPDATE containers 
             SET current_fill_level = ?,
                 last_collection_date = ?
             WHERE container_id = ?
-        """, (fill_level, datetime.now().isoformat(), container_id))
-        
-        # Model eğitim sayacını artır
-        training_counter['verified_count'] += 1
-        
-        # Belirli sayıda doğru bildirimde model'i yeniden eğit
-        if training_counter['verified_count'] >= training_counter['threshold']:
-            conn.commit()
-            conn.close()
-            
-            # Model'i arka planda eğit
-            print(f"🔄 {training_counter['verified_count']} doğru bildirim toplandı, model yeniden eğitiliyor...")
-            retrain_success = retrain_model()
-            
-            if retrain_success:
-                training_counter['verified_count'] = 0  # Sayacı sıfırla
-            
-            return jsonify({
-                'success': True,
-                'message': 'Bildirim kaydedildi ve model güncellendi!',
-                'report_status': status,
-                'accuracy': round(accuracy * 100, 1),
-                'trust_score': round(new_trust, 2),
-                'total_reports': total_reports + 1,
-                'trust_change': round(trust_change, 3),
-                'model_updated': retrain_success
-            })
+        """, (fill_level, container_updated, container_id))
+        # Rota planı için optimize-routes sorgusuyla aynı alanlar
+        container_state = {
+            'container_id': container_id,
+            'latitude': container_info[1],
+            'longitude': container_info[2],
+            'container_type': container_info[3],
+            'current_fill_level': fill_level,
+            'capacity_liters': container_info[4],
+            'neighborhood_id': container_info[5],
+            'status': container_info[6]
+        }
     
-    conn.commit()
-    conn.close()
+    return {
+        'user_id': user_id,
+        'container_id': container_id,
+        'fill_level': fill_level,
+        'report_status': status,
+        'accuracy': accuracy,
+        'user_name': user_name,
+        'user_role': user_role,
+        'trust_score': new_trust,
+        'total_reports': total_reports,
+        'trust_change': trust_change,
+        'previous_fill_level': actual_fill,
+        'container_updated': container_updated,
+        'container_state': container_state,
+        'submitted_at': report['submitted_at']
+    }
+
+def after_reports_committed(results):
+    """Commit edilmiş bildirimlerin yan etkileri: önbellekler, mekânsal indeks, yeniden eğitim"""
+    if not results:
+        return False
+    invalidate_dashboard()
+    top_before = citizen_board.top()
+    for r in results:
+        citizen_board.update(r['user_id'], r['user_name'], r['user_role'], r['trust_score'], r['total_reports'])
+    
+    updated = [r for r in results if r['container_updated']]
+    for r in updated:
+        prediction_cache.invalidate(r['container_id'])
+        container_index.update(r['container_id'], fill_level=r['fill_level'], last_collection=r['container_updated'])
+    
+    # Aktif rota planını sadece değişen konteynerlerle onar (tam çözüm yapılmaz)
+    changed_routes = set()
+    if updated:
+        try:
+            changed_routes = route_plans.apply([r['container_state'] for r in updated])
+        except Exception as e:
+            print(f"⚠️ Rota planı güncellenemedi: {e}")
+    publish_report_events(results, updated, top_before, changed_routes)
     
-    return jsonify({
+    if not updated:
+        return False
+    
+    # Model eğitim sayacını artır; belirli sayıda doğru bildirimde model'i arka planda
+    # yeniden eğit (istek beklemez, eğitim sürerken gelen istekler tek eğitimde birleşir)
+    training_counter['verified_count'] += len(updated)
+    if training_counter['verified_count'] >= training_counter['threshold']:
+        retrainer.submit(f"{training_counter['verified_count']} doğru bildirim")
+        return True
+    return False
+
+def report_response(result, retrain_queued=False):
+    """Uygulanmış bildirim sonucundan istemci yanıtı"""
+    response = {
         'success': True,
-        'message': 'Bildirim başarıyla kaydedildi!',
-        'report_status': status,
-        'accuracy': round(accuracy * 100, 1),
-        'trust_score': round(new_trust, 2),
-        'total_reports': total_reports + 1,
-        'trust_change': round(trust_change, 3)
-    })
+        'message': 'Bildirim kaydedildi, model güncellemesi sıraya alındı!' if retrain_queued else 'Bildirim başarıyla kaydedildi!',
+        'report_status': result['report_status'],
+        'accuracy': round(result['accuracy'] * 100, 1),
+        'trust_score': round(result['trust_score'], 2),
+        'total_reports': result['total_reports'],
+        'trust_change': round(result['trust_change'], 3)
+    }
+    if retrain_queued:
+        response['model_update_queued'] = True
+    return response
 
-@app.route('/api/simulate', methods=['POST'])
-def simulate():
-    """Basit simülasyon - Gerçek verilerle"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Bildirim yazma modu: 'sync' istek içinde yazar, 'queue' doğrulayıp kuyruğa ekler ve
+# tek yazıcı iş parçacığı bildirimleri toplu işlemlerle (group commit) uygular
+REPORT_INGEST_MODE = os.environ.get('REPORT_INGEST_MODE', 'sync')
+report_writer = report_queue.ReportQueue(db.connection, apply_report, on_committed=after_reports_committed)
+
+@app.route('/api/reports/submit', methods=['POST'])
+def submit_report():
+    """Vatandaş bildirimi gönder"""
+    from flask import request
     
-    cursor.execute("SELECT COUNT(*) FROM containers WHERE current_fill_level >= 0.75")
-    full_containers = cursor.fetchone()[0]
+    data = request.json
     
-    cursor.execute("SELECT COUNT(*) FROM vehicles")
-    total_vehicles = cursor.fetchone()[0]
+    # Zorunlu alanlar
+    if not data or not all(k in data for k in ['user_id', 'container_id', 'fill_level']):
+        return jsonify({'error': 'Eksik bilgi'}), 400
     
-    # Araç tipleri ve sayıları
-    cursor.execute("""
-        SELECT vt.type_name, COUNT(v.vehicle_id) as count
-        FROM vehicles v
-        JOIN vehicle_types vt ON v.type_id = vt.type_id
-        GROUP BY vt.type_name
-    """)
-    vehicle_counts = {row[0]: row[1] for row in cursor.fetchall()}
+    try:
+        report = {
+            'user_id': int(data['user_id']),
+            'container_id': int(data['container_id']),
+            'fill_level': float(data['fill_level']) / 100.0,  # Yüzdeyi 0-1 arasına çevir
+            'notes': data.get('notes', ''),
+            'has_photo': bool(data.get('has_photo', False)),
+            'submitted_at': datetime.now().isoformat()
+        }
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Geçersiz bildirim'}), 400
     
-    conn.close()
+    try:
+        report['latitude'] = float(data['latitude']) if data.get('latitude') is not None else None
+        report['longitude'] = float(data['longitude']) if data.get('longitude') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Geçersiz konum'}), 400
+    
+    conn = get_db()
+    
+    if REPORT_INGEST_MODE == 'queue':
+        # Hızlı ön kontrol (salt okuma, kilit almaz); asıl kontrol yazıcıda tekrarlanır
+        if not conn.execute("SELECT 1 FROM users WHERE user_id = ?", (report['user_id'],)).fetchone():
+            return jsonify({'error': 'Kullanıcı bulunamadı'}), 404
+        if not conn.execute("SELECT 1 FROM containers WHERE container_id = ?", (report['container_id'],)).fetchone():
+            return jsonify({'error': 'Konteyner bulunamadı'}), 404
+        try:
+            ticket = report_writer.submit(report)
+        except report_queue.QueueFull as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        return jsonify({
+            'success': True,
+            'queued': True,
+            'ticket': ticket,
+            'message': 'Bildirim alındı, işleniyor',
+            'status_url': f'/api/reports/status/{ticket}'
+        }), 202
     
-    # Gerçek hesaplama
-    small_count = vehicle_counts.get('Küçük Çöp Kamyonu', 0)
-    large_count = vehicle_counts.get('Büyük Çöp Kamyonu', 0)
-    crane_count = vehicle_counts.get('Vinçli Araç', 0)
+    try:
+        result = apply_report(conn, report)
+    except LookupError as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 404
+    conn.commit()
     
-    # Kapasite: küçük 4.5t, büyük 8t, vinçli 11.5t
-    total_capacity = (small_count * 4.5 + large_count * 8 + crane_count * 11.5) * 8  # 8 saat
+    return jsonify(report_response(result, after_reports_committed([result])))
+
+@app.route('/api/reports/status/<int:ticket>')
+def report_status(ticket):
+    """Kuyruğa alınmış bildirimin sonucu (202: henüz işlenmedi)"""
+    state, result = report_writer.status(ticket)
+    if state == 'queued':
+        return jsonify({'success': True, 'queued': True, 'ticket': ticket}), 202
+    if state == 'unknown':
+        return jsonify({'error': 'Bilet bulunamadı'}), 404
+    if 'error' in result:
+        return jsonify({'success': False, 'ticket': ticket, 'error': result['error']}), 422
+    return jsonify({**report_response(result), 'ticket': ticket})
+
+@app.route('/api/reports/queue')
+def report_queue_stats():
+    """Bildirim kuyruğu derinliği, grup boyutları, commit gecikmesi"""
+    return jsonify({'mode': REPORT_INGEST_MODE, **report_writer.stats()})
+
+# ============== LIVE STREAM ==============
+STREAM_HEARTBEAT_S = 15
+STREAM_RETRY_MS = 3000
+FULL_FILL_LEVEL = 0.75   # Dashboard 'dolu konteyner' eşiği
+
+# Dashboard sayaçları (canlı akış): ilk ihtiyaçta tek sorguyla kurulur, bildirim
+# commit'lerinde artımlı güncellenir; gün değişince ya da yükleyici yazınca yeniden kurulur
+live_counters = {'values': None, 'day': None}
+live_counters_lock = threading.Lock()
+
+def _utc_day():
+    # Sayaç sorgusundaki DATE('now') ile aynı gün sınırı
+    return datetime.now(timezone.utc).date().isoformat()
+
+def current_counters():
+    """Güncel dashboard sayaçları (kopya)"""
+    with live_counters_lock:
+        if live_counters['values'] is None or live_counters['day'] != _utc_day():
+            with db.connection() as conn:
+                live_counters['values'] = _compute_dashboard_stats(conn)
+            live_counters['day'] = _utc_day()
+        return dict(live_counters['values'])
+
+def _bump_counters(deltas):
+    """Sayaçlara farkları uygula; kurulmamışsa (abone yok) hiçbir şey yapma"""
+    with live_counters_lock:
+        values = live_counters['values']
+        if values is None:
+            return None
+        if live_counters['day'] != _utc_day():
+            live_counters['values'] = None
+            return None
+        for name, delta in deltas.items():
+            values[name] += delta
+        values['fill_rate'] = values['full_containers'] / values['total_containers'] if values['total_containers'] > 0 else 0
+        values['verification_rate'] = values['verified_reports'] / values['total_reports'] if values['total_reports'] > 0 else 0
+        return dict(values)
+
+def publish_report_events(results, updated, top_before, changed_routes):
+    """Commit edilmiş bildirimlerin farklarını canlı akışa yayınla"""
+    for r in results:
+        events.publish('report', {
+            'container_id': r['container_id'],
+            'report_status': r['report_status'],
+            'fill_level': r['fill_level'],
+            'user_name': r['user_name'],
+            'submitted_at': r['submitted_at']
+        })
+    for r in updated:
+        events.publish('container', {
+            'id': r['container_id'],
+            'fill_level': r['fill_level'],
+            'last_collection': r['container_updated']
+        }, key=('container', r['container_id']))
+    
+    counters = _bump_counters({
+        'total_reports': len(results),
+        'today_reports': len(results),
+        'verified_reports': sum(1 for r in results if r['report_status'] == 'verified'),
+        'full_containers': sum((r['fill_level'] >= FULL_FILL_LEVEL) - ((r['previous_fill_level'] or 0) >= FULL_FILL_LEVEL)
+                               for r in updated)
+    })
+    if counters is not None:
+        events.publish('counters', counters, key='counters')
+    
+    if citizen_board.top() is not top_before:
+        events.publish('leaderboard', {'leaderboard': list(citizen_board.top())}, key='leaderboard')
+    if changed_routes:
+        publish_route_version()
+
+def publish_route_version():
+    """Rota planı değişti: istemciler /api/fleet/routes/changes ile sadece farkı çeker"""
+    plan_id, version = route_plans.plan_version()
+    events.publish('routes', {'plan': plan_id, 'version': version}, key='routes')
+
+# Yükleyici betikler ayrı süreçte yazar; imzalar değişince önbellekler ve indeksler yenilenir
+DATASET_SIGNATURES = {
+    'containers': "SELECT COUNT(*), MAX(rowid), SUM(status = 'active') FROM containers",
+    'events': "SELECT MAX(rowid) FROM collection_events",
+    'fleet': "SELECT COUNT(*), MAX(rowid), SUM(status = 'active') FROM vehicles",
+    'tonnage': "SELECT COUNT(*), MAX(rowid) FROM tonnage_statistics"
+}
+
+def on_dataset_changed(changed):
+    """Uygulama dışı yazma: ilgili önbellekleri boşalt, istemcilere hangi parçaların değiştiğini bildir"""
+    print(f"🔄 Veri seti değişti: {', '.join(changed)}")
+    stats_cache.invalidate('dashboard_stats', 'fleet_summary', 'tonnage_monthly')
+    if 'containers' in changed:
+        with db.connection() as conn:
+            container_index.load(conn)
+        prediction_cache.clear()
+    with live_counters_lock:
+        live_counters['values'] = None
+    events.publish('dataset', {'changed': changed}, key=('dataset', tuple(changed)))
+    events.publish('counters', current_counters(), key='counters')
+
+dataset_watcher = event_bus.DatasetWatcher(DB_PATH, DATASET_SIGNATURES, on_dataset_changed)
+# Açılışta başlar: SSE istemcisi olmasa da önbellekler, mekânsal indeks ve tahminler
+# dış yazmalarla güncel kalır. Tarama işçileri (spawn) bu modülü yeniden içe aktarır; onlarda başlamaz.
+if multiprocessing.parent_process() is None:
+    dataset_watcher.ensure_started()
+
+def _sse(event_type, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _sse_batch(batch):
+    """Birleştirilen olaylar kuyruktaki ilk yerinde kalır, id'ler sırasız olabilir: id sadece
+    son olayda (partinin en büyüğü) gönderilir, yeniden bağlanmada tekrar ya da kayıp olmaz"""
+    last_id = max(event_id for event_id, _, _ in batch)
+    return ''.join(_sse(event_type, data, last_id if i == len(batch) - 1 else None)
+                   for i, (_, event_type, data) in enumerate(batch))
+
+@app.route('/api/stream')
+def event_stream():
+    """Canlı değişiklik akışı (Server-Sent Events)
+
+    Olaylar: counters (dashboard sayaçları, bağlanınca da gönderilir), report,
+    container (doluluk), leaderboard, routes (plan sürümü), dataset (yükleyici
+    yazdı: değişen parçalar yeniden çekilmeli), resync (kuyruk taştı ya da
+    kaçırılan olaylar artık tutulmuyor: anlık görüntü yeniden çekilmeli).
+    Yeniden bağlanırken Last-Event-ID ile kaçırılan olaylar tekrar gönderilir.
+    """
+    from flask import request, Response
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    try:
+        subscription, state = events.subscribe(last_event_id)
+    except event_bus.TooManySubscribers as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    
+    def generate():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if state != 'replayed':
+                if state == 'resync':
+                    yield _sse('resync', {'reason': 'history'})
+                yield _sse('counters', current_counters(), events.last_id())
+            while True:
+                batch = subscription.next_batch(STREAM_HEARTBEAT_S)
+                if not batch:
+                    yield ": ping\n\n"   # Kopan istemcileri fark etmek ve ara sunucuları açık tutmak için
+                    continue
+                chunk = _sse_batch(batch)
+                if any(event_type == 'resync' for _, event_type, _ in batch):
+                    chunk += _sse('counters', current_counters())
+                yield chunk
+        finally:
+            subscription.close()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/stream/stats')
+def event_stream_stats():
+    """Abone sayısı, birleştirilen ve taşan olaylar, izleyici sayaçları"""
+    return jsonify({**events.stats(), 'watcher': dataset_watcher.stats})
+
+SIMULATION_RUNS_LIMIT = 50
+
+def parse_scenario(data):
+    """İstek gövdesinden senaryo parametreleri; geçersiz değerde ValueError"""
+    days = int(data.get('days', fleet_sim.DEFAULT_DAYS))
+    if not 1 <= days <= fleet_sim.MAX_DAYS:
+        raise ValueError(f'days 1-{fleet_sim.MAX_DAYS} arasında olmalı')
+    
+    # Filo: mutlak sayılar (fleet) ve/veya mevcut filoya göre değişiklikler (fleet_changes)
+    current = fleet_sim.fleet_counts(get_db())
+    fleet = {}
+    aliases = {**fleet_sim.FLEET_KEYS, 'compactors': fleet_sim.CRANE}
+    for key, count in (data.get('fleet') or {}).items():
+        if key not in aliases:
+            raise ValueError(f'Bilinmeyen araç tipi: {key}')
+        fleet[aliases[key]] = int(count)
+    for key, change in (data.get('fleet_changes') or {}).items():
+        if key not in aliases:
+            raise ValueError(f'Bilinmeyen araç tipi: {key}')
+        vehicle_type = aliases[key]
+        fleet[vehicle_type] = fleet.get(vehicle_type, current[vehicle_type]) + int(change)
+    if any(count < 0 for count in fleet.values()):
+        raise ValueError('Araç sayısı negatif olamaz')
+    
+    shift_hours = float(data.get('shift_hours', data.get('max_route_duration', fleet_sim.SHIFT_HOURS)))
+    collect_threshold = float(data.get('collect_threshold', 0.0))
+    if not 0 < shift_hours <= 24 or not 0 <= collect_threshold <= 1:
+        raise ValueError('shift_hours 0-24, collect_threshold 0-1 arasında olmalı')
+    
+    schedule = {}
+    for name, days_text in (data.get('schedule') or {}).items():
+        weekdays = fill_forecast.parse_weekdays(', '.join(days_text) if isinstance(days_text, list) else days_text)
+        if not weekdays:
+            raise ValueError(f'{name}: geçerli gün yok')
+        schedule[name] = sorted(weekdays)
+    
+    crane_rotation_days = data.get('crane_rotation_days')
+    start_date = data.get('start_date')
+    return {
+        'name': data.get('name'),
+        'days': days,
+        'start': datetime.fromisoformat(start_date).isoformat() if start_date else None,
+        'fleet': fleet,
+        'shift_hours': shift_hours,
+        'collect_threshold': collect_threshold,
+        'schedule_overrides': schedule,
+        'crane_rotation_days': int(crane_rotation_days) if crane_rotation_days is not None else None,
+        'fuel_price': float(data.get('fuel_price', fleet_sim.FUEL_PRICE))
+    }
+
+@app.route('/api/simulate', methods=['POST'])
+def simulate():
+    """Filo senaryosu simülasyonu - konteyner dolulukları saatlik adımlarla, tüm şehir
+
+    Gövde (hepsi isteğe bağlı): days, start_date, fleet {small_trucks,
+    large_trucks, crane_vehicles}, fleet_changes (aynı anahtarlar, fark),
+    shift_hours, collect_threshold, schedule {mahalle: gün listesi},
+    crane_rotation_days, fuel_price, name, admin_user_id.
+    """
+    from flask import request
     
-    estimated_hours = (full_containers * 0.5 / total_capacity) * 8 if total_capacity > 0 else 24
-    estimated_cost = small_count * 500 + large_count * 800 + crane_count * 400
+    data = request.get_json(silent=True) or {}
+    try:
+        scenario = parse_scenario(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Geçersiz senaryo: {e}'}), 400
+    
+    conn = get_db()
+    # Şehir durumu her senaryoda güncel veritabanından yüklenir
+    simulator = fleet_sim.FleetSimulator().prepare(conn, current_forecaster(conn))
+    run_args = {k: v for k, v in scenario.items() if k != 'name'}
+    results = simulator.run(**run_args)
+    
+    simulation_id = fleet_sim.save_run(conn, scenario, results, data.get('admin_user_id'))
+    conn.commit()
     
+    fleet = results['fleet']
+    container_hours = results['containers'] * results['days'] * 24
     return jsonify({
         'success': True,
+        'simulation_id': simulation_id,
         'results': {
-            'total_vehicles': total_vehicles,
-            'small_trucks': small_count,
-            'large_trucks': large_count,
-            'crane_vehicles': crane_count,
-            'estimated_hours': round(estimated_hours, 2),
-            'estimated_cost': estimated_cost,
-            'containers_to_collect': full_containers,
-            'efficiency': min(100, 100 - (estimated_hours / 24 * 100))
+            'total_vehicles': sum(fleet.values()),
+            'small_trucks': fleet[fleet_sim.SMALL],
+            'large_trucks': fleet[fleet_sim.LARGE],
+            'crane_vehicles': fleet[fleet_sim.CRANE],
+            'estimated_hours': results['truck_hours'],
+            'estimated_cost': results['cost'],
+            'containers_to_collect': int(np.count_nonzero(simulator.initial_fill >= feature_pipeline.FULL_THRESHOLD)),
+            # Taşmasız konteyner-saat oranı
+            'efficiency': round(100 * (1 - results['overflow_container_hours'] / container_hours), 2) if container_hours else 100.0,
+            **results
         }
     })
 
+# Monte Carlo taramaları süreç havuzu kullanır: aynı anda tek tarama, işçi sayısı çekirdekle sınırlı
+SWEEP_CONCURRENCY = 1
+sweep_slots = threading.BoundedSemaphore(SWEEP_CONCURRENCY)
+
+@app.route('/api/simulate/sweep', methods=['POST'])
+def simulate_sweep():
+    """Filo boyutlandırma taraması - sonuçlar NDJSON olarak tamamlandıkça akar
+
+    Gövde: axes {small_trucks: [...], large_trucks: [...], crane_vehicles: [...],
+    days_per_week: [...], rate_uncertainty: [...], ...}, seeds, days, start_date,
+    workers, include_runs, overflow_target ve tüm senaryolara ortak
+    shift_hours / collect_threshold / fuel_price.
+    """
+    from flask import request, Response, stream_with_context
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        axes = data.get('axes') or {}
+        seeds = int(data.get('seeds', 10))
+        days = int(data.get('days', fleet_sim.DEFAULT_DAYS))
+        if seeds < 1 or not 1 <= days <= fleet_sim.MAX_DAYS:
+            raise ValueError(f'seeds >= 1, days 1-{fleet_sim.MAX_DAYS} olmalı')
+        fleet_sweep.build_grid(axes, seeds)
+        start = datetime.fromisoformat(data['start_date']) if data.get('start_date') else None
+        workers = min(int(data.get('workers') or os.cpu_count() or 1), os.cpu_count() or 1)
+        overflow_target = float(data.get('overflow_target', fleet_sweep.OVERFLOW_TARGET))
+        base = {k: float(data[k]) for k in ('shift_hours', 'collect_threshold', 'fuel_price') if k in data}
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Geçersiz tarama: {e}'}), 400
+    
+    if not sweep_slots.acquire(blocking=False):
+        return jsonify({'error': 'Başka bir tarama sürüyor'}), 409, {'Retry-After': '30'}
+    try:
+        conn = get_db()
+        simulator = fleet_sim.FleetSimulator().prepare(conn, current_forecaster(conn))
+    except Exception:
+        sweep_slots.release()
+        raise
+    
+    def sweep_lines():
+        try:
+            for event in fleet_sweep.run_sweep(simulator, axes, seeds=seeds, days=days, start=start, base=base,
+                                               workers=workers, include_runs=bool(data.get('include_runs', True)),
+                                               overflow_target=overflow_target):
+                yield (json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8')
+        finally:
+            sweep_slots.release()
+    
+    encoding = http_utils.preferred_encoding(request.headers.get('Accept-Encoding'))
+    response = Response(stream_with_context(http_utils.compress_stream(sweep_lines(), encoding)),
+                        mimetype='application/x-ndjson')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/api/simulate/runs')
+def simulation_runs():
+    """Son simülasyon koşuları (özet)"""
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT simulation_id, admin_user_id, scenario_params, estimated_cost, estimated_time_hours, run_at
+        FROM simulation_runs
+        ORDER BY simulation_id DESC
+        LIMIT ?
+    """, (SIMULATION_RUNS_LIMIT,))
+    
+    return jsonify({
+        'runs': [
+            {
+                'simulation_id': row[0],
+                'admin_user_id': row[1],
+                'scenario': json.loads(row[2]),
+                'estimated_cost': row[3],
+                'estimated_time_hours': row[4],
+                'run_at': row[5]
+            }
+            for row in cursor.fetchall()
+        ]
+    })
+
+@app.route('/api/simulate/runs/<int:simulation_id>')
+def simulation_run(simulation_id):
+    """Kayıtlı simülasyonun senaryosu ve tam sonuçları"""
+    row = get_db().execute(
+        "SELECT scenario_params, results, run_at FROM simulation_runs WHERE simulation_id = ?", (simulation_id,)
+    ).fetchone()
+    if not row:
+        return jsonify({'error': 'Simülasyon bulunamadı'}), 404
+    
+    return jsonify({
+        'simulation_id': simulation_id,
+        'scenario': json.loads(row[0]),
+        'results': json.loads(row[1]) if row[1] else None,
+        'run_at': row[2]
+    })
+
 @app.route('/api/fleet/summary')
 def fleet_summary():
     """Filo özeti - Gerçek CSV verilerinden"""
-    conn = sqlite3.connect(DB_PATH)
+    return jsonify(stats_cache.get_or_compute('fleet_summary', _compute_fleet_summary, ttl=REFERENCE_CACHE_TTL))
+
+def _compute_fleet_summary():
+    conn = get_db()
     cursor = conn.cursor()
     
     # Araç tipleri ve sayıları
@@ -756,14 +1611,15 @@ def fleet_summary():
             result['total_vehicles'] += count
             result['total_capacity_tons'] += count * (avg_cap or 0)
     
-    conn.close()
-    
-    return jsonify(result)
+    return result
 
 @app.route('/api/tonnage/monthly')
 def tonnage_monthly():
     """Aylık tonaj verileri - Gerçek CSV verilerinden"""
-    conn = sqlite3.connect(DB_PATH)
+    return jsonify(stats_cache.get_or_compute('tonnage_monthly', _compute_tonnage_monthly, ttl=REFERENCE_CACHE_TTL))
+
+def _compute_tonnage_monthly():
+    conn = get_db()
     cursor = conn.cursor()
     
     # Son 12 ay tonaj verisi
@@ -788,9 +1644,7 @@ def tonnage_monthly():
         avg_daily_tonnage = 550
         avg_daily_km = 180
     
-    conn.close()
-    
-    return jsonify({
+    return {
         'monthly_data': [
             {
                 'month': row[0],
@@ -802,12 +1656,12 @@ def tonnage_monthly():
         ],
         'avg_daily_tonnage': round(avg_daily_tonnage, 2),
         'avg_daily_km': round(avg_daily_km, 2)
-    })
+    }
 
 @app.route('/api/user/<int:user_id>/stats')
 def user_stats(user_id):
     """Kullanıcı istatistikleri"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -816,7 +1670,6 @@ def user_stats(user_id):
     """, (user_id,))
     
     user = cursor.fetchone()
-    conn.close()
     
     if not user:
         return jsonify({'error': 'Kullanıcı bulunamadı'}), 404
@@ -830,13 +1683,107 @@ def user_stats(user_id):
     })
 
 # ============== FLEET ROUTE OPTIMIZATION ==============
+# Yol geometrisi sağlayıcısı (ROUTING_BACKEND=osrm|haversine); OSRM önbellekli ve haversine yedekli
+routing = routing_backend.create_backend()
+
+# Son optimize edilmiş plan; bildirimlerle değişen konteynerler plana artımlı işlenir
+route_plans = route_plan.RoutePlanStore()
+ROUTE_CHANGES_MAX_WAIT_S = 25
+
+def render_routes(planned_routes, depot, use_osrm):
+    """Planlanan araç rotalarını harita ve liste için yanıt biçimine çevir
+
+    use_osrm: çizim için yol geometrisi çekilir; tüm rotalar paralel istenir,
+    en yavaş tek çağrı kadar sürer (önbellekte olanlar ağa gitmez)
+    """
+    depot_point = [depot['longitude'], depot['latitude']]
+    
+    # Depodan çıkış, her tur sonunda boşaltma için depoya dönüş
+    route_coordinates = []
+    for planned in planned_routes:
+        coordinates = [depot_point]
+        for trip in planned['trips']:
+            coordinates += [[c['longitude'], c['latitude']] for c in trip['stops']]
+            coordinates.append(depot_point)
+        route_coordinates.append(coordinates)
+    
+    # Gerçek yol geometrisi - sadece çizim ve gerçek mesafe için, tek seferde paralel
+    road_routes = [None] * len(route_coordinates)
+    if use_osrm and route_coordinates:
+        deadline = time.perf_counter() + routing_backend.OSRM_TIMEOUT_S + 1
+        road_routes = routing.route_many(route_coordinates, deadline=deadline)
+    
+    routes = []
+    for planned, coordinates, road in zip(planned_routes, route_coordinates, road_routes):
+        vehicle = planned['vehicle']
+        assigned_containers = [c for trip in planned['trips'] for c in trip['stops']]
+        
+        route_geometry = coordinates
+        total_distance = planned['total_distance_km']
+        total_time = planned['total_time_min']
+        provider = 'solver'
+        if road:
+            route_geometry = road['geometry']
+            total_distance = road['distance_km']
+            total_time = road['duration_min'] + len(assigned_containers) * route_solver.SERVICE_MIN_PER_CONTAINER
+            provider = road['provider']
+        
+        capacity_tons = vehicle['capacity_tons']
+        
+        routes.append({
+            'vehicle_id': vehicle['vehicle_id'],
+            'plate_number': vehicle['plate_number'],
+            'vehicle_type': vehicle['type_name'],
+            'capacity_tons': capacity_tons,
+            'total_containers': len(assigned_containers),
+            'total_distance_km': round(total_distance, 2),
+            'estimated_time_min': round(total_time, 0),
+            'total_weight_tons': round(planned['total_load_tons'], 2),
+            'capacity_usage': round(planned['max_trip_load_pct'], 1),  # En yüklü turun doluluğu
+            'trips': [
+                {
+                    'container_ids': [c['container_id'] for c in trip['stops']],
+                    'load_tons': round(trip['load_tons'], 2),
+                    'distance_km': round(trip['distance_km'], 2),
+                    'time_min': round(trip['time_min'], 0)
+                }
+                for trip in planned['trips']
+            ],
+            'route_points': [[c['latitude'], c['longitude']] for c in assigned_containers],  # Konteyner konumları
+            'route_geometry': [[lat, lon] for lon, lat in route_geometry],  # Yol geometrisi (Leaflet için lat,lon)
+            'container_details': assigned_containers,
+            'geometry_provider': provider
+        })
+    return routes
+
 @app.route('/api/fleet/optimize-routes', methods=['GET'])
 def optimize_routes():
-    """Her araç için optimize edilmiş rota oluştur"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Her araç için kapasiteye uygun optimize edilmiş rota oluştur (CVRP)
+
+    Sorgu parametreleri: time_limit (sn, en fazla 10), seed, max_trips,
+    depot_lat/depot_lng, geometry=osrm|none (osrm: çizim için yol geometrisi çekilir).
+    Sonuç aktif plan olur; sonraki doluluk değişiklikleri /api/fleet/routes/changes ile izlenir.
+    """
+    from flask import request
+    
+    try:
+        time_limit = min(float(request.args.get('time_limit', route_solver.DEFAULT_TIME_LIMIT_S)), 10.0)
+        seed = int(request.args.get('seed', 42))
+        max_trips = int(request.args.get('max_trips', route_solver.DEFAULT_MAX_TRIPS))
+        depot = None
+        if 'depot_lat' in request.args and 'depot_lng' in request.args:
+            depot = (float(request.args['depot_lat']), float(request.args['depot_lng']))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Geçersiz parametre'}), 400
+    use_osrm = request.args.get('geometry', 'osrm') != 'none'
+    
+    conn = get_db()
     cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
     
+    # Okumadan önce: çözüm sürerken gelen doluluk değişiklikleri yeni plana yeniden uygulanır
+    token = route_plans.begin_rebuild()
+    loaded = False
     try:
         # Aktif araçları getir
         cursor.execute("""
@@ -862,150 +1809,161 @@ def optimize_routes():
             WHERE status = 'active' 
             AND latitude IS NOT NULL 
             AND longitude IS NOT NULL
-            AND current_fill_level >= 0.7
+            AND current_fill_level >= ?
             ORDER BY current_fill_level DESC, neighborhood_id
-        """)
+        """, (route_plan.FULL_THRESHOLD,))
         containers = [dict(row) for row in cursor.fetchall()]
         
         if not vehicles:
-            conn.close()
+            route_plans.abort_rebuild()
             return jsonify({'success': False, 'message': 'Aktif araç bulunamadı'})
         
         if not containers:
-            conn.close()
+            route_plans.abort_rebuild()
             return jsonify({'success': False, 'message': 'Toplanacak konteyner bulunamadı'})
         
-        # Her araç için rota oluştur (Round-Robin + Geographic Clustering)
-        routes = []
-        containers_per_vehicle = len(containers) // len(vehicles)
-        
-        # Mahalleye göre grupla
-        neighborhood_groups = {}
-        for container in containers:
-            nh_id = container['neighborhood_id']
-            if nh_id not in neighborhood_groups:
-                neighborhood_groups[nh_id] = []
-            neighborhood_groups[nh_id].append(container)
-        
-        # Mahalle gruplarını sırala (en fazla konteynerden aza)
-        sorted_neighborhoods = sorted(neighborhood_groups.items(), key=lambda x: len(x[1]), reverse=True)
-        
-        # Araçlara adil dağıt
-        vehicle_assignments = {v['vehicle_id']: [] for v in vehicles}
-        vehicle_idx = 0
+        # Kapasite, mesafe ve vardiya süresine uyan rotaları çevrimdışı hesapla
+        plan = route_solver.solve(
+            vehicles, containers, depot=depot, time_limit=time_limit, seed=seed, max_trips=max_trips
+        )
+        route_plans.load(plan, vehicles, token=token, max_trips=max_trips)
+        loaded = True
+        publish_route_version()
         
-        for nh_id, nh_containers in sorted_neighborhoods:
-            # Bu mahalleyi bir araca ata
-            target_vehicle = vehicles[vehicle_idx]['vehicle_id']
-            vehicle_assignments[target_vehicle].extend(nh_containers)
-            vehicle_idx = (vehicle_idx + 1) % len(vehicles)
-        
-        # Her araç için rota detayları oluştur
-        for vehicle in vehicles:
-            vehicle_id = vehicle['vehicle_id']
-            assigned_containers = vehicle_assignments[vehicle_id]
-            
-            if not assigned_containers:
-                continue
-            
-            # Gerçek yol rotası oluştur (OSRM kullanarak)
-            route_geometry = []
-            total_distance = 0
-            total_time = 0
-            
-            # Konteynerleri koordinatlara çevir
-            coordinates = [[c['longitude'], c['latitude']] for c in assigned_containers]
-            
-            if len(coordinates) > 1:
-                # OSRM API'sine istek gönder (Demo sunucu)
-                coords_str = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
-                osrm_url = f"http://router.project-osrm.org/route/v1/driving/{coords_str}?overview=full&geometries=geojson"
-                
-                try:
-                    response = requests.get(osrm_url, timeout=10)
-                    if response.status_code == 200:
-                        osrm_data = response.json()
-                        if osrm_data.get('code') == 'Ok' and 'routes' in osrm_data:
-                            route = osrm_data['routes'][0]
-                            # Geometri (yol çizgisi)
-                            route_geometry = route['geometry']['coordinates']
-                            # Mesafe (metre -> km)
-                            total_distance = route['distance'] / 1000
-                            # Süre (saniye -> dakika) + her konteyner için 5 dk
-                            total_time = (route['duration'] / 60) + (len(assigned_containers) * 5)
-                        else:
-                            # Fallback: düz çizgi
-                            route_geometry = coordinates
-                            total_distance = len(assigned_containers) * 2.5
-                            total_time = (total_distance / 35) * 60 + (len(assigned_containers) * 5)
-                    else:
-                        # Fallback
-                        route_geometry = coordinates
-                        total_distance = len(assigned_containers) * 2.5
-                        total_time = (total_distance / 35) * 60 + (len(assigned_containers) * 5)
-                except Exception as e:
-                    print(f"OSRM error for vehicle {vehicle_id}: {e}")
-                    # Fallback
-                    route_geometry = coordinates
-                    total_distance = len(assigned_containers) * 2.5
-                    total_time = (total_distance / 35) * 60 + (len(assigned_containers) * 5)
-            else:
-                # Tek konteyner
-                route_geometry = coordinates
-                total_distance = 2.5
-                total_time = 10
-            
-            # Toplam ağırlık (ton cinsinden)
-            total_weight_tons = sum(c['capacity_liters'] * c['current_fill_level'] * 0.0002 for c in assigned_containers)
-            capacity_tons = vehicle['capacity_tons']
-            
-            # Rota noktaları (konteyner konumları - marker'lar için)
-            route_points = [[c['latitude'], c['longitude']] for c in assigned_containers]
-            
-            routes.append({
-                'vehicle_id': vehicle_id,
-                'plate_number': vehicle['plate_number'],
-                'vehicle_type': vehicle['type_name'],
-                'capacity_tons': capacity_tons,
-                'total_containers': len(assigned_containers),
-                'total_distance_km': round(total_distance, 2),
-                'estimated_time_min': round(total_time, 0),
-                'total_weight_tons': round(total_weight_tons, 2),
-                'capacity_usage': round((total_weight_tons / capacity_tons) * 100, 1) if capacity_tons > 0 else 0,
-                'route_points': route_points,  # Konteyner konumları
-                'route_geometry': [[lat, lon] for lon, lat in route_geometry],  # Gerçek yol geometrisi (Leaflet için lat,lon)
-                'container_details': assigned_containers
-            })
+        # Yanıt, çözüm sırasında gelen değişiklikler uygulanmış güncel plandan
+        current = route_plans.snapshot()
+        routes = render_routes(current['routes'], current['depot'], use_osrm)
         
         # Genel istatistikler
         total_containers = len(containers)
         total_distance = sum(r['total_distance_km'] for r in routes)
         total_time = sum(r['estimated_time_min'] for r in routes)
         
-        conn.close()
-        
         return jsonify({
             'success': True,
             'summary': {
                 'total_vehicles': len(vehicles),
                 'total_containers': total_containers,
                 'assigned_containers': sum(r['total_containers'] for r in routes),
+                'unassigned_containers': [c['container_id'] for c in current['unassigned']],
                 'total_distance_km': round(total_distance, 2),
                 'total_time_hours': round(total_time / 60, 2),
-                'avg_containers_per_vehicle': round(total_containers / len(vehicles), 1)
+                'avg_containers_per_vehicle': round(total_containers / len(vehicles), 1),
+                'depot': current['depot'],
+                'solver': {
+                    'restarts': plan['restarts'],
+                    'elapsed_s': round(plan['elapsed_s'], 3),
+                    'seed': plan['seed']
+                },
+                'plan': {'id': current['plan_id'], 'version': current['version']}
             },
             'routes': routes
         })
         
     except Exception as e:
-        conn.close()
+        if not loaded:
+            route_plans.abort_rebuild()
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/fleet/routes/changes')
+def route_changes():
+    """Aktif plandaki değişen araç rotaları (long polling)
+
+    Sorgu parametreleri: plan (plan id), since (son görülen sürüm), wait (sn,
+    en fazla 25), geometry=osrm|none. Değişiklik olana ya da süre dolana kadar
+    bekler; sadece değişen araçların rotaları döner. Plan yeniden optimize
+    edildiyse reset=true ile tüm rotalar döner.
+    """
+    from flask import request
+    
+    try:
+        plan_id = int(request.args.get('plan', 0))
+        since = int(request.args.get('since', 0))
+        wait = min(max(float(request.args.get('wait', ROUTE_CHANGES_MAX_WAIT_S)), 0.0), ROUTE_CHANGES_MAX_WAIT_S)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Geçersiz parametre'}), 400
+    use_osrm = request.args.get('geometry', 'osrm') != 'none'
+    
+    current_plan, version, changed = route_plans.wait_for_changes(plan_id, since, wait)
+    if current_plan is None:
+        return jsonify({'success': False, 'message': 'Henüz optimize edilmiş plan yok'}), 404
+    
+    reset = changed is None
+    if not reset and not changed:
+        return jsonify({'success': True, 'plan': current_plan, 'version': version, 'reset': False,
+                        'routes': [], 'emptied': []})
+    
+    current = route_plans.snapshot(None if reset else changed)
+    return jsonify({
+        'success': True,
+        'plan': current['plan_id'],
+        'version': current['version'],
+        'reset': reset,
+        'routes': render_routes(current['routes'], current['depot'], use_osrm),
+        'emptied': current['emptied'],
+        'unassigned_containers': [c['container_id'] for c in current['unassigned']]
+    })
+
+@app.route('/api/fleet/routes/stats')
+def route_plan_stats():
+    """Artımlı rota planı sayaçları ve güncelleme süreleri"""
+    return jsonify(route_plans.stats())
+
+def collect_app_metrics():
+    """Bileşenlerin kendi sayaçlarından anlık metrikler (her /metrics okumasında)"""
+    pool = db.stats()
+    cache = prediction_cache.stats()
+    queue_stats = report_writer.stats()
+    stream = events.stats()
+    plans = route_plans.stats()
+    return [
+        ('sqlite_pool_connections', 'gauge', 'Havuz bağlantıları',
+         [({'state': 'in_use'}, pool['in_use']), ({'state': 'idle'}, pool['idle_connections'])]),
+        ('sqlite_pool_timeouts_total', 'counter', 'Havuzdan bağlantı alınamayan istekler', [({}, pool['timeouts'])]),
+        ('prediction_cache_lookups_total', 'counter', 'Tahmin önbelleği aramaları',
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('prediction_cache_entries', 'gauge', 'Tahmin önbelleğindeki kayıtlar', [({}, cache['entries'])]),
+        ('prediction_writer_pending', 'gauge', 'Yazılmayı bekleyen tahmin satırları', [({}, prediction_writer.pending())]),
+        ('prediction_writer_dropped_total', 'counter', 'Kuyruk dolduğu için yazılmayan tahminler',
+         [({}, prediction_writer.stats['dropped'])]),
+        ('report_queue_depth', 'gauge', 'Bildirim kuyruğu derinliği', [({}, queue_stats['depth'])]),
+        ('report_queue_reports_total', 'counter', 'Kuyruk modunda bildirimler',
+         [({'result': 'applied'}, queue_stats['applied']), ({'result': 'failed'}, queue_stats['failed']),
+          ({'result': 'rejected'}, queue_stats['rejected'])]),
+        ('model_retrain_jobs_total', 'counter', 'Yeniden eğitim istekleri',
+         [({'result': 'requested'}, retrainer.stats['requested']), ({'result': 'coalesced'}, retrainer.stats['coalesced']),
+          ({'result': 'completed'}, retrainer.stats['completed']), ({'result': 'failed'}, retrainer.stats['failed'])]),
+        ('model_retrain_running', 'gauge', 'Eğitim sürüyor mu', [({}, int(retrainer.stats['running']))]),
+        ('stream_subscribers', 'gauge', 'Canlı akış aboneleri', [({}, stream['subscribers'])]),
+        ('stream_events_published_total', 'counter', 'Yayınlanan canlı akış olayları', [({}, stream['published'])]),
+        ('route_plan_updates_total', 'counter', 'Rota planına işlenen konteyner değişiklikleri', [({}, plans['updates'])]),
+        ('route_plan_unassigned', 'gauge', 'Planda atanamamış konteynerler', [({}, plans['unassigned'])])
+    ]
+
+metrics.REGISTRY.register_collector(collect_app_metrics)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metin biçiminde metrikler"""
+    from flask import Response
+    
+    return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route('/api/metrics/slow')
+def slow_request_log():
+    """Son yavaş istekler ve yavaş SQL ifadelerinin sorgu planları (SLOW_REQUEST_MS ile açılır)"""
+    return jsonify({
+        'enabled': SLOW_REQUEST_MS is not None,
+        'slow_request_ms': SLOW_REQUEST_MS,
+        'slow_query_ms': SLOW_QUERY_MS,
+        'requests': list(slow_requests)[::-1]
+    })
+
 if __name__ == '__main__':
     print("=" * 60)
     print("NİLÜFER BELEDİYESİ - BACKEND API")
     print("=" * 60)
-    print(f"\n✓ Model: {'Yüklü ✓' if model_data else 'YÜKLENMEDİ ✗'}")
+    print(f"\n✓ Model: {registry.manifest().get('active') or 'YÜKLENMEDİ ✗'} (ilk tahminde yüklenir)")
     print(f"✓ Veritabanı: {DB_PATH}")
     print("\n🌐 URL'ler:")
     print("  Vatandaş: http://localhost:5000/")
@@ -0,0 +1,130 @@
+"""
+Konteyner Geçmiş İstatistikleri
+collection_events üzerindeki konteyner başına toplamların somutlaştırılmış tablosu
+
+container_stats her konteyner için toplama sayısını ve tonaj / doluluk
+toplamlarını tutar; ortalamalar okuma anında toplam / adet olarak
+hesaplanır. Olay yazan yollar (yükleyici, ham kayıt aktarımı) aynı işlem
+içinde record_events ile tabloyu artımlı günceller. Bu yolların dışında
+olay yazıldıysa tablo baştan kurulmalıdır:
+
+Kullanım: python container_stats.py [--db PATH]
+"""
+
+import argparse
+import sqlite3
+import time
+
+import pandas as pd
+
+DB_PATH = 'nilufer_waste.db'
+
+# AVG() NULL değerleri saymaz; her ortalama için ayrı adet tutulur
+STATS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS container_stats (
+        container_id INTEGER PRIMARY KEY,
+        collection_count INTEGER NOT NULL DEFAULT 0,
+        tonnage_sum REAL NOT NULL DEFAULT 0,
+        tonnage_count INTEGER NOT NULL DEFAULT 0,
+        fill_before_sum REAL NOT NULL DEFAULT 0,
+        fill_before_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_events_container ON collection_events(container_id)"
+]
+
+REBUILD_QUERY = """
+    INSERT INTO container_stats
+    (container_id, collection_count, tonnage_sum, tonnage_count, fill_before_sum, fill_before_count)
+    SELECT
+        container_id,
+        COUNT(*),
+        TOTAL(tonnage_collected),
+        COUNT(tonnage_collected),
+        TOTAL(fill_level_before),
+        COUNT(fill_level_before)
+    FROM collection_events
+    WHERE container_id IS NOT NULL
+    GROUP BY container_id
+"""
+
+def ensure_stats_schema(conn):
+    """Tabloyu oluştur; yeni oluşturulduysa mevcut olaylardan doldur. Kurulduysa True"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'container_stats'"
+    ).fetchone()
+    for statement in STATS_SCHEMA:
+        conn.execute(statement)
+    if exists:
+        return False
+    rebuild(conn)
+    return True
+
+def rebuild(conn):
+    """Tabloyu collection_events'ten baştan hesapla; konteyner sayısını döndür"""
+    conn.execute("DELETE FROM container_stats")
+    conn.execute(REBUILD_QUERY)
+    return conn.execute("SELECT COUNT(*) FROM container_stats").fetchone()[0]
+
+def record_events(conn, container_ids, tonnages, fill_befores):
+    """Yeni eklenen olayları toplamlara ekle (olay INSERT'i ile aynı işlemde çağrılmalı)
+
+    Olaylar önce konteyner başına toplanır, tablo her konteyner için bir
+    kez güncellenir. container_id'si olmayan (mahalle bazlı) olaylar atlanır.
+    """
+    events = pd.DataFrame({
+        'container_id': pd.to_numeric(pd.Series(container_ids, dtype=object), errors='coerce'),
+        'tonnage': pd.to_numeric(pd.Series(tonnages, dtype=object), errors='coerce'),
+        'fill_before': pd.to_numeric(pd.Series(fill_befores, dtype=object), errors='coerce')
+    }).dropna(subset=['container_id'])
+    if events.empty:
+        return 0
+
+    grouped = events.groupby(events['container_id'].astype('int64')).agg(
+        collection_count=('container_id', 'size'),
+        tonnage_sum=('tonnage', 'sum'),
+        tonnage_count=('tonnage', 'count'),
+        fill_before_sum=('fill_before', 'sum'),
+        fill_before_count=('fill_before', 'count')
+    )
+    conn.executemany("""
+        INSERT INTO container_stats
+        (container_id, collection_count, tonnage_sum, tonnage_count, fill_before_sum, fill_before_count)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(container_id) DO UPDATE SET
+            collection_count = collection_count + excluded.collection_count,
+            tonnage_sum = tonnage_sum + excluded.tonnage_sum,
+            tonnage_count = tonnage_count + excluded.tonnage_count,
+            fill_before_sum = fill_before_sum + excluded.fill_before_sum,
+            fill_before_count = fill_before_count + excluded.fill_before_count
+    """, zip(
+        grouped.index.tolist(),
+        grouped['collection_count'].tolist(),
+        grouped['tonnage_sum'].tolist(),
+        grouped['tonnage_count'].tolist(),
+        grouped['fill_before_sum'].tolist(),
+        grouped['fill_before_count'].tolist()
+    ))
+    return len(grouped)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='container_stats tablosunu collection_events tablosundan yeniden kur')
+    parser.add_argument('--db', default=DB_PATH, help='SQLite veritabanı yolu')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    try:
+        with conn:
+            for statement in STATS_SCHEMA:
+                conn.execute(statement)
+            count = rebuild(conn)
+    finally:
+        conn.close()
+    print(f"✓ container_stats yeniden kuruldu: {count} konteyner ({time.perf_counter() - started:.2f}s)")
+
+if __name__ == "__main__":
+    main()
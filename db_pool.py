@@ -0,0 +1,298 @@
+"""
+SQLite Bağlantı Havuzu
+WAL modu, ayarlı pragmalar ve hazır ifade önbelleği ile paylaşılan bağlantılar
+
+Havuz bağlantıları her ifadenin süresini ölçer (metrics histogramı); fetchall /
+fetchmany süresi ifadeye eklenir. Bir istek izleme başlattıysa (start_trace)
+ifade sayısı ve süresi o isteğe de yazılır; eşiği aşan ifadeler sorgu planı
+için metni ve parametreleriyle saklanır.
+"""
+
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+# Ortam değişkenleriyle ayarlanabilir varsayılanlar
+POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+STATEMENT_CACHE_SIZE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+ACQUIRE_TIMEOUT_S = float(os.environ.get('SQLITE_ACQUIRE_TIMEOUT_S', 10))
+
+# İfade türü etiketi sınırlı tutulur (SQL metni etiket olmaz)
+STATEMENT_KINDS = {'select', 'with', 'insert', 'update', 'delete', 'begin', 'commit', 'rollback',
+                   'savepoint', 'release', 'pragma', 'create'}
+
+SQL_SECONDS = metrics.Histogram(
+    'sqlite_statement_duration_seconds', 'SQL ifadesi çalıştırma süresi (execute/commit)', ['statement']
+)
+SQL_FETCH_SECONDS = metrics.Histogram('sqlite_fetch_duration_seconds', 'fetchall/fetchmany ile satır okuma süresi')
+POOL_WAIT_SECONDS = metrics.Histogram('sqlite_pool_wait_seconds', 'Havuzdan bağlantı bekleme süresi')
+
+_request_trace = contextvars.ContextVar('sqlite_request_trace', default=None)
+
+class QueryTrace:
+    """Tek isteğin SQL ifade sayısı ve toplam süresi; yavaş ifadeler [sql, parametreler, sn]"""
+
+    __slots__ = ('queries', 'seconds', 'slow_query_s', 'slow')
+
+    def __init__(self, slow_query_s=None):
+        self.queries = 0
+        self.seconds = 0.0
+        self.slow_query_s = slow_query_s
+        self.slow = []
+
+def start_trace(slow_query_s=None):
+    """Geçerli bağlamda (istek) SQL izlemeyi başlat; end_trace'e verilecek jeton"""
+    return _request_trace.set(QueryTrace(slow_query_s))
+
+def end_trace(token):
+    trace = _request_trace.get()
+    _request_trace.reset(token)
+    return trace
+
+def _statement_kind(sql):
+    kind = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ''
+    return kind if kind in STATEMENT_KINDS else 'other'
+
+def _record_statement(sql, parameters, elapsed):
+    """İfadeyi kaydet; isteğin izinde tutulan ifade kaydını (sonraki fetch eklemeleri için) döndür"""
+    SQL_SECONDS.labels(_statement_kind(sql)).observe(elapsed)
+    trace = _request_trace.get()
+    if trace is None:
+        return None
+    trace.queries += 1
+    trace.seconds += elapsed
+    statement = [sql, parameters, elapsed]
+    if trace.slow_query_s is not None and elapsed >= trace.slow_query_s:
+        trace.slow.append(statement)
+    return statement
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """execute/executemany ve fetchall/fetchmany süresini ölçen imleç"""
+
+    _statement = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._statement = _record_statement(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._statement = _record_statement(sql, None, time.perf_counter() - started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._record_fetch(time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._record_fetch(time.perf_counter() - started)
+
+    def _record_fetch(self, elapsed):
+        SQL_FETCH_SECONDS.observe(elapsed)
+        statement = self._statement
+        trace = _request_trace.get()
+        if statement is None or trace is None:
+            return
+        trace.seconds += elapsed
+        slow_before = trace.slow_query_s is not None and statement[2] >= trace.slow_query_s
+        statement[2] += elapsed
+        if trace.slow_query_s is not None and not slow_before and statement[2] >= trace.slow_query_s:
+            trace.slow.append(statement)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Kısa yol execute'ları da ölçülen imleçten geçen bağlantı"""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _record_statement('COMMIT', None, time.perf_counter() - started)
+
+def explain(conn, sql, parameters):
+    """İfadenin sorgu planı (EXPLAIN QUERY PLAN ayrıntı satırları); ölçülmez, çalıştırmaz"""
+    if _statement_kind(sql) not in ('select', 'with', 'insert', 'update', 'delete') or parameters is None:
+        return []
+    rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+class ConnectionPool:
+    """Sınırlı boyutlu, iş parçacığı güvenli SQLite bağlantı havuzu
+
+    Bağlantılar ilk ihtiyaçta açılır ve LIFO sırayla yeniden kullanılır
+    (en sıcak sayfa önbelleğine sahip bağlantı önce). Her bağlantı kendi
+    hazır ifade önbelleğini (cached_statements) tutar, böylece aynı SQL
+    metni tekrar derlenmez.
+    """
+
+    def __init__(self, db_path, max_size=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS,
+                 mmap_size=MMAP_SIZE, cache_size_kb=CACHE_SIZE_KB,
+                 acquire_timeout=ACQUIRE_TIMEOUT_S):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'acquired': 0,
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total_ms': 0.0,
+            'wait_time_max_ms': 0.0
+        }
+
+    def _connect(self):
+        """Yeni bağlantı aç ve pragmaları uygula"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=InstrumentedConnection
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def acquire(self):
+        """Havuzdan bağlantı al; havuz doluysa boşalana kadar bekle"""
+        try:
+            conn = self._idle.get_nowait()
+            self._record(hit=True, waited_ms=0.0)
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            self._record(hit=False, waited_ms=0.0)
+            return conn
+
+        # Havuz dolu: bir bağlantı iade edilene kadar bekle
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise sqlite3.OperationalError(
+                f"Bağlantı havuzu dolu ({self.max_size}), {self.acquire_timeout}s içinde bağlantı alınamadı"
+            )
+        self._record(hit=True, waited_ms=(time.perf_counter() - started) * 1000)
+        return conn
+
+    def release(self, conn):
+        """Bağlantıyı temiz durumda havuza iade et"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            # Bozuk bağlantıyı havuza geri koyma
+            with self._lock:
+                self._created -= 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """`with pool.connection() as conn:` kullanımı için"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def _record(self, hit, waited_ms):
+        POOL_WAIT_SECONDS.observe(waited_ms / 1000)
+        with self._lock:
+            self._stats['acquired'] += 1
+            self._stats['hits' if hit else 'misses'] += 1
+            if waited_ms > 0:
+                self._stats['waits'] += 1
+                self._stats['wait_time_total_ms'] += waited_ms
+                self._stats['wait_time_max_ms'] = max(self._stats['wait_time_max_ms'], waited_ms)
+
+    def stats(self):
+        """Havuz isabet oranı ve bekleme süreleri"""
+        with self._lock:
+            stats = dict(self._stats)
+            created = self._created
+        idle = self._idle.qsize()
+        stats.update({
+            'max_size': self.max_size,
+            'open_connections': created,
+            'idle_connections': idle,
+            'in_use': created - idle,
+            'hit_rate': round(stats['hits'] / stats['acquired'], 4) if stats['acquired'] else 0.0,
+            'avg_wait_ms': round(stats['wait_time_total_ms'] / stats['waits'], 3) if stats['waits'] else 0.0
+        })
+        stats['wait_time_total_ms'] = round(stats['wait_time_total_ms'], 3)
+        stats['wait_time_max_ms'] = round(stats['wait_time_max_ms'], 3)
+        return stats
+
+    def close_all(self):
+        """Boştaki tüm bağlantıları kapat"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+            conn.close()
@@ -0,0 +1,232 @@
+"""
+Olay Yolu
+Yazma yollarından gelen değişiklikleri SSE istemcilerine dağıtan süreç içi yayın/abone
+
+- publish(tür, veri, key) olayı tüm abonelerin kuyruğuna ekler; yayıncı
+  hiçbir istemciyi beklemez.
+- Anahtarlı olaylar (ör. ('container', id), 'counters') abonenin kuyruğunda
+  birleştirilir: henüz gönderilmemiş eski değer yenisiyle değiştirilir.
+  Yavaş bir istemci aynı konteynerin her ara değerini almaz, sonuncusunu alır.
+- Kuyruk yine de sınırı aşarsa (istemci hiç okumuyor) bekleyenler atılır
+  ve istemciye tek bir 'resync' olayı gönderilir; istemci anlık görüntüyü
+  yeniden çeker. Bellek abone başına sınırlı kalır.
+- Son olaylar halka tamponda tutulur; yeniden bağlanan istemci Last-Event-ID
+  ile kaçırdıklarını alır, tamponun dışına düştüyse 'resync' alır.
+
+DatasetWatcher, uygulama dışından (yükleyici betikler) gelen yazmaları
+PRAGMA data_version ve ucuz imza sorgularıyla fark eder; DataSignature aynı
+yöntemle HTTP doğrulayıcıları (ETag) için veritabanı sürümü üretir.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+HISTORY_EVENTS = 2000
+MAX_SUBSCRIBERS = 64
+SUBSCRIBER_QUEUE_LIMIT = 1000
+WATCH_INTERVAL_S = 2.0
+
+class TooManySubscribers(Exception):
+    """Abone sınırı dolu; istemci daha sonra yeniden bağlanmalı"""
+
+class Subscription:
+    """Tek istemcinin sınırlı, birleştirmeli olay kuyruğu"""
+
+    def __init__(self, bus, queue_limit):
+        self._bus = bus
+        self.queue_limit = queue_limit
+        self._pending = OrderedDict()   # anahtar -> (id, tür, veri)
+        self._overflowed = False
+        self.closed = False
+        self.stats = {'delivered': 0, 'coalesced': 0, 'overflows': 0}
+
+    def _push(self, event_id, event_type, data, key):
+        """Bus kilidi altında çağrılır"""
+        if self._overflowed:
+            return
+        slot = key if key is not None else ('#', event_id)
+        if slot in self._pending:
+            self.stats['coalesced'] += 1
+        self._pending[slot] = (event_id, event_type, data)
+        if len(self._pending) > self.queue_limit:
+            self._pending.clear()
+            self._overflowed = True
+            self.stats['overflows'] += 1
+
+    def next_batch(self, timeout):
+        """Bekleyen olaylar [(id, tür, veri)], süre dolarsa boş liste"""
+        with self._bus._changed:
+            if not self._pending and not self._overflowed and not self.closed:
+                self._bus._changed.wait_for(lambda: self._pending or self._overflowed or self.closed, timeout)
+            if self._overflowed:
+                self._overflowed = False
+                batch = [(self._bus._last_id, 'resync', {'reason': 'overflow'})]
+            else:
+                batch = list(self._pending.values())
+            self._pending.clear()
+        self.stats['delivered'] += len(batch)
+        return batch
+
+    def close(self):
+        self._bus._unsubscribe(self)
+
+class EventBus:
+    """Süreç içi yayın/abone; abone başına geri basınç (birleştirme + taşma)"""
+
+    def __init__(self, history=HISTORY_EVENTS, max_subscribers=MAX_SUBSCRIBERS,
+                 queue_limit=SUBSCRIBER_QUEUE_LIMIT):
+        self.max_subscribers = max_subscribers
+        self.queue_limit = queue_limit
+        self._subscribers = set()
+        self._history = deque(maxlen=history)   # (id, tür, veri, anahtar)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stats = {'published': 0, 'subscribed': 0, 'rejected': 0, 'replayed': 0, 'resyncs': 0}
+
+    def publish(self, event_type, data, key=None):
+        """Olayı yayınla, olay id'sini döndür; abone yoksa sadece geçmişe yazılır"""
+        with self._changed:
+            self._last_id += 1
+            self._history.append((self._last_id, event_type, data, key))
+            for subscriber in self._subscribers:
+                subscriber._push(self._last_id, event_type, data, key)
+            self._stats['published'] += 1
+            if self._subscribers:
+                self._changed.notify_all()
+            return self._last_id
+
+    def subscribe(self, last_event_id=None):
+        """Yeni abone; last_event_id verilirse sonrasındaki olaylar kuyruğa önceden eklenir
+
+        Döndürür: (abonelik, durum) — durum 'fresh', 'replayed' ya da 'resync'
+        (istenen id geçmişte yok, istemci anlık görüntüyü yeniden çekmeli).
+        """
+        with self._changed:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._stats['rejected'] += 1
+                raise TooManySubscribers(f"Canlı akış abone sınırı dolu ({self.max_subscribers})")
+            subscription = Subscription(self, self.queue_limit)
+            state = 'fresh'
+            if last_event_id is not None:
+                oldest = self._history[0][0] if self._history else self._last_id + 1
+                if last_event_id > self._last_id or last_event_id < oldest - 1:
+                    state = 'resync'
+                    self._stats['resyncs'] += 1
+                else:
+                    state = 'replayed'
+                    for event_id, event_type, data, key in self._history:
+                        if event_id > last_event_id:
+                            subscription._push(event_id, event_type, data, key)
+                            self._stats['replayed'] += 1
+            self._subscribers.add(subscription)
+            self._stats['subscribed'] += 1
+            return subscription, state
+
+    def _unsubscribe(self, subscription):
+        with self._changed:
+            subscription.closed = True
+            self._subscribers.discard(subscription)
+            self._changed.notify_all()
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def last_id(self):
+        return self._last_id
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            return {
+                **self._stats,
+                'last_event_id': self._last_id,
+                'subscribers': len(subscribers),
+                'pending_max': max((len(s._pending) for s in subscribers), default=0),
+                'coalesced': sum(s.stats['coalesced'] for s in subscribers),
+                'overflows': sum(s.stats['overflows'] for s in subscribers)
+            }
+
+class DataSignature:
+    """Veritabanından türetilen sürüm imzası; hangi süreç yazarsa yazsın değişir
+
+    Kendi bağlantısında PRAGMA data_version değişmedikçe önceki imza döner
+    (mikrosaniyeler); değiştiyse imza sorgusu yeniden çalıştırılır. data_version
+    sadece başka bağlantıların commit'lerinde değiştiği için bu bağlantı
+    yazma için kullanılmaz.
+    """
+
+    def __init__(self, db_path, sql):
+        self.db_path = db_path
+        self.sql = sql
+        self._conn = None
+        self._version = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._signature is None or version != self._version:
+                # Sürüm önce okunur: arada gelen commit bir sonraki çağrıda yeniden imzalatır
+                self._version = version
+                self._signature = tuple(self._conn.execute(self.sql).fetchone())
+            return self._signature
+
+class DatasetWatcher:
+    """Başka süreçlerin (yükleyiciler) yazmalarını fark eden arka plan iş parçacığı
+
+    Kendi bağlantısında PRAGMA data_version izlenir (başka bir bağlantı commit
+    edince değişir); değiştiyse imza sorguları çalıştırılır ve değişen
+    parçaların adları on_change(names) ile bildirilir. Uygulamanın kendi
+    yazmaları da data_version'ı değiştirir, ancak imzaları değiştirmedikçe
+    bildirim yapılmaz.
+    """
+
+    def __init__(self, db_path, signatures, on_change, interval_s=WATCH_INTERVAL_S):
+        self.db_path = db_path
+        self.signatures = signatures    # ad -> tek satır döndüren SQL
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {'checks': 0, 'signature_checks': 0, 'changes': 0, 'errors': 0}
+
+    def ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='dataset-watcher', daemon=True)
+                self._thread.start()
+
+    def _signature(self, conn):
+        self.stats['signature_checks'] += 1
+        return {name: tuple(conn.execute(sql).fetchone()) for name, sql in self.signatures.items()}
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            signature = self._signature(conn)
+            while True:
+                time.sleep(self.interval_s)
+                self.stats['checks'] += 1
+                try:
+                    current_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current_version == version:
+                        continue
+                    version = current_version
+                    current = self._signature(conn)
+                    changed = [name for name in current if current[name] != signature.get(name)]
+                    signature = current
+                    if changed:
+                        self.stats['changes'] += 1
+                        self.on_change(changed)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠️ Veri seti izleyici hatası: {e}")
+        finally:
+            conn.close()
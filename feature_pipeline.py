@@ -0,0 +1,131 @@
+"""
+Özellik Mühendisliği - SQLite
+Eğitim, yeniden eğitim ve tahmin için ortak özellik hattı
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Özellik şeması değiştiğinde artırılır; modelle birlikte kaydedilir
+FEATURE_SCHEMA_VERSION = 1
+
+FEATURE_COLUMNS = [
+    'hours_since', 'days_since', 'day_of_week', 'is_weekend', 'month', 'season',
+    'capacity', 'container_type_encoded', 'population', 'pop_density', 'area',
+    'avg_tonnage', 'avg_fill_before', 'collection_count', 'capacity_usage_rate'
+]
+
+CONTAINER_TYPE_CODES = {'underground': 4, '770lt': 3, '400lt': 2, 'plastic': 1}
+
+FULL_THRESHOLD = 0.75
+
+# Konteyner + mahalle + tarihsel toplama istatistikleri tek sorguda
+# (geçmiş toplamları container_stats'tan; olay tablosu taranmaz)
+CONTAINER_FEATURE_QUERY = """
+    SELECT
+        c.container_id,
+        c.container_type,
+        c.capacity_liters,
+        c.last_collection_date,
+        c.current_fill_level,
+        c.latitude,
+        c.longitude,
+        c.neighborhood_id,
+        n.neighborhood_name,
+        n.population,
+        n.population_density,
+        n.area_km2,
+        h.tonnage_sum / NULLIF(h.tonnage_count, 0) as avg_tonnage,
+        h.fill_before_sum / NULLIF(h.fill_before_count, 0) as avg_fill_before,
+        h.collection_count
+    FROM containers c
+    LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
+    LEFT JOIN container_stats h ON h.container_id = c.container_id
+"""
+
+def fetch_feature_frame(conn, where='', params=()):
+    """CONTAINER_FEATURE_QUERY sonucunu DataFrame olarak döndür"""
+    cursor = conn.cursor()
+    cursor.execute(CONTAINER_FEATURE_QUERY + (" " + where if where else ""), params)
+    columns = [d[0] for d in cursor.description]
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
+def fetch_training_frame(conn):
+    """Eğitim verisi: toplama geçmişi olan aktif konteynerler"""
+    return fetch_feature_frame(
+        conn, "WHERE c.status = 'active' AND h.collection_count > 0 ORDER BY c.container_id"
+    )
+
+def _numeric_column(values, default):
+    """Boş (None/NaN/0) değerleri varsayılanla doldurulmuş float dizisi"""
+    arr = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float, copy=True)
+    arr[np.isnan(arr) | (arr == 0)] = default
+    return arr
+
+def build_feature_matrix(data, now=None):
+    """DataFrame veya sütun dizilerinden FEATURE_COLUMNS sırasında özellik matrisi
+
+    `data` CONTAINER_FEATURE_QUERY sütun adlarını içeren bir DataFrame ya da
+    {sütun: dizi} sözlüğü olabilir. Tüm hesaplamalar vektöreldir.
+    """
+    now = now or datetime.now()
+    n = len(data['container_type'])
+    if n == 0:
+        return np.empty((0, len(FEATURE_COLUMNS)))
+
+    # Son toplamadan geçen süre (okunamayan tarihler 168 saat sayılır)
+    last_dates = pd.to_datetime(
+        pd.Series(data['last_collection_date'], dtype=object), errors='coerce', format='ISO8601'
+    )
+    hours_since = ((pd.Timestamp(now) - last_dates).dt.total_seconds() / 3600).fillna(168).to_numpy()
+    days_since = hours_since / 24
+
+    # Zaman özellikleri (tüm satırlar için aynı)
+    day_of_week = np.full(n, now.weekday(), dtype=float)
+    is_weekend = np.full(n, int(now.weekday() >= 5), dtype=float)
+    month = np.full(n, now.month, dtype=float)
+    season = np.full(n, (now.month % 12) // 3, dtype=float)
+
+    capacity = _numeric_column(data['capacity_liters'], 770)
+    type_encoded = (
+        pd.Series(data['container_type'], dtype=object)
+        .map(CONTAINER_TYPE_CODES).fillna(2).to_numpy(dtype=float)
+    )
+
+    population = _numeric_column(data['population'], 10000)
+    pop_density = _numeric_column(data['population_density'], 5000)
+    area = _numeric_column(data['area_km2'], 2.0)
+
+    avg_tonnage = _numeric_column(data['avg_tonnage'], 0.5)
+    avg_fill_before = _numeric_column(data['avg_fill_before'], 0.5)
+    collection_count = _numeric_column(data['collection_count'], 10)
+    capacity_usage_rate = avg_tonnage / (capacity / 1000)
+
+    return np.column_stack([
+        hours_since, days_since, day_of_week, is_weekend, month, season,
+        capacity, type_encoded, population, pop_density, area,
+        avg_tonnage, avg_fill_before, collection_count, capacity_usage_rate
+    ])
+
+def build_labels(data, threshold=FULL_THRESHOLD):
+    """Hedef değişken: mevcut doluluk eşiğin üzerinde mi"""
+    fill = pd.to_numeric(pd.Series(data['current_fill_level']), errors='coerce').fillna(0)
+    return (fill >= threshold).astype(int).to_numpy()
+
+def schema_metadata():
+    """Modelle birlikte kaydedilecek şema bilgisi"""
+    return {
+        'feature_schema_version': FEATURE_SCHEMA_VERSION,
+        'feature_columns': list(FEATURE_COLUMNS)
+    }
+
+def is_compatible(model_data):
+    """Kayıtlı modelin özellik şeması bu hatla uyumlu mu"""
+    version = model_data.get('feature_schema_version')
+    if version is not None:
+        return version == FEATURE_SCHEMA_VERSION
+
+    # Şema sürümü olmayan eski kayıtlar: sütun listesi varsa birebir eşleşmeli
+    columns = model_data.get('feature_columns')
+    return columns is None or list(columns) == FEATURE_COLUMNS
@@ -0,0 +1,332 @@
+"""
+Doluluk Tahmini (Zaman Serisi)
+Konteyner başına dolum hızı + mahalle/gün ve ay mevsimselliği ile
+ileri tarihli doluluk ve eşiğe kalan süre tahmini
+
+Model: doluluk(t) = doluluk(şimdi) + hız_c * ∫ mevsim(τ) dτ
+- hız_c: konteynerin toplama aralıklarındaki (fill_level_before / geçen saat)
+  medyanı; az gözlemli konteynerler (mahalle, tip) medyanına çekilir.
+- mevsim(τ) = ay_katsayısı(τ) * gün_katsayısı(mahalle, τ). Ay katsayısı
+  tonnage_statistics'teki günlük ortalama tonajdan, gün katsayısı
+  collection_events tonajlarının neighbor_days_rotations.csv takvimine göre
+  kapsadığı günlere dağıtılmasıyla bulunur.
+
+Tahmin "toplanmazsa" yörüngesidir; takvimdeki sonraki toplama ayrıca
+döndürülür, eşik ondan önce aşılıyorsa taşma riski vardır.
+"""
+
+import calendar
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from load_data_sqlite import neighborhood_key
+
+ROTATIONS_CSV = 'data/neighbor_days_rotations.csv'
+
+HORIZON_HOURS = 14 * 24           # Saatlik mevsim profili ufku; ötesi ortalama katsayıyla uzatılır
+COLLECTION_HOUR = 7               # Takvimli toplamaların varsayılan saati
+DEFAULT_FILL_RATE = 0.75 / 72     # Hiç veri yoksa: 3 günde %75 (saatlik)
+MIN_INTERVAL_HOURS = 1.0
+RATE_PRIOR_WEIGHT = 3             # Konteyner hızını grup medyanına çeken sanal gözlem sayısı
+DOW_PRIOR_WEIGHT = 20             # Gün katsayısını 1'e çeken sanal olay sayısı
+MIN_FACTOR = 0.05                 # Kümülatif profilin kesin artan kalması için alt sınır
+
+WEEKDAYS = {name: i for i, name in enumerate(calendar.day_name)}  # Monday=0
+TURKISH_MONTHS = {
+    'OCAK': 1, 'ŞUBAT': 2, 'MART': 3, 'NİSAN': 4, 'MAYIS': 5, 'HAZİRAN': 6,
+    'TEMMUZ': 7, 'AĞUSTOS': 8, 'EYLÜL': 9, 'EKİM': 10, 'KASIM': 11, 'ARALIK': 12
+}
+
+INTERVAL_QUERY = """
+    SELECT container_id, fill_level_before, hours FROM (
+        SELECT
+            container_id,
+            fill_level_before,
+            (julianday(collection_date) - julianday(LAG(collection_date) OVER (
+                PARTITION BY container_id ORDER BY collection_date
+            ))) * 24 AS hours
+        FROM collection_events
+        WHERE container_id IS NOT NULL
+    )
+    WHERE hours >= ? AND fill_level_before IS NOT NULL
+"""
+
+# {neighborhood}: ham kayıt aktarımı mahalle bazlı olaylar için e.neighborhood_id ekler
+NEIGHBORHOOD_DOW_QUERY = """
+    SELECT
+        {neighborhood} AS neighborhood_id,
+        CAST(strftime('%w', e.collection_date) AS INTEGER) AS dow,
+        AVG(e.tonnage_collected),
+        COUNT(*)
+    FROM collection_events e
+    LEFT JOIN containers c ON c.container_id = e.container_id
+    WHERE e.tonnage_collected IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+CONTAINER_GROUP_QUERY = """
+    SELECT c.container_id, c.neighborhood_id, c.container_type
+    FROM containers c
+"""
+
+def parse_weekdays(text):
+    """'Monday, Wednesday' -> {0, 2}; tanınmayan adlar yok sayılır"""
+    return frozenset(WEEKDAYS[d.strip().capitalize()] for d in str(text).split(',') if d.strip().capitalize() in WEEKDAYS)
+
+def load_rotations(path=ROTATIONS_CSV):
+    """Normalize mahalle adı -> takvimli toplama günleri (0=Pazartesi). Takvimsiz mahalleler yok sayılır"""
+    try:
+        df = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str)
+    except FileNotFoundError:
+        return {}
+    schedules = {}
+    for name, days in zip(df.iloc[:, 0], df['Collection Frequency (Truck Type)']):
+        weekdays = parse_weekdays(days)
+        if weekdays:
+            schedules[neighborhood_key(name)] = weekdays
+    return schedules
+
+def coverage_matrix(schedule):
+    """cover[d, k]: d gününde yapılan toplamanın k gününde üretilen atığı kapsama payı
+
+    Toplama, takvimdeki bir önceki toplama gününden sonraki günlerin
+    atığını taşır; takvim yoksa her toplama yalnızca kendi gününü kapsar.
+    """
+    cover = np.zeros((7, 7))
+    for d in range(7):
+        days = [d]
+        if schedule:
+            for back in range(1, 7):
+                k = (d - back) % 7
+                if k in schedule:
+                    break
+                days.append(k)
+        cover[d, days] = 1.0 / len(days)
+    return cover
+
+def month_factors(conn):
+    """Takvim ayı -> günlük ortalama tonajın yıllık ortalamaya oranı (veri yoksa 1)"""
+    daily = {}
+    for month_label, total in conn.execute("SELECT month, total_tonnage FROM tonnage_statistics"):
+        name, _, year = str(month_label).partition('-')
+        month = TURKISH_MONTHS.get(name.strip().upper())
+        if month is None or not year.strip().isdigit() or not total:
+            continue
+        days = calendar.monthrange(int(year), month)[1]
+        daily.setdefault(month, []).append(total / days)
+    factors = np.ones(13)
+    if daily:
+        means = {m: float(np.mean(v)) for m, v in daily.items()}
+        overall = float(np.mean(list(means.values())))
+        for m, value in means.items():
+            factors[m] = value / overall
+    return factors
+
+class FillForecaster:
+    """Şehir genelinde vektörel doluluk tahmini
+
+    fit() olay tablosunu bir kez tarar (dakikalar düzeyinde yenilenir);
+    forecast() sadece o anki doluluklarla çalışır ve tüm şehri tek
+    çağrıda hesaplar.
+    """
+
+    def __init__(self, rotations_path=ROTATIONS_CSV, horizon_hours=HORIZON_HOURS):
+        self.rotations_path = rotations_path
+        self.horizon_hours = horizon_hours
+        self.rates = pd.Series(dtype=float)          # container_id -> saatlik dolum hızı
+        self.rate_observations = pd.Series(dtype=float)
+        self.month_factor = np.ones(13)
+        self.dow_factor = {}                          # neighborhood_id -> 7 katsayı (0=Pazartesi)
+        self.schedules = {}                           # neighborhood_id -> takvimli günler
+        self.default_rate = DEFAULT_FILL_RATE
+        self.fitted_at = None
+        self._lock = threading.Lock()
+
+    def fit(self, conn):
+        """Hızları ve mevsim katsayılarını veritabanından yeniden hesapla"""
+        started = time.perf_counter()
+        rotations = load_rotations(self.rotations_path)
+        neighborhoods = conn.execute("SELECT neighborhood_id, neighborhood_name FROM neighborhoods").fetchall()
+        schedules = {}
+        for nid, name in neighborhoods:
+            schedule = rotations.get(neighborhood_key(name))
+            if schedule:
+                schedules[nid] = schedule
+
+        # Konteyner başına aralık hızları
+        intervals = pd.DataFrame(
+            conn.execute(INTERVAL_QUERY, (MIN_INTERVAL_HOURS,)).fetchall(),
+            columns=['container_id', 'fill_before', 'hours']
+        )
+        groups = pd.DataFrame(
+            conn.execute(CONTAINER_GROUP_QUERY).fetchall(),
+            columns=['container_id', 'neighborhood_id', 'container_type']
+        ).set_index('container_id')
+
+        intervals['rate'] = intervals['fill_before'] / intervals['hours']
+        per_container = intervals.groupby('container_id')['rate'].agg(['median', 'size'])
+        default_rate = float(intervals['rate'].median()) if len(intervals) else DEFAULT_FILL_RATE
+
+        # Grup medyanına büzülme: az gözlemli konteynerler grup hızına yakın kalır
+        frame = groups.join(per_container, how='left')
+        group_median = (
+            frame.groupby(['neighborhood_id', 'container_type'], dropna=False)['median']
+            .transform('median').fillna(default_rate)
+        )
+        n = frame['size'].fillna(0)
+        rates = (frame['median'].fillna(0) * n + group_median * RATE_PRIOR_WEIGHT) / (n + RATE_PRIOR_WEIGHT)
+
+        # Mahalle gün katsayıları: toplanan tonaj takvime göre kapsadığı günlere dağıtılır
+        event_columns = {row[1] for row in conn.execute("PRAGMA table_info(collection_events)")}
+        neighborhood_expr = (
+            'COALESCE(c.neighborhood_id, e.neighborhood_id)' if 'neighborhood_id' in event_columns else 'c.neighborhood_id'
+        )
+        dow_rows = conn.execute(NEIGHBORHOOD_DOW_QUERY.format(neighborhood=neighborhood_expr)).fetchall()
+        by_neighborhood = {}
+        for nid, sqlite_dow, avg_tonnage, count in dow_rows:
+            if nid is None:
+                continue
+            by_neighborhood.setdefault(nid, []).append(((sqlite_dow - 1) % 7, avg_tonnage, count))
+        dow_factor = {}
+        for nid, rows in by_neighborhood.items():
+            cover = coverage_matrix(schedules.get(nid))
+            generated = np.zeros(7)
+            weight = np.zeros(7)
+            for dow, avg_tonnage, count in rows:
+                generated += cover[dow] * avg_tonnage * count
+                weight += (cover[dow] > 0) * count
+            seen = weight > 0
+            if not seen.any():
+                continue
+            raw = np.ones(7)
+            raw[seen] = generated[seen] / weight[seen]
+            raw[seen] /= raw[seen].mean()
+            shrink = weight / (weight + DOW_PRIOR_WEIGHT)
+            dow_factor[nid] = np.maximum(1 + (raw - 1) * shrink, MIN_FACTOR)
+
+        month_factor = np.maximum(month_factors(conn), MIN_FACTOR)
+
+        with self._lock:
+            self.rates = rates.astype(float)
+            self.rate_observations = n
+            self.default_rate = default_rate
+            self.dow_factor = dow_factor
+            self.schedules = schedules
+            self.month_factor = month_factor
+            self.fitted_at = datetime.now()
+        print(f"✓ Doluluk tahmini: {len(rates)} konteyner, {len(intervals)} aralık "
+              f"({time.perf_counter() - started:.2f}s)")
+        return self
+
+    def container_rates(self, container_ids):
+        """Konteynerlerin saatlik dolum hızları (verisi olmayanlara şehir medyanı)"""
+        with self._lock:
+            rates_by_id = self.rates
+            default_rate = self.default_rate
+        rates = rates_by_id.reindex(container_ids).fillna(default_rate).to_numpy(dtype=float)
+        return np.maximum(rates, 1e-9)
+
+    def hourly_factors(self, neighborhood_ids, start, hours):
+        """Mahalle başına saatlik mevsim katsayıları, (len(neighborhood_ids), hours)
+
+        İlk sütun `start`ın bulunduğu saatin başıdır.
+        """
+        stamps = pd.Timestamp(start).floor('h') + pd.to_timedelta(np.arange(hours), unit='h')
+        weekday = stamps.weekday.to_numpy()
+        month_factor = self.month_factor[stamps.month.to_numpy()]
+        factors = np.empty((len(neighborhood_ids), hours))
+        for i, nid in enumerate(neighborhood_ids):
+            dow = self.dow_factor.get(nid)
+            factors[i] = month_factor * (dow[weekday] if dow is not None else 1.0)
+        return factors
+
+    def _profiles(self, neighborhood_ids, now):
+        """Mahalle başına saatlik kümülatif mevsim profili ve sonraki takvimli toplama saati
+
+        Profil içinde bulunulan saatin başından başlar; `offset` şimdinin
+        o saat içindeki konumudur (saat cinsinden).
+        """
+        start = pd.Timestamp(now).floor('h')
+        stamps = start + pd.to_timedelta(np.arange(self.horizon_hours), unit='h')
+        weekday = stamps.weekday.to_numpy()
+        hour_of_day = stamps.hour.to_numpy()
+
+        factors = self.hourly_factors(neighborhood_ids, start, self.horizon_hours)
+        next_collection = np.full(len(neighborhood_ids), np.nan)
+        offset = (pd.Timestamp(now) - start).total_seconds() / 3600
+        for i, nid in enumerate(neighborhood_ids):
+            schedule = self.schedules.get(nid)
+            if schedule:
+                due = np.flatnonzero(np.isin(weekday, list(schedule)) & (hour_of_day == COLLECTION_HOUR))
+                due = due[due >= offset]
+                if len(due):
+                    next_collection[i] = due[0] - offset
+
+        cumulative = np.zeros((len(neighborhood_ids), self.horizon_hours + 1))
+        np.cumsum(factors, axis=1, out=cumulative[:, 1:])
+        return cumulative, factors.mean(axis=1), next_collection, offset
+
+    def forecast(self, frame, horizons=(), threshold=0.75, now=None):
+        """Konteynerler için doluluk tahmini
+
+        frame: container_id, neighborhood_id, current_fill_level sütunları
+        horizons: saat cinsinden ileri zamanlar (ör. [6, 24, 48])
+        Dönüş: container_id sırasında sütun dizileri içeren sözlük
+        """
+        now = now or datetime.now()
+        n = len(frame)
+        container_ids = frame['container_id'].to_numpy()
+        fill = pd.to_numeric(frame['current_fill_level'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        rates = self.container_rates(container_ids)
+
+        neighborhood_codes, neighborhood_ids = pd.factorize(frame['neighborhood_id'], use_na_sentinel=False)
+        cumulative, mean_factor, next_collection, offset = self._profiles(list(neighborhood_ids), now)
+        H = self.horizon_hours
+        end = cumulative[neighborhood_codes, H]
+        mean = mean_factor[neighborhood_codes]
+
+        # (n, H) matris kurulmaz: profil mahalle başına tutulur, satırlar kod ile indekslenir
+        def cumulative_at(position):
+            inside = np.clip(position, 0, H)
+            lo = np.minimum(np.floor(inside).astype(int), H - 1)
+            frac = inside - lo
+            value = cumulative[neighborhood_codes, lo] * (1 - frac) + cumulative[neighborhood_codes, lo + 1] * frac
+            return value + np.maximum(position - H, 0) * mean
+
+        base = cumulative_at(np.full(n, offset))
+
+        result = {
+            'container_id': container_ids,
+            'current_fill_level': fill,
+            'fill_rate_per_hour': rates,
+            'forecast': {
+                h: np.clip(fill + rates * (cumulative_at(np.full(n, offset + max(float(h), 0))) - base), 0, None)
+                for h in horizons
+            }
+        }
+
+        # Eşiğe kalan süre: kümülatif profil base + hedefe ulaştığı an. Mahalle satırları
+        # kaydırılıp düzleştirilerek tüm şehir tek searchsorted ile çözülür.
+        goal = base + (threshold - fill) / rates
+        hours_left = np.zeros(n)
+        pending = goal > base
+        within = pending & (goal <= end)
+        beyond = pending & ~within
+        hours_left[beyond] = H - offset + (goal[beyond] - end[beyond]) / mean[beyond]
+        if within.any():
+            span = float(cumulative[:, H].max()) + 1
+            shifted = (cumulative + np.arange(len(neighborhood_ids))[:, None] * span).ravel()
+            codes = neighborhood_codes[within]
+            position = np.searchsorted(shifted, goal[within] + codes * span) - codes * (H + 1)
+            position = np.clip(position, 1, H)
+            lower = cumulative[codes, position - 1]
+            upper = cumulative[codes, position]
+            hours_left[within] = position - 1 + (goal[within] - lower) / np.maximum(upper - lower, 1e-12) - offset
+        hours_left = np.maximum(hours_left, 0)
+        result['hours_until_threshold'] = hours_left
+        result['hours_until_scheduled_collection'] = next_collection[neighborhood_codes]
+        return result
@@ -0,0 +1,422 @@
+"""
+Filo Senaryo Simülasyonu
+Konteyner dolulukları üzerinde saatlik adımlı, tüm şehir için vektörel simülasyon
+
+Doluluklar fill_forecast ile aynı modelle ilerler: konteyner dolum hızı ×
+mahalle/gün ve ay katsayısı. Toplamalar her gün COLLECTION_HOUR'da yapılır:
+- Yerüstü konteynerler neighbor_days_rotations.csv takvimindeki günlerde,
+  mahallenin kamyon tipiyle (küçük / büyük) toplanır.
+- Yeraltı konteynerleri vinçli araçlarla, mahallenin vinç rotasyonu (gün)
+  aralığıyla; rotasyonu olmayan mahallelerde kamyon takvimiyle toplanır.
+Her araç havuzunun günlük kapasitesi araç sayısı × vardiya saatidir; sırası
+gelen konteynerler en doludan başlayarak kapasite yettiği kadar boşaltılır,
+kalanlar bir sonraki toplamaya kalır.
+
+Süre: konteyner başına durak süresi + dolan her araç için döküm seferi
+(kapasiteler truck_types.csv'den). Mesafe: mahalle içi tur uzunluğu
+Beardwood–Halton–Hammersley yaklaşımıyla (0.7124·√(n·A), A konteynerlerin
+kapladığı alan) + sefer başına döküm sahası gidiş-dönüşü.
+
+Toplamalar arasında büyüme monoton olduğundan doluluk günlük bloklar
+halinde (konteyner × saat matrisi) ilerletilir; 30 günlük şehir geneli
+senaryo 30 blok ve havuz başına 30 sıralamadır.
+"""
+
+import json
+import math
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fill_forecast import COLLECTION_HOUR, ROTATIONS_CSV, parse_weekdays
+from load_data_sqlite import FLEET_TYPE_MAP, neighborhood_key
+
+TRUCK_TYPES_CSV = 'data/truck_types.csv'
+
+SMALL, LARGE, CRANE = 'Small Garbage Truck', 'Large Garbage Truck', 'Crane Vehicle'
+VEHICLE_TYPES = (SMALL, LARGE, CRANE)
+# API'deki filo anahtarları (fleet_summary ile aynı)
+FLEET_KEYS = {'small_trucks': SMALL, 'large_trucks': LARGE, 'crane_vehicles': CRANE}
+CRANE_CONTAINER_TYPE = 'underground'
+
+MAX_DAYS = 92
+DEFAULT_DAYS = 30
+SHIFT_HOURS = 8
+DEFAULT_SCHEDULE = frozenset({0, 2, 4})      # Takvimi olmayan mahalleler: Pzt/Çrş/Cum
+# Haftalık toplama sıklığı senaryoları (days_per_week) için eşit aralıklı günler
+WEEKLY_PATTERNS = {
+    1: frozenset({0}),
+    2: frozenset({0, 3}),
+    3: frozenset({0, 2, 4}),
+    4: frozenset({0, 1, 3, 4}),
+    5: frozenset(range(5)),
+    6: frozenset(range(6)),
+    7: frozenset(range(7))
+}
+BIN_DENSITY_T_PER_M3 = 0.12                  # Sıkıştırılmamış evsel atık
+SERVICE_MIN = {SMALL: 1.5, LARGE: 2.0, CRANE: 8.0}   # Durak başına (duraklar arası sürüş dahil)
+DISPOSAL_TRIP_H = 1.5
+DISPOSAL_TRIP_KM = 30.0
+TOUR_CONSTANT = 0.7124
+ROAD_FACTOR = 1.3                            # Kuş uçuşu -> yol mesafesi
+MIN_AREA_KM2 = 0.05
+FUEL_L_PER_KM = {SMALL: 0.20, LARGE: 0.35, CRANE: 0.45}
+FUEL_PRICE = 40.74                           # TL/L
+KM_PER_DEG_LAT = 111.32
+
+SIM_CONTAINER_QUERY = """
+    SELECT c.container_id, c.neighborhood_id, n.neighborhood_name, c.container_type,
+           c.capacity_liters, c.current_fill_level, c.latitude, c.longitude
+    FROM containers c
+    LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
+    WHERE c.status = 'active'
+"""
+
+SIM_RUN_COLUMNS = {'results': 'TEXT'}
+
+def ensure_sim_schema(conn):
+    """simulation_runs tablosuna sonuç sütununu ekle (eski veritabanları için)"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(simulation_runs)")}
+    if not columns:
+        return
+    for name, sql_type in SIM_RUN_COLUMNS.items():
+        if name not in columns:
+            conn.execute(f"ALTER TABLE simulation_runs ADD COLUMN {name} {sql_type}")
+
+def load_truck_types(path=TRUCK_TYPES_CSV):
+    """Araç tipi -> sefer kapasitesi (ton, min-max ortalaması)"""
+    capacities = {SMALL: 4.5, LARGE: 8.0, CRANE: 11.5}
+    try:
+        df = pd.read_csv(path)
+    except FileNotFoundError:
+        return capacities
+    for name, low, high in zip(df['vehicle_type'], df['capacity_ton_min'], df['capacity_ton_max']):
+        capacities[name.strip()] = (float(low) + float(high)) / 2
+    return capacities
+
+def load_rotation_table(path=ROTATIONS_CSV):
+    """Normalize mahalle adı -> kamyon tipi, takvimli günler, vinç rotasyonu (gün; 0 = yok)"""
+    try:
+        df = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str)
+    except FileNotFoundError:
+        return {}
+    table = {}
+    for name, truck_type, days, crane_used, crane_days in zip(
+        df.iloc[:, 0], df['Garbage Truck Type'], df['Collection Frequency (Truck Type)'],
+        df['Is Crane Used'], df['Crane rotation days']
+    ):
+        crane_days = int(crane_days) if str(crane_days).strip().isdigit() else 0
+        table[neighborhood_key(name)] = {
+            'truck_type': truck_type.strip() if truck_type.strip() in (SMALL, LARGE) else LARGE,
+            'days': parse_weekdays(days),
+            'crane_rotation_days': crane_days if str(crane_used).strip().upper() == 'TRUE' else 0
+        }
+    return table
+
+def fleet_counts(conn):
+    """Aktif araç sayıları (vehicles tablosu, tip adı -> adet)"""
+    names = {type_id: name for name, type_id in FLEET_TYPE_MAP.items()}
+    counts = dict.fromkeys(VEHICLE_TYPES, 0)
+    for type_id, count in conn.execute(
+        "SELECT type_id, COUNT(*) FROM vehicles WHERE status = 'active' GROUP BY type_id"
+    ):
+        if type_id in names:
+            counts[names[type_id]] = count
+    return counts
+
+def hourly_costs(conn):
+    """Araç tipi -> saatlik maliyet (vehicle_types tablosu)"""
+    names = {type_id: name for name, type_id in FLEET_TYPE_MAP.items()}
+    return {
+        names[type_id]: float(cost)
+        for type_id, cost in conn.execute("SELECT type_id, hourly_cost FROM vehicle_types")
+        if type_id in names
+    }
+
+def floor_start(start=None):
+    """Simülasyon başlangıcı: saat başına yuvarlanmış datetime (verilmezse şimdi)"""
+    return pd.Timestamp(start or datetime.now()).floor('h').to_pydatetime()
+
+class FleetSimulator:
+    """Şehir durumu bir kez yüklenir, senaryolar run() ile birbirinden bağımsız koşar"""
+
+    # Süreçler arası paylaşılan durum: büyük diziler ve küçük (pickle edilen) meta veri
+    STATE_ARRAYS = ('container_ids', 'codes', 'capacity_m3', 'initial_fill', 'rates', 'is_crane', 'area_km2')
+    STATE_META = ('neighborhood_ids', 'neighborhood_names', 'rotations', 'truck_capacity', 'hourly_cost', 'fleet')
+
+    def __init__(self, rotations_path=ROTATIONS_CSV, truck_types_path=TRUCK_TYPES_CSV):
+        self.rotations = load_rotation_table(rotations_path)
+        self.truck_capacity = load_truck_types(truck_types_path)
+        self.forecaster = None
+        self._factors = None      # ((başlangıç, saat), mahalle x saat katsayı matrisi)
+
+    def prepare(self, conn, forecaster):
+        """Konteynerler, mahalle takvimleri ve filo; forecaster eğitilmiş FillForecaster olmalı"""
+        rows = conn.execute(SIM_CONTAINER_QUERY).fetchall()
+        frame = pd.DataFrame(rows, columns=[
+            'container_id', 'neighborhood_id', 'neighborhood_name', 'container_type',
+            'capacity_liters', 'fill', 'lat', 'lng'
+        ])
+        codes, neighborhood_ids = pd.factorize(frame['neighborhood_id'], use_na_sentinel=False)
+        names = frame.groupby(codes)['neighborhood_name'].first().reindex(range(len(neighborhood_ids)))
+
+        self.forecaster = forecaster
+        self.container_ids = frame['container_id'].to_numpy()
+        self.codes = codes
+        self.neighborhood_ids = list(neighborhood_ids)
+        self.neighborhood_names = [name if isinstance(name, str) else None for name in names]
+        self.capacity_m3 = pd.to_numeric(frame['capacity_liters'], errors='coerce').fillna(0).to_numpy(dtype=float) / 1000
+        self.initial_fill = pd.to_numeric(frame['fill'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        self.rates = forecaster.container_rates(self.container_ids)
+        self.is_crane = (frame['container_type'] == CRANE_CONTAINER_TYPE).to_numpy()
+
+        # Mahalle alanı: konteynerlerin kapladığı dikdörtgen (km²)
+        lat = pd.to_numeric(frame['lat'], errors='coerce')
+        lng = pd.to_numeric(frame['lng'], errors='coerce')
+        extent = pd.DataFrame({'code': codes, 'lat': lat, 'lng': lng}).groupby('code').agg(['min', 'max'])
+        extent = extent.reindex(range(len(neighborhood_ids)))
+        mid_lat = np.radians(((extent['lat']['min'] + extent['lat']['max']) / 2).fillna(40.0))
+        height = (extent['lat']['max'] - extent['lat']['min']).fillna(0) * KM_PER_DEG_LAT
+        width = (extent['lng']['max'] - extent['lng']['min']).fillna(0) * KM_PER_DEG_LAT * np.cos(mid_lat)
+        self.area_km2 = np.maximum((height * width).to_numpy(dtype=float), MIN_AREA_KM2)
+
+        self.fleet = fleet_counts(conn)
+        self.hourly_cost = hourly_costs(conn)
+        self._factors = None
+        return self
+
+    def hourly_factors(self, start, hours):
+        """Mahalle x saat mevsim katsayıları; aynı (başlangıç, süre) için bir kez hesaplanır"""
+        key = (start, hours)
+        if self._factors is None or self._factors[0] != key:
+            if self.forecaster is None:
+                # from_state ile kurulan simülatör sadece dışa aktarılan aralığı bilir
+                exported = self._factors[0] if self._factors else None
+                raise ValueError(f"Katsayılar {exported} için dışa aktarıldı, {key} istendi (forecaster yok)")
+            self._factors = (key, self.forecaster.hourly_factors(self.neighborhood_ids, start, hours))
+        return self._factors[1]
+
+    def export_state(self, start, hours):
+        """(diziler, meta) - paylaşımlı bellekle başka süreçlere taşımak için"""
+        arrays = {name: getattr(self, name) for name in self.STATE_ARRAYS}
+        arrays['factors'] = self.hourly_factors(start, hours)
+        meta = {name: getattr(self, name) for name in self.STATE_META}
+        meta['factors_key'] = (start, hours)
+        return arrays, meta
+
+    @classmethod
+    def from_state(cls, arrays, meta):
+        """export_state çıktısından simülatör (diziler kopyalanmaz, salt okunur kullanılır)"""
+        simulator = cls.__new__(cls)
+        simulator.forecaster = None
+        for name in cls.STATE_ARRAYS:
+            setattr(simulator, name, arrays[name])
+        for name in cls.STATE_META:
+            setattr(simulator, name, meta[name])
+        simulator._factors = (meta['factors_key'], arrays['factors'])
+        return simulator
+
+    def _neighborhood_plan(self, schedule_overrides, crane_rotation_days, days_per_week=None):
+        """Mahalle başına (7 günlük takvim maskesi, kamyon tipi, vinç rotasyonu)
+
+        days_per_week verilirse tüm mahalleler o sıklıkta (WEEKLY_PATTERNS) toplanır;
+        mahalle bazlı schedule_overrides yine önceliklidir.
+        """
+        n = len(self.neighborhood_ids)
+        schedule = np.zeros((n, 7), dtype=bool)
+        truck_type = np.empty(n, dtype=object)
+        crane_rotation = np.zeros(n, dtype=int)
+        for i, name in enumerate(self.neighborhood_names):
+            key = neighborhood_key(name) if name else None
+            rotation = self.rotations.get(key, {})
+            days = (
+                schedule_overrides.get(key)
+                or (WEEKLY_PATTERNS[days_per_week] if days_per_week else None)
+                or rotation.get('days')
+                or DEFAULT_SCHEDULE
+            )
+            schedule[i, list(days)] = True
+            truck_type[i] = rotation.get('truck_type', LARGE)
+            crane_rotation[i] = rotation.get('crane_rotation_days', 0)
+        if crane_rotation_days is not None:
+            crane_rotation[:] = crane_rotation_days
+        return schedule, truck_type, crane_rotation
+
+    def run(self, days=DEFAULT_DAYS, start=None, fleet=None, shift_hours=SHIFT_HOURS,
+            collect_threshold=0.0, schedule_overrides=None, crane_rotation_days=None, days_per_week=None,
+            rate_uncertainty=0.0, seed=None, density=BIN_DENSITY_T_PER_M3, fuel_price=FUEL_PRICE):
+        """Senaryoyu çalıştır
+
+        fleet: tip adı -> araç sayısı (verilmeyen tipler mevcut filodan)
+        collect_threshold: takvimli günde sadece bu doluluğun üstündekiler toplanır
+        schedule_overrides: normalize mahalle adı -> gün kümesi (0=Pazartesi)
+        days_per_week: tüm mahalleler için haftalık toplama sayısı (1-7)
+        rate_uncertainty: dolum hızlarına uygulanan log-normal gürültünün sigması
+            (ortalama korunur); seed ile tekrarlanabilir
+        """
+        started = time.perf_counter()
+        start = floor_start(start)
+        hours = int(days) * 24
+        fleet = {**self.fleet, **(fleet or {})}
+        if days_per_week is not None and days_per_week not in WEEKLY_PATTERNS:
+            raise ValueError(f"days_per_week 1-7 olmalı: {days_per_week}")
+        schedule, truck_type, crane_rotation = self._neighborhood_plan(
+            {neighborhood_key(k): frozenset(v) for k, v in (schedule_overrides or {}).items()},
+            crane_rotation_days, days_per_week
+        )
+
+        codes = self.codes
+        n = len(codes)
+        fill = self.initial_fill.copy()
+        rates = self.rates
+        if rate_uncertainty > 0:
+            rng = np.random.default_rng(seed)
+            rates = rates * rng.lognormal(-rate_uncertainty ** 2 / 2, rate_uncertainty, n)
+        factors = self.hourly_factors(start, hours)
+
+        # Konteyner -> araç havuzu
+        pools = {}
+        truck_of_container = truck_type[codes]
+        for vehicle_type in VEHICLE_TYPES:
+            if vehicle_type == CRANE:
+                mask = self.is_crane
+            else:
+                mask = ~self.is_crane & (truck_of_container == vehicle_type)
+            if mask.any():
+                pools[vehicle_type] = mask
+        # Yeraltı konteynerleri: vinç rotasyonu olan mahallelerde rotasyonla, diğerlerinde takvimle
+        crane_phase = codes % np.maximum(crane_rotation[codes], 1)
+
+        overflow_hours = np.zeros(n)
+        overflow_events = 0
+        totals = {
+            vehicle_type: {'vehicles': int(fleet.get(vehicle_type, 0)), 'truck_hours': 0.0, 'km': 0.0,
+                           'trips': 0, 'tons': 0.0, 'collections': 0, 'missed': 0}
+            for vehicle_type in VEHICLE_TYPES
+        }
+        daily = []
+
+        def grow(a, b):
+            # Toplamalar arası büyüme monoton: blok sonundaki doluluk ve 1'in üstünde geçen saatler
+            nonlocal fill, overflow_events
+            if b <= a:
+                return
+            cumulative = np.cumsum(factors[:, a:b], axis=1)[codes] * rates[:, None]
+            trajectory = fill[:, None] + cumulative
+            overflow_hours[:] += (trajectory > 1.0).sum(axis=1)
+            end = trajectory[:, -1]
+            overflow_events += int(np.count_nonzero((fill <= 1.0) & (end > 1.0)))
+            fill = end
+
+        first_collection = (COLLECTION_HOUR - start.hour) % 24
+        collection_hours = range(first_collection, hours, 24)
+        previous = 0
+        for t in collection_hours:
+            grow(previous, t)
+            previous = t
+            moment = start + timedelta(hours=t)
+            day_index = t // 24
+            weekday = moment.weekday()
+            scheduled_today = schedule[:, weekday][codes]
+            crane_due = np.where(
+                crane_rotation[codes] > 0,
+                (day_index % np.maximum(crane_rotation[codes], 1)) == crane_phase,
+                scheduled_today
+            )
+            day = {'date': moment.date().isoformat(), 'collected_tons': 0.0, 'truck_hours': 0.0, 'km': 0.0}
+
+            for vehicle_type, pool in pools.items():
+                due = pool & (crane_due if vehicle_type == CRANE else scheduled_today)
+                if collect_threshold > 0:
+                    due &= fill >= collect_threshold
+                candidates = np.flatnonzero(due)
+                if len(candidates) == 0:
+                    continue
+                stats = totals[vehicle_type]
+                capacity = self.truck_capacity[vehicle_type]
+                available = stats['vehicles'] * shift_hours
+
+                # En dolu konteyner önce; durak + payına düşen döküm seferi süresi kapasiteye sığana kadar
+                order = candidates[np.argsort(-fill[candidates], kind='stable')]
+                mass = np.minimum(fill[order], 1.0) * self.capacity_m3[order] * density
+                service = SERVICE_MIN[vehicle_type] / 60 + mass / capacity * DISPOSAL_TRIP_H
+                served_count = int(np.searchsorted(np.cumsum(service), available, side='right'))
+                served = order[:served_count]
+
+                tons = float(mass[:served_count].sum())
+                trips = math.ceil(tons / capacity) if tons > 0 else 0
+                per_neighborhood = np.bincount(codes[served], minlength=len(self.neighborhood_ids))
+                visited = per_neighborhood > 0
+                tour_km = ROAD_FACTOR * TOUR_CONSTANT * np.sqrt(per_neighborhood[visited] * self.area_km2[visited]).sum()
+                km = float(tour_km) + trips * DISPOSAL_TRIP_KM
+                truck_hours = float(service[:served_count].sum())
+
+                fill[served] = 0.0
+                stats['truck_hours'] += truck_hours
+                stats['km'] += km
+                stats['trips'] += trips
+                stats['tons'] += tons
+                stats['collections'] += served_count
+                stats['missed'] += len(order) - served_count
+                day['collected_tons'] += tons
+                day['truck_hours'] += truck_hours
+                day['km'] += km
+
+            day['overflowing'] = int(np.count_nonzero(fill > 1.0))
+            daily.append(day)
+        grow(previous, hours)
+
+        return self._summarize(days, start, shift_hours, fuel_price, totals, daily, fill,
+                               overflow_hours, overflow_events, time.perf_counter() - started)
+
+    def _summarize(self, days, start, shift_hours, fuel_price, totals, daily, fill,
+                   overflow_hours, overflow_events, elapsed):
+        by_type = {}
+        for vehicle_type, stats in totals.items():
+            fuel = stats['km'] * FUEL_L_PER_KM[vehicle_type]
+            cost = stats['truck_hours'] * self.hourly_cost.get(vehicle_type, 0.0) + fuel * fuel_price
+            available = stats['vehicles'] * shift_hours * days
+            by_type[vehicle_type] = {
+                **{k: round(v, 2) if isinstance(v, float) else v for k, v in stats.items()},
+                'fuel_liters': round(fuel, 1),
+                'cost': round(cost, 2),
+                'utilization': round(stats['truck_hours'] / available, 4) if available else None
+            }
+
+        container_hours = len(fill) * days * 24
+        for day in daily:
+            for key in ('collected_tons', 'truck_hours', 'km'):
+                day[key] = round(day[key], 2)
+        return {
+            'days': days,
+            'start': start.isoformat(),
+            'containers': len(fill),
+            'fleet': {vehicle_type: stats['vehicles'] for vehicle_type, stats in totals.items()},
+            'overflow_events': overflow_events,
+            'containers_overflowed': int(np.count_nonzero(overflow_hours)),
+            'overflow_container_hours': int(overflow_hours.sum()),
+            'overflow_rate': round(float(overflow_hours.sum()) / container_hours, 4) if container_hours else 0.0,
+            'overflowing_at_end': int(np.count_nonzero(fill > 1.0)),
+            'collections': sum(s['collections'] for s in totals.values()),
+            'missed_collections': sum(s['missed'] for s in totals.values()),
+            'collected_tons': round(sum(s['tons'] for s in totals.values()), 2),
+            'truck_hours': round(sum(s['truck_hours'] for s in totals.values()), 2),
+            'km': round(sum(s['km'] for s in totals.values()), 1),
+            'fuel_liters': round(sum(t['fuel_liters'] for t in by_type.values()), 1),
+            'cost': round(sum(t['cost'] for t in by_type.values()), 2),
+            'by_vehicle_type': by_type,
+            'daily': daily,
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }
+
+def save_run(conn, scenario, results, admin_user_id=None):
+    """Senaryo ve sonuçları simulation_runs tablosuna yaz, simulation_id döndür"""
+    cursor = conn.execute("""
+        INSERT INTO simulation_runs
+        (admin_user_id, scenario_params, estimated_cost, estimated_time_hours, results, run_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (admin_user_id, json.dumps(scenario, ensure_ascii=False), results['cost'], results['truck_hours'],
+          json.dumps(results, ensure_ascii=False), datetime.now().isoformat()))
+    return cursor.lastrowid
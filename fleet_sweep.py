@@ -0,0 +1,286 @@
+"""
+Filo Boyutlandırma Taramaları
+Parametre ızgarası × rastgele tohumlar üzerinde paralel Monte Carlo simülasyonu
+
+Şehir durumu (konteyner dizileri ve mahalle × saat mevsim katsayıları)
+ana süreçte bir kez hazırlanır ve paylaşımlı belleğe (SharedMemory) konur;
+işçi süreçler açılışta bu bloklara bağlanır, görevler yalnızca küçük senaryo
+sözlükleri taşır. Sonuçlar tamamlandıkça akış halinde döner: her koşu için
+bir 'run' olayı, bir ızgara noktasının tüm tohumları bitince o noktanın
+dağılım özeti ('point'), en sonda genel özet ('summary').
+
+Kullanım:
+    python fleet_sweep.py --small 2,4,6 --large 15,20,25 --crane 10,20 \\
+        --days-per-week 2,3 --uncertainty 0.2 --seeds 20 --out sweep.ndjson
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+import fill_forecast
+import fleet_sim
+
+DB_PATH = 'nilufer_waste.db'
+MAX_SCENARIOS = 5000
+MAX_IN_FLIGHT_PER_WORKER = 4      # Bekleyen görev sınırı: sonuçlar geldikçe yenileri gönderilir
+PERCENTILES = (5, 50, 95)
+OVERFLOW_TARGET = 0.01           # 'En iyi' nokta: bu taşma olasılığının altındaki en ucuz nokta
+
+# Izgara boyutları: run() parametresi (filo anahtarları fleet'e gider) -> değer dönüştürücü
+GRID_AXES = {
+    'small_trucks': int,
+    'large_trucks': int,
+    'crane_vehicles': int,
+    'days_per_week': int,
+    'crane_rotation_days': int,
+    'rate_uncertainty': float,
+    'shift_hours': float,
+    'collect_threshold': float
+}
+FLEET_AXES = {'small_trucks', 'large_trucks', 'crane_vehicles'}
+
+# İşçi süreç durumu (açılışta bir kez kurulur)
+_worker = {}
+
+def build_grid(axes, seeds):
+    """Izgara noktaları × tohumlar -> [(nokta_no, tohum, senaryo)]
+
+    axes: GRID_AXES anahtarlarından değer listelerine sözlük; verilmeyen
+    boyutlar simülatör varsayılanında kalır.
+    """
+    unknown = set(axes) - set(GRID_AXES)
+    if unknown:
+        raise ValueError(f"Bilinmeyen tarama boyutu: {', '.join(sorted(unknown))}")
+    names = sorted(axes)
+    values = [[GRID_AXES[name](v) for v in axes[name]] for name in names]
+    if any(not v for v in values):
+        raise ValueError("Tarama boyutları boş olamaz")
+    points = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    if len(points) * seeds > MAX_SCENARIOS:
+        raise ValueError(f"{len(points)} nokta x {seeds} tohum, en fazla {MAX_SCENARIOS} senaryo")
+    return [(index, seed, point) for index, point in enumerate(points) for seed in range(seeds)]
+
+def _run_kwargs(point, seed, base):
+    kwargs = dict(base)
+    fleet = dict(kwargs.pop('fleet', None) or {})
+    for name, value in point.items():
+        if name in FLEET_AXES:
+            fleet[fleet_sim.FLEET_KEYS[name]] = value
+        else:
+            kwargs[name] = value
+    kwargs['fleet'] = fleet
+    kwargs['seed'] = seed
+    return kwargs
+
+class SharedState:
+    """Simülatör dizilerini paylaşımlı bellek bloklarına kopyalar; with bloğu sonunda siler"""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.descriptors = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.descriptors[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+def _attach(descriptors):
+    arrays, blocks = {}, []
+    for name, (block_name, shape, dtype) in descriptors.items():
+        # İşçiler ana sürecin kaynak izleyicisini paylaşır; bloğu ana süreç siler
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        blocks.append(block)
+    return arrays, blocks
+
+def _init_worker(descriptors, meta, base):
+    arrays, blocks = _attach(descriptors)
+    _worker['blocks'] = blocks
+    _worker['simulator'] = fleet_sim.FleetSimulator.from_state(arrays, meta)
+    _worker['base'] = base
+
+def _run_task(task):
+    index, seed, point = task
+    results = _worker['simulator'].run(**_run_kwargs(point, seed, _worker['base']))
+    results.pop('daily')
+    results.pop('by_vehicle_type')
+    return index, seed, point, results
+
+def _percentiles(values):
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def summarize_point(index, point, runs):
+    """Bir ızgara noktasının tohumlar üzerindeki dağılımı"""
+    cost = [r['cost'] for r in runs]
+    hours = [r['truck_hours'] for r in runs]
+    return {
+        'type': 'point',
+        'point': index,
+        'params': point,
+        'runs': len(runs),
+        # Taşma olasılığı: bir konteynerin dönem içinde en az bir kez taşma olasılığı (tohum ortalaması)
+        'overflow_probability': round(float(np.mean([r['containers_overflowed'] / max(r['containers'], 1) for r in runs])), 5),
+        'any_overflow_share': round(float(np.mean([r['overflow_events'] > 0 for r in runs])), 4),
+        'overflow_rate_mean': round(float(np.mean([r['overflow_rate'] for r in runs])), 5),
+        'cost_mean': round(float(np.mean(cost)), 2),
+        'cost': _percentiles(cost),
+        'truck_hours': _percentiles(hours),
+        'missed_collections_mean': round(float(np.mean([r['missed_collections'] for r in runs])), 1)
+    }
+
+def _better(candidate, best, overflow_target):
+    """Hedefi tutturan en ucuz nokta; hiçbiri tutturamıyorsa taşması en düşük olan"""
+    if best is None:
+        return True
+    candidate_ok = candidate['overflow_probability'] <= overflow_target
+    best_ok = best['overflow_probability'] <= overflow_target
+    if candidate_ok != best_ok:
+        return candidate_ok
+    if candidate_ok:
+        return candidate['cost_mean'] < best['cost_mean']
+    return (candidate['overflow_probability'], candidate['cost_mean']) < (best['overflow_probability'], best['cost_mean'])
+
+def run_sweep(simulator, axes, seeds=10, days=fleet_sim.DEFAULT_DAYS, start=None, base=None,
+              workers=None, include_runs=True, overflow_target=OVERFLOW_TARGET):
+    """Taramayı çalıştır; olayları (sözlük) tamamlandıkça üreten üreteç
+
+    simulator: prepare() edilmiş FleetSimulator (hourly_factors için forecaster'ı olmalı)
+    base: tüm senaryolara ortak run() parametreleri (ör. fuel_price, fleet)
+    """
+    started = time.perf_counter()
+    tasks = build_grid(axes, seeds)
+    # run() ile aynı yuvarlama: işçilerdeki katsayı anahtarı dışa aktarılanla eşleşmeli
+    start = fleet_sim.floor_start(start)
+    base = {**(base or {}), 'days': days, 'start': start}
+    workers = workers or os.cpu_count() or 1
+    arrays, meta = simulator.export_state(start, int(days) * 24)
+
+    point_runs = {}
+    expected = {}
+    for index, _, _ in tasks:
+        expected[index] = expected.get(index, 0) + 1
+    best = None
+    completed = 0
+
+    yield {'type': 'start', 'scenarios': len(tasks), 'points': len(expected), 'seeds': seeds,
+           'workers': workers, 'days': days, 'start': start.isoformat()}
+    with SharedState(arrays) as shared:
+        # spawn: iş parçacıklı web sürecinden fork güvenli değil
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(shared.descriptors, meta, base)) as pool:
+            pending = set()
+            queue = iter(tasks)
+            limit = workers * MAX_IN_FLIGHT_PER_WORKER
+            while True:
+                for task in itertools.islice(queue, limit - len(pending)):
+                    pending.add(pool.submit(_run_task, task))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, seed, point, results = future.result()
+                    completed += 1
+                    if include_runs:
+                        yield {'type': 'run', 'point': index, 'seed': seed, 'params': point,
+                               'cost': results['cost'], 'truck_hours': results['truck_hours'],
+                               'overflow_rate': results['overflow_rate'],
+                               'containers_overflowed': results['containers_overflowed'],
+                               'done': completed}
+                    runs = point_runs.setdefault(index, [])
+                    runs.append(results)
+                    if len(runs) == expected[index]:
+                        summary = summarize_point(index, point, runs)
+                        del point_runs[index]
+                        if _better(summary, best, overflow_target):
+                            best = summary
+                        yield summary
+
+    yield {'type': 'summary', 'scenarios': len(tasks), 'points': len(expected),
+           'elapsed_s': round(time.perf_counter() - started, 2),
+           'overflow_target': overflow_target, 'best': best}
+
+def parse_axis(text, convert):
+    return [convert(v) for v in text.split(',') if v.strip()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Filo boyutlandırma için paralel Monte Carlo taraması')
+    parser.add_argument('--db', default=DB_PATH, help='SQLite veritabanı yolu')
+    for name, convert in GRID_AXES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, help=f"{name} değerleri (virgülle)")
+    parser.add_argument('--uncertainty', dest='rate_uncertainty', help='rate_uncertainty değerleri (virgülle)')
+    parser.add_argument('--small', dest='small_trucks', help='small_trucks değerleri')
+    parser.add_argument('--large', dest='large_trucks', help='large_trucks değerleri')
+    parser.add_argument('--crane', dest='crane_vehicles', help='crane_vehicles değerleri')
+    parser.add_argument('--seeds', type=int, default=10, help='Izgara noktası başına tohum sayısı')
+    parser.add_argument('--days', type=int, default=fleet_sim.DEFAULT_DAYS, help='Simülasyon süresi (gün)')
+    parser.add_argument('--start', help='Başlangıç (ISO tarih), varsayılan: şimdi')
+    parser.add_argument('--workers', type=int, help='İşçi süreç sayısı (varsayılan: çekirdek sayısı)')
+    parser.add_argument('--out', help='Olayların yazılacağı NDJSON dosyası')
+    parser.add_argument('--no-runs', action='store_true', help='Tekil koşu olaylarını yazma')
+    parser.add_argument('--overflow-target', type=float, default=OVERFLOW_TARGET,
+                        help='En iyi nokta için kabul edilen taşma olasılığı')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    axes = {
+        name: parse_axis(getattr(args, name), convert)
+        for name, convert in GRID_AXES.items() if getattr(args, name)
+    }
+
+    conn = sqlite3.connect(args.db)
+    try:
+        forecaster = fill_forecast.FillForecaster().fit(conn)
+        simulator = fleet_sim.FleetSimulator().prepare(conn, forecaster)
+    finally:
+        conn.close()
+
+    out = open(args.out, 'w', encoding='utf-8') if args.out else None
+    try:
+        start = datetime.fromisoformat(args.start) if args.start else None
+        for event in run_sweep(simulator, axes, seeds=args.seeds, days=args.days, start=start,
+                               workers=args.workers, include_runs=not args.no_runs,
+                               overflow_target=args.overflow_target):
+            if out:
+                out.write(json.dumps(event, ensure_ascii=False) + '\n')
+            if event['type'] == 'start':
+                print(f"🔄 {event['scenarios']} senaryo ({event['points']} nokta x {event['seeds']} tohum), "
+                      f"{event['workers']} işçi")
+            elif event['type'] == 'point':
+                print(f"  {event['params']}: taşma olasılığı {event['overflow_probability']:.4f}, "
+                      f"maliyet p50 {event['cost']['p50']:,.0f}, araç-saat p95 {event['truck_hours']['p95']:,.0f}")
+            elif event['type'] == 'summary':
+                print(f"✅ Tarama tamamlandı: {event['scenarios']} senaryo, {event['elapsed_s']}s")
+                if event['best']:
+                    print(f"   En iyi: {event['best']['params']}")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        if out:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Derlenmiş Orman Çıkarımı
+RandomForestClassifier ağaçlarını düz NumPy dizilerine çevirip vektörel gezinme
+
+Tüm ağaçların düğümleri tek dizide, genişlik öncelikli sırada birleştirilir:
+bir düğümün sağ çocuğu her zaman sol çocuğunun hemen ardındadır, böylece
+bir adım `düğüm = çocuk[düğüm] + (x > eşik)` olur. Yapraklar kendilerine
+döner; (örnek x ağaç) indeks matrisi max_depth adım boyunca koşulsuz
+ilerletilir. Karar kuralı sklearn ile aynıdır (X float32'ye
+çevrilir, x <= eşik solda) ve ağaç olasılıkları ağaç sırasıyla toplanır;
+sonuç sklearn predict_proba ile bit düzeyinde aynıdır.
+
+Yalın (lean) mod: eşikler, özelliğin tüm eşikleri arasındaki sıra
+numarasına (uint16) çevrilir. x <= t_k ancak ve ancak #(t < x) <= k
+olduğundan kararlar değişmez; yalnızca yaprak olasılıkları uint16'ya
+yuvarlanır (hata < 1e-5).
+
+Diziler düz nesne öznitelikleri olduğundan joblib mmap_mode ile bellek
+eşlemeli açılır; aynı dosyayı kullanan işçiler sayfaları paylaşır.
+"""
+
+import numpy as np
+
+MODES = ('compiled', 'lean')
+LEAN_PROBA_SCALE = 65535
+BATCH_ROWS = 1024        # (örnek x ağaç) indeks matrisi önbellekte kalsın diye parça boyu
+
+class CompiledForest:
+    """predict_proba uyumlu, sklearn gerektirmeyen orman"""
+
+    def __init__(self, roots, feature, threshold, child, values, max_depth, n_features,
+                 classes, mode='compiled', feature_thresholds=None):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.child = child          # sol çocuk; sağ çocuk = sol + 1, yaprakta kendisi
+        self.values = values
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.mode = mode
+        self.feature_thresholds = feature_thresholds   # lean: özellik başına sıralı eşikler
+
+    @classmethod
+    def from_sklearn(cls, model, mode='compiled'):
+        """Eğitilmiş RandomForestClassifier (veya tek DecisionTreeClassifier) derle"""
+        if mode not in MODES:
+            raise ValueError(f"Bilinmeyen mod: {mode}")
+        estimators = getattr(model, 'estimators_', [model])
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            left, right = tree.children_left, tree.children_right
+
+            # Genişlik öncelikli yeniden numaralandırma: kardeşler ardışık
+            order = [0]
+            for node in order:
+                if left[node] >= 0:
+                    order.append(left[node])
+                    order.append(right[node])
+            order = np.asarray(order)
+            position = np.empty(len(order), dtype=np.int64)
+            position[order] = np.arange(len(order))
+
+            is_leaf = left[order] < 0
+            child = np.where(is_leaf, np.arange(len(order)), position[np.maximum(left[order], 0)]) + offset
+            feature = np.where(is_leaf, 0, tree.feature[order])
+            threshold = np.where(is_leaf, np.inf, tree.threshold[order])
+
+            # sklearn ile aynı normalizasyon: düğüm değerleri (ağırlıklı sayım) satır toplamına bölünür
+            value = tree.value[order, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+            roots.append(offset)
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(child)
+            values.append(value)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += len(order)
+
+        feature = np.concatenate(features)
+        threshold = np.concatenate(thresholds)
+        value = np.concatenate(values)
+        n_features = int(getattr(model, 'n_features_in_', feature.max() + 1))
+        # Hız modu yerel tamsayı (intp) kullanır: karışık tipli indekslemede dönüşüm maliyeti yok
+        forest = cls(
+            roots=np.asarray(roots, dtype=np.intp),
+            feature=feature.astype(np.intp),
+            threshold=threshold,
+            child=np.concatenate(children).astype(np.intp),
+            values=value,
+            max_depth=int(max_depth),
+            n_features=n_features,
+            classes=np.asarray(model.classes_),
+            mode=mode
+        )
+        if mode == 'lean':
+            forest._quantize()
+        return forest
+
+    def _quantize(self):
+        """Eşikleri özellik içi sıra numarasına, yaprak olasılıklarını uint16'ya çevir"""
+        finite = np.isfinite(self.threshold)
+        feature_thresholds = []
+        ranks = np.zeros(len(self.threshold), dtype=np.int64)
+        for f in range(self.n_features):
+            nodes = finite & (self.feature == f)
+            unique = np.unique(self.threshold[nodes])
+            feature_thresholds.append(unique)
+            ranks[nodes] = np.searchsorted(unique, self.threshold[nodes])
+        if max((len(u) for u in feature_thresholds), default=0) >= 2 ** 16 - 1:
+            raise ValueError("Özellik başına eşik sayısı uint16 sınırını aşıyor")
+        # Yapraklar: her sıra numarasından büyük değer -> her zaman 'sol' (kendisi)
+        ranks[~finite] = 2 ** 16 - 1
+        self.threshold = ranks.astype(np.uint16)
+        self.feature_thresholds = feature_thresholds
+        self.values = np.rint(self.values * LEAN_PROBA_SCALE).astype(np.uint16)
+        self.feature = self.feature.astype(np.uint8 if self.n_features <= 256 else np.int32)
+        index_dtype = np.int32 if len(self.child) < 2 ** 31 else np.int64
+        self.child = self.child.astype(index_dtype)
+        self.roots = self.roots.astype(index_dtype)
+
+    def _encode(self, X):
+        """Girdiyi karşılaştırma uzayına çevir: float32 (sklearn ile aynı) ya da eşik sıraları"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"{self.n_features} özellik bekleniyordu, {X.shape[1]} geldi")
+        if self.mode != 'lean':
+            # float32'ye yuvarlanmış değer float64 eşikle karşılaştırılır (sklearn ile aynı)
+            return X.astype(np.float64)
+        encoded = np.empty(X.shape, dtype=np.uint16)
+        for f, thresholds in enumerate(self.feature_thresholds):
+            # #(t < x): x <= t_k  <=>  sıra <= k
+            encoded[:, f] = np.searchsorted(thresholds, X[:, f].astype(np.float64), side='left')
+        return encoded
+
+    def _apply_encoded(self, X):
+        n, n_features = X.shape
+        flat = X.ravel()
+        node = np.repeat(self.roots[None, :], n, axis=0)
+        feature, threshold, child = self.feature, self.threshold, self.child
+        if n == 1:
+            # Tek örnek: 1 boyutlu indeks, satır ofseti yok (tek tahmin yolu)
+            node = node[0]
+            for _ in range(self.max_depth):
+                node = child[node] + (flat[feature[node]] > threshold[node])
+            return node[None, :]
+        row_offsets = (np.arange(n, dtype=np.intp) * n_features)[:, None]
+        # Büyük indeks dizilerinde np.take, fancy indexing'den hızlı
+        for _ in range(self.max_depth):
+            node = np.take(child, node) + (np.take(flat, row_offsets + np.take(feature, node)) > np.take(threshold, node))
+        return node
+
+    def apply(self, X):
+        """Her örnek ve ağaç için ulaşılan yaprak (global düğüm indeksi), (n, n_trees)"""
+        X = self._encode(X)
+        return np.concatenate([
+            self._apply_encoded(X[start:start + BATCH_ROWS]) for start in range(0, len(X), BATCH_ROWS)
+        ]) if len(X) else np.empty((0, len(self.roots)), dtype=self.roots.dtype)
+
+    def predict_proba(self, X):
+        X = self._encode(X)
+        out = np.empty((len(X), self.n_classes_))
+        for start in range(0, len(X), BATCH_ROWS):
+            leaves = self._apply_encoded(X[start:start + BATCH_ROWS])
+            per_tree = np.take(self.values, leaves, axis=0)
+            if self.mode == 'lean':
+                per_tree = per_tree / LEAN_PROBA_SCALE
+            # Ağaç sırasıyla kümülatif toplam: sklearn'ün `out += proba` sırası ile aynı yuvarlama
+            out[start:start + BATCH_ROWS] = np.cumsum(per_tree, axis=1)[:, -1]
+        return out / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        arrays = [self.roots, self.feature, self.threshold, self.child, self.values]
+        arrays += list(self.feature_thresholds or [])
+        return int(sum(a.nbytes for a in arrays))
+
+def validate(forest, model, X):
+    """Derlenmiş ve sklearn olasılıkları arasındaki en büyük mutlak fark"""
+    if len(X) == 0:
+        return 0.0
+    expected = model.predict_proba(X)
+    return float(np.max(np.abs(forest.predict_proba(X) - expected)))
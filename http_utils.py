@@ -0,0 +1,118 @@
+"""
+HTTP Yanıt Yardımcıları
+İçerik sıkıştırma pazarlığı (brotli/gzip) ve ETag / If-None-Match desteği
+"""
+
+import gzip
+import hashlib
+import zlib
+
+try:
+    import brotli  # İsteğe bağlı; yoksa sadece gzip kullanılır
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/octet-stream',  # Sadece uygulamanın ürettiği ikili yükler (statik dosyalar doğrudan geçer)
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/plain'
+}
+
+def preferred_encoding(accept_encoding):
+    """Accept-Encoding başlığından desteklenen en iyi kodlamayı seç (br > gzip), yoksa None"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        fields = part.strip().split(';')
+        name = fields[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+
+    def quality(name):
+        return accepted.get(name, accepted.get('*', 0.0))
+
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best = max(candidates, key=lambda name: (quality(name), name == 'br'))
+    return best if quality(best) > 0 else None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    return data
+
+def compress_stream(chunks, encoding):
+    """Parça parça üretilen gövdeyi akış halinde sıkıştır (ilk bayt beklemeden gider)"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            out = compressor.process(chunk) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+    elif encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip başlığı
+        for chunk in chunks:
+            out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield compressor.flush()
+    else:
+        yield from chunks
+
+def make_etag(*parts):
+    """Parçalardan zayıf ETag üret (sıkıştırılmış ve ham gövde aynı etiketi paylaşır)"""
+    digest = hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match başlığı verilen ETag ile eşleşiyor mu (zayıf karşılaştırma)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+def compress_response(response, accept_encoding):
+    """Yeterince büyük, sıkıştırılmamış ve akış olmayan metin yanıtlarını sıkıştır"""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+    encoding = preferred_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,361 @@
+"""
+Ham Toplama Kayıtları Akış Yüklemesi
+data/all_merged_data.csv gibi büyük araç/toplama dökümlerini sabit bellekle collection_events'e yükler
+
+- Dosya parça parça (chunksize) okunur; bellek kullanımı dosya boyutundan bağımsızdır.
+- Mahalle ve plaka adları önbelleğe alınmış sözlüklerle ID'ye çevrilir.
+- Her parça kendi işleminde yazılır ve aynı işlemde kontrol noktası ilerletilir;
+  kesintiden sonra tekrar çalıştırmak kaldığı satırdan devam eder (satır iki kez yazılmaz).
+
+Kullanım: python ingest_events.py [data/all_merged_data.csv] [--chunk-rows N] [--restart] [--map hedef=kaynak ...]
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import container_stats
+from load_data_sqlite import DB_PATH, neighborhood_key, neighborhood_lookup
+
+RAW_EVENTS_CSV = 'data/all_merged_data.csv'
+CHUNK_ROWS = 100000
+HEAD_HASH_BYTES = 1024 * 1024
+MAX_TONNAGE_PER_EVENT = 50.0   # Tek boşaltmada bundan büyük tonaj hatalı kabul edilir
+NEAREST_CONTAINER_MAX_KM = 0.2
+
+# Hedef alan -> kaynak dosyada aranacak sütun adları (büyük/küçük harf ve boşluk duyarsız)
+COLUMN_ALIASES = {
+    'collection_date': ['collection_date', 'date', 'datetime', 'timestamp', 'tarih', 'toplama_tarihi', 'islem_tarihi'],
+    'neighborhood': ['neighborhood', 'neighborhood_name', 'mahalle', 'mahalle_adi'],
+    'vehicle': ['plate_number', 'plate', 'plaka', 'vehicle', 'vehicle_id', 'arac', 'arac_id', 'vehicle_name'],
+    'tonnage': ['tonnage', 'tonnage_collected', 'tonaj', 'ton', 'net_ton', 'weight_ton', 'net_tonaj'],
+    'container_id': ['container_id', 'konteyner_id'],
+    'latitude': ['latitude', 'lat', 'enlem'],
+    'longitude': ['longitude', 'lng', 'lon', 'boylam'],
+    'fill_level_before': ['fill_level_before', 'fill_level', 'doluluk'],
+    'duration_minutes': ['collection_duration_minutes', 'duration_minutes', 'duration', 'sure', 'sure_dk']
+}
+REQUIRED_FIELDS = ['collection_date', 'tonnage']
+
+CHECKPOINT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS etl_checkpoints (
+        source_path TEXT PRIMARY KEY,
+        head_sha256 TEXT NOT NULL,
+        rows_done INTEGER NOT NULL,
+        rows_inserted INTEGER NOT NULL,
+        rows_rejected INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """
+]
+
+def _normalize_column(name):
+    return str(name).strip().lower().replace(' ', '_').replace('-', '_')
+
+def resolve_columns(header, overrides=None):
+    """Kaynak başlığını hedef alanlara eşle; zorunlu alan eksikse ValueError"""
+    by_normalized = {_normalize_column(col): col for col in header}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in by_normalized:
+                mapping[field] = by_normalized[alias]
+                break
+    for field, source in (overrides or {}).items():
+        if source not in header:
+            raise ValueError(f"'{source}' sütunu dosyada yok")
+        mapping[field] = source
+
+    missing = [f for f in REQUIRED_FIELDS if f not in mapping]
+    if missing:
+        raise ValueError(f"Zorunlu sütun bulunamadı: {', '.join(missing)} (başlık: {list(header)})")
+    if not ({'container_id', 'neighborhood'} & set(mapping) or {'latitude', 'longitude'} <= set(mapping)):
+        raise ValueError("Konteyner, mahalle ya da koordinat sütunlarından en az biri gerekli")
+    return mapping
+
+def detect_separator(path):
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        first_line = f.readline()
+    return ';' if first_line.count(';') > first_line.count(',') else ','
+
+def head_sha256(path):
+    """Dosyanın ilk 1 MB'ı: sonuna ekleme yapılan dökümlerde kimlik değişmez"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(HEAD_HASH_BYTES)).hexdigest()
+
+def _plate_key(value):
+    return str(value).strip().upper().replace(' ', '')
+
+def vehicle_lookup(conn):
+    """Plaka anahtarı -> vehicle_id; 'ID-Ad' plakaları hem ID hem ad ile bulunur"""
+    lookup = {}
+    for vehicle_id, plate in conn.execute("SELECT vehicle_id, plate_number FROM vehicles ORDER BY vehicle_id"):
+        lookup.setdefault(_plate_key(plate), vehicle_id)
+        prefix, _, name = plate.partition('-')
+        if name:
+            lookup.setdefault(_plate_key(prefix), vehicle_id)
+            lookup.setdefault(_plate_key(name), vehicle_id)
+    return lookup
+
+def ensure_event_schema(conn):
+    """Kontrol noktası tablosu ve mahalle bazlı ham kayıtlar için neighborhood_id sütunu"""
+    for statement in CHECKPOINT_SCHEMA:
+        conn.execute(statement)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(collection_events)")}
+    if 'neighborhood_id' not in columns:
+        conn.execute("ALTER TABLE collection_events ADD COLUMN neighborhood_id INTEGER REFERENCES neighborhoods(neighborhood_id)")
+    container_stats.ensure_stats_schema(conn)
+    conn.commit()
+
+class _NearestContainer:
+    """Koordinat -> en yakın konteyner; aynı noktadan tekrar eden kayıtlar için ~10 m'lik önbellek"""
+
+    def __init__(self, index, max_km=NEAREST_CONTAINER_MAX_KM, cache_size=100000):
+        self.index = index
+        self.max_km = max_km
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def nearest_id(self, lat, lng):
+        key = (round(lat, 4), round(lng, 4))
+        if key not in self._cache:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            nearest = self.index.nearby(lat, lng, k=1, max_km=self.max_km)
+            self._cache[key] = nearest[0]['id'] if nearest else None
+        return self._cache[key]
+
+class _CachedLookup:
+    """Ham ad -> ID; her farklı ad bir kez normalize edilir"""
+
+    def __init__(self, table, key_fn):
+        self.table = table
+        self.key_fn = key_fn
+        self._cache = {}
+
+    def map(self, series):
+        values = series.fillna('').astype(str)
+        uniques = values.unique()
+        for raw in uniques:
+            if raw not in self._cache:
+                self._cache[raw] = self.table.get(self.key_fn(raw)) if raw.strip() else None
+        return values.map(self._cache)
+
+def _parse_dates(raw):
+    """Tarih sütununu 'YYYY-MM-DD[ HH:MM:SS]' metnine çevir; her farklı değer bir kez ayrıştırılır"""
+    uniques = pd.Series(raw.dropna().unique())
+    parsed = pd.to_datetime(uniques, errors='coerce', dayfirst=True, format='mixed')
+    formatted = parsed.dt.strftime('%Y-%m-%d %H:%M:%S').str.replace(' 00:00:00', '', regex=False)
+    return raw.map(dict(zip(uniques, formatted.where(parsed.notna(), None))))
+
+def transform_chunk(chunk, mapping, neighborhoods, vehicles, container_index, valid_container_ids):
+    """Ham parçayı collection_events satırlarına çevir; (satırlar, red sayıları) döndür"""
+    n = len(chunk)
+    rejected = {}
+
+    def reject(mask, reason):
+        count = int(mask.sum())
+        if count:
+            rejected[reason] = rejected.get(reason, 0) + count
+        return ~mask
+
+    dates = _parse_dates(chunk[mapping['collection_date']])
+    tonnage = pd.to_numeric(chunk[mapping['tonnage']].str.replace(',', '.', regex=False), errors='coerce')
+
+    keep = reject(dates.isna(), 'geçersiz tarih')
+    keep &= reject(keep & (tonnage.isna() | (tonnage < 0) | (tonnage > MAX_TONNAGE_PER_EVENT)), 'geçersiz tonaj')
+
+    neighborhood_ids = (
+        neighborhoods.map(chunk[mapping['neighborhood']]) if 'neighborhood' in mapping
+        else pd.Series([None] * n, index=chunk.index)
+    )
+    vehicle_ids = (
+        vehicles.map(chunk[mapping['vehicle']]) if 'vehicle' in mapping
+        else pd.Series([None] * n, index=chunk.index)
+    )
+
+    container_ids = pd.Series([None] * n, index=chunk.index, dtype=object)
+    if 'container_id' in mapping:
+        raw_ids = pd.to_numeric(chunk[mapping['container_id']], errors='coerce')
+        known = raw_ids.isin(valid_container_ids)
+        container_ids[known] = raw_ids[known].astype(int)
+    if container_index is not None and {'latitude', 'longitude'} <= set(mapping):
+        lat = pd.to_numeric(chunk[mapping['latitude']], errors='coerce')
+        lng = pd.to_numeric(chunk[mapping['longitude']], errors='coerce')
+        todo = keep & container_ids.isna() & lat.notna() & lng.notna()
+        for idx in chunk.index[todo.to_numpy()]:
+            container_ids[idx] = container_index.nearest_id(lat[idx], lng[idx])
+
+    keep &= reject(keep & container_ids.isna() & neighborhood_ids.isna(), 'konteyner/mahalle eşleşmedi')
+
+    def optional_numeric(field):
+        if field not in mapping:
+            return pd.Series([None] * n, index=chunk.index, dtype=object)
+        values = pd.to_numeric(chunk[mapping[field]].str.replace(',', '.', regex=False), errors='coerce')
+        return values.astype(object).where(values.notna(), None)
+
+    fill_before = optional_numeric('fill_level_before')
+    duration = optional_numeric('duration_minutes')
+
+    kept = keep.to_numpy()
+    date_strings = dates[kept]
+
+    def column(series, cast=float):
+        return [None if v is None or (isinstance(v, float) and np.isnan(v)) else cast(v) for v in series[kept].tolist()]
+
+    rows = list(zip(
+        column(container_ids, int),
+        column(vehicle_ids, int),
+        column(neighborhood_ids, int),
+        date_strings.tolist(),
+        tonnage[kept].astype(float).tolist(),
+        column(fill_before),
+        column(duration, int)
+    ))
+    return rows, rejected
+
+def ingest(path=RAW_EVENTS_CSV, db_path=DB_PATH, chunk_rows=CHUNK_ROWS, restart=False, overrides=None):
+    """Dosyayı parça parça yükle; kontrol noktasından devam et. Eklenen satır sayısını döndürür"""
+    print(f"\n📥 {path} akış halinde yükleniyor...")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    ensure_event_schema(conn)
+
+    source_key = os.path.abspath(path)
+    identity = head_sha256(path)
+    checkpoint = conn.execute(
+        "SELECT head_sha256, rows_done, rows_inserted, rows_rejected FROM etl_checkpoints WHERE source_path = ?",
+        (source_key,)
+    ).fetchone()
+    if checkpoint and checkpoint[0] != identity and not restart:
+        conn.close()
+        raise ValueError(
+            f"{path} kontrol noktasından sonra değişmiş (başlangıcı farklı); "
+            f"baştan yüklemek için --restart kullanın"
+        )
+    if restart or not checkpoint:
+        rows_done, rows_inserted, rows_rejected = 0, 0, 0
+    else:
+        rows_done, rows_inserted, rows_rejected = checkpoint[1:]
+        if rows_done:
+            print(f"  ↻ Kontrol noktasından devam: {rows_done:,} satır zaten işlenmiş")
+
+    separator = detect_separator(path)
+    header = pd.read_csv(path, sep=separator, encoding='utf-8-sig', nrows=0).columns
+    mapping = resolve_columns(header, overrides)
+    print(f"  Sütunlar: {', '.join(f'{k}={v}' for k, v in mapping.items())}")
+
+    # Önbelleğe alınmış sözlükler (her farklı ad bir kez çözülür)
+    neighborhoods = _CachedLookup(neighborhood_lookup(conn), neighborhood_key)
+    vehicles = _CachedLookup(vehicle_lookup(conn), _plate_key)
+    valid_container_ids = set()
+    container_index = None
+    if 'container_id' in mapping:
+        valid_container_ids = {row[0] for row in conn.execute("SELECT container_id FROM containers")}
+    if {'latitude', 'longitude'} <= set(mapping):
+        import spatial_index
+        index = spatial_index.ContainerIndex()
+        index.load(conn)
+        container_index = _NearestContainer(index)
+
+    total_bytes = os.path.getsize(path)
+    started = time.perf_counter()
+    session_rows = 0
+    session_inserted = 0
+
+    with open(path, 'rb') as f:
+        reader = pd.read_csv(
+            f,
+            sep=separator,
+            encoding='utf-8-sig',
+            usecols=list(set(mapping.values())),
+            dtype=str,
+            chunksize=chunk_rows,
+            # Sayı aralığı yerine fonksiyon: atlanacak satır sayısı kadar bellek ayırmaz
+            skiprows=(lambda i: 0 < i <= rows_done) if rows_done else None
+        )
+        for chunk in reader:
+            rows, rejected = transform_chunk(chunk, mapping, neighborhoods, vehicles, container_index, valid_container_ids)
+
+            # Satırlar ve kontrol noktası aynı işlemde: kesinti olursa ikisi de geri alınır
+            rows_done += len(chunk)
+            rows_inserted += len(rows)
+            rows_rejected += sum(rejected.values())
+            with conn:
+                conn.executemany("""
+                    INSERT INTO collection_events
+                    (container_id, vehicle_id, neighborhood_id, collection_date, tonnage_collected,
+                     fill_level_before, collection_duration_minutes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                if rows:
+                    container_ids, _, _, _, tonnages, fill_befores, _ = zip(*rows)
+                    container_stats.record_events(conn, container_ids, tonnages, fill_befores)
+                conn.execute("""
+                    INSERT INTO etl_checkpoints
+                    (source_path, head_sha256, rows_done, rows_inserted, rows_rejected, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(source_path) DO UPDATE SET
+                        head_sha256 = excluded.head_sha256,
+                        rows_done = excluded.rows_done,
+                        rows_inserted = excluded.rows_inserted,
+                        rows_rejected = excluded.rows_rejected,
+                        updated_at = excluded.updated_at
+                """, (source_key, identity, rows_done, rows_inserted, rows_rejected, datetime.now().isoformat()))
+
+            session_rows += len(chunk)
+            session_inserted += len(rows)
+            elapsed = time.perf_counter() - started
+            progress = f"{f.tell() / total_bytes * 100:5.1f}%" if total_bytes else ''
+            reasons = ', '.join(f"{k}: {v}" for k, v in rejected.items())
+            print(f"  {progress} {rows_done:,} satır | {session_rows / max(elapsed, 1e-9):,.0f} satır/s"
+                  + (f" | reddedilen ({reasons})" if reasons else ''))
+
+    conn.close()
+    elapsed = time.perf_counter() - started
+    print(f"✓ {session_inserted:,} toplama olayı eklendi, toplam {rows_done:,} satır işlendi, "
+          f"{rows_rejected:,} reddedildi ({elapsed:.2f}s, {session_rows / max(elapsed, 1e-9):,.0f} satır/s)")
+    return session_inserted
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Büyük ham toplama dökümünü collection_events tablosuna akış halinde yükle')
+    parser.add_argument('path', nargs='?', default=RAW_EVENTS_CSV)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Parça başına satır (bellek tavanı)')
+    parser.add_argument('--restart', action='store_true', help='Kontrol noktasını yok say, baştan yükle')
+    parser.add_argument('--map', action='append', default=[], metavar='HEDEF=KAYNAK',
+                        help=f"Sütun eşlemesi (hedefler: {', '.join(COLUMN_ALIASES)})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    overrides = {}
+    for item in args.map:
+        target, _, source = item.partition('=')
+        if target not in COLUMN_ALIASES or not source:
+            print(f"❌ Geçersiz eşleme: {item}")
+            return 1
+        overrides[target] = source
+
+    if not os.path.exists(args.path):
+        print(f"❌ Dosya bulunamadı: {args.path}")
+        return 1
+    try:
+        ingest(args.path, chunk_rows=args.chunk_rows, restart=args.restart, overrides=overrides)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"❌ Hata: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Liderlik Tablosu
+Vatandaş güven puanlarının bellek içi, yazmalarla artımlı güncellenen sıralaması
+
+Tüm uygun kullanıcılar (role = 'citizen', total_reports > 0) sıralama
+anahtarına göre sıralı bir listede tutulur; bir kullanıcının puanı
+değişince yalnızca o kullanıcının anahtarı çıkarılıp yeniden eklenir
+(bisect). İlk TOP_K satır her yazmadan sonra hazır yanıt olarak saklanır,
+okumalar kilit almadan bu demeti döndürür.
+
+Eşzamanlı iki bildirimin commit sonrası güncellemeleri ters sırada
+gelebilir; total_reports her bildirimde bir artan sayaç olduğundan
+sürüm olarak kullanılır ve daha eski bir değer yenisinin üzerine yazılmaz.
+"""
+
+import bisect
+import threading
+
+TOP_K = 10
+
+LEADERBOARD_QUERY = """
+    SELECT user_id, name, trust_score, total_reports
+    FROM users
+    WHERE role = 'citizen' AND total_reports > 0
+"""
+
+def _sort_key(user_id, trust_score, total_reports):
+    # trust_score DESC, total_reports DESC; eşitlikte kullanıcı id'si sırayı sabitler
+    return (-trust_score, -total_reports, user_id)
+
+class Leaderboard:
+    """Artımlı güncellenen, sabit zamanlı okunan liderlik tablosu"""
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self._keys = []        # sıralı anahtarlar
+        self._users = {}       # user_id -> (anahtar, ad, güven puanı, bildirim sayısı)
+        self._top = ()         # hazır ilk top_k satır
+        self._lock = threading.Lock()
+        self.stats = {'updates': 0, 'stale_updates': 0, 'top_rebuilds': 0}
+
+    def load(self, conn):
+        """Uygun tüm kullanıcılarla tabloyu baştan kur"""
+        rows = conn.execute(LEADERBOARD_QUERY).fetchall()
+        users = {}
+        for user_id, name, trust_score, total_reports in rows:
+            key = _sort_key(user_id, float(trust_score or 0.0), total_reports)
+            users[user_id] = (key, name, float(trust_score or 0.0), total_reports)
+        with self._lock:
+            self._users = users
+            self._keys = sorted(entry[0] for entry in users.values())
+            self._rebuild_top()
+        return len(users)
+
+    def update(self, user_id, name, role, trust_score, total_reports):
+        """Commit edilmiş kullanıcı değerlerini uygula; eski (sıra dışı) güncellemeler yok sayılır"""
+        trust_score = float(trust_score or 0.0)
+        total_reports = total_reports or 0
+        with self._lock:
+            previous = self._users.get(user_id)
+            if previous is not None and previous[3] > total_reports:
+                self.stats['stale_updates'] += 1
+                return False
+            self.stats['updates'] += 1
+
+            touches_top = False
+            if previous is not None:
+                index = bisect.bisect_left(self._keys, previous[0])
+                touches_top = index < self.top_k
+                del self._keys[index]
+                del self._users[user_id]
+
+            if role == 'citizen' and total_reports > 0:
+                key = _sort_key(user_id, trust_score, total_reports)
+                index = bisect.bisect_left(self._keys, key)
+                self._keys.insert(index, key)
+                self._users[user_id] = (key, name, trust_score, total_reports)
+                touches_top = touches_top or index < self.top_k
+
+            if touches_top:
+                self._rebuild_top()
+            return True
+
+    def _rebuild_top(self):
+        self.stats['top_rebuilds'] += 1
+        top = []
+        for rank, key in enumerate(self._keys[:self.top_k], start=1):
+            _, name, trust_score, total_reports = self._users[key[2]]
+            top.append({
+                'rank': rank,
+                'name': name,
+                'trust_score': trust_score,
+                'total_reports': total_reports
+            })
+        self._top = tuple(top)
+
+    def top(self):
+        """Hazır ilk top_k satır (değiştirilmemeli)"""
+        return self._top
+
+    def __len__(self):
+        return len(self._keys)
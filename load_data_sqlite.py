@@ -1,251 +1,571 @@
 """
 SQLite Veri Yükleme Script'i
 Nilüfer Belediyesi Akıllı Atık Yönetim Sistemi
+
+Toplu yükleme: veriler NumPy ile vektörel üretilir, tek bağlantı ve tek
+işlem içinde executemany ile yazılır. Büyük yüklemelerde ikincil indeksler
+yükleme sonrasına ertelenir.
+
+Artımlı ve idempotent: her kaynak dosyanın parmak izi (boyut, mtime, sha256)
+etl_sources tablosunda tutulur, sadece değişen dosyalar yeniden işlenir.
+Satırlar doğal anahtarla (mahalle adı, plaka, ay) güncellenir; aynı girdiyi
+ikinci kez uygulamak hiçbir satırı değiştirmez.
+
+Kullanım: python load_data_sqlite.py [--force] [--scale N] [--event-containers N] [--seed N]
 """
 
+import argparse
+import hashlib
+import json
+import os
+import re
 import sqlite3
-import pandas as pd
-import numpy as np
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-import random
+
+import numpy as np
+import pandas as pd
+
+import container_stats
 
 DB_PATH = 'nilufer_waste.db'
 
-def load_neighborhoods():
-    """Mahalle verilerini yükle"""
-    print("\n📍 Mahalle verileri yükleniyor...")
-    
-    df = pd.read_csv('data/mahalle_nufus.csv', encoding='utf-8-sig', sep=';')
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    for _, row in df.iterrows():
-        area = row.get('alan', 2.0)
-        nufus = int(str(row['nufus']).replace('.', ''))  # 4.371 -> 4371
-        density = nufus / area if area > 0 else 5000
+NEIGHBORHOODS_CSV = 'data/mahalle_nufus.csv'
+FLEET_CSV = 'data/fleet.csv'
+CONTAINER_COUNTS_CSV = 'data/container_counts.csv'
+TONNAGES_CSV = 'data/tonnages.csv'
+
+# Bu sayının üzerinde satır yazılacaksa tablo indeksleri kaldırılıp sonra yeniden kurulur
+DEFER_INDEX_MIN_ROWS = 50000
+LOAD_CACHE_SIZE_KB = 256 * 1024
+
+VEHICLE_TYPES = [
+    ('Küçük Çöp Kamyonu', 3.0, 500),
+    ('Büyük Çöp Kamyonu', 8.0, 800),
+    ('Vinçli Araç', 1.0, 400)
+]
+
+# Filo dosyasındaki tip adı -> vehicle_types.type_id
+FLEET_TYPE_MAP = {
+    'Large Garbage Truck': 2,  # Büyük Çöp Kamyonu
+    'Small Garbage Truck': 1,  # Küçük Çöp Kamyonu
+    'Crane Vehicle': 3          # Vinçli Araç
+}
+
+# Kaynak dosyalar mahalleleri farklı yazıyor ("100. YIL " / "YÜZÜNCÜYIL MAHALLESİ");
+# eşleştirme normalize edilmiş ad üzerinden, kalan farklar bu tabloyla çözülür
+NEIGHBORHOOD_ALIASES = {
+    '100. YIL': 'YÜZÜNCÜYIL',
+    'AYVA': 'AYVAKÖY',
+    'MAKSEMPINAR': 'MAKŞEMPINARI',
+    'ALAADİNBEY': 'ALAADDİNBEY',
+    '30 AĞUSTOS': '30 AĞUSTOS ZAFER'
+}
+
+# (container_type, CSV sütunu, kapasite litre, merkez enlem, merkez boylam)
+CONTAINER_TYPES = [
+    ('underground', 'YERALTI KONTEYNER', 5000, 40.2, 28.9),
+    ('770lt', '770 LT KONTEYNER', 770, 40.2, 28.9),
+    ('400lt', '400 LT KONTEYNER', 400, 40.2, 28.9),
+    ('plastic', 'PLASTİK', 240, 40.2, 28.9)
+]
+
+@contextmanager
+def bulk_load(db_path=DB_PATH):
+    """Yükleme bağlantısı: gevşetilmiş pragmalar, tek işlem; hata olursa hiçbir şey yazılmaz"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size=-{LOAD_CACHE_SIZE_KB}")
+    try:
+        conn.execute("BEGIN")
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.close()
+
+ETL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS etl_sources (
+        source_path TEXT PRIMARY KEY,
+        size_bytes INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        loaded_at TEXT NOT NULL
+    )
+    """,
+    # Ay doğal anahtar: eski sürümün bıraktığı tekrarları temizle, sonra tekil indeks
+    "DELETE FROM tonnage_statistics WHERE stat_id NOT IN (SELECT MAX(stat_id) FROM tonnage_statistics GROUP BY month)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_tonnage_month ON tonnage_statistics(month)"
+]
+
+def ensure_etl_schema(conn):
+    for statement in ETL_SCHEMA:
+        conn.execute(statement)
+    # Eski veritabanları: yükleme ayarları sütunu sonradan eklendi
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(etl_sources)")}
+    if 'load_options' not in columns:
+        conn.execute("ALTER TABLE etl_sources ADD COLUMN load_options TEXT")
+
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class SourceTracker:
+    """Kaynak dosyaların son yüklenen parmak izini tutar
+
+    Boyut ve mtime aynıysa dosya okunmaz; farklıysa içerik hash'i
+    karşılaştırılır (sadece dokunulmuş ama değişmemiş dosya atlanır).
+    Yüklemeyi etkileyen ayarlar (ör. --scale) da saklanır; önceki
+    yüklemeden farklıysa dosya değişmemiş olsa da yeniden işlenir.
+    """
+
+    def __init__(self, conn, force=False):
+        self.conn = conn
+        self.force = force
+        self._decisions = {}
+        self._fingerprints = {}
+
+    def changed(self, path, options=None):
+        if path in self._decisions:
+            return self._decisions[path]
         
-        cursor.execute("""
-            INSERT OR IGNORE INTO neighborhoods (neighborhood_name, population, population_density, area_km2)
-            VALUES (?, ?, ?, ?)
-        """, (row['mahalle'], nufus, density, area))
-    
-    conn.commit()
-    count = cursor.execute("SELECT COUNT(*) FROM neighborhoods").fetchone()[0]
-    conn.close()
+        stat = os.stat(path)
+        stored = self.conn.execute(
+            "SELECT size_bytes, mtime_ns, sha256, load_options FROM etl_sources WHERE source_path = ?", (path,)
+        ).fetchone()
+        sha256 = None
+        if stored and (stored[0], stored[1]) == (stat.st_size, stat.st_mtime_ns):
+            changed = False
+        else:
+            sha256 = file_sha256(path)
+            changed = not stored or stored[2] != sha256
+            if not changed:
+                # İçerik aynı, sadece mtime değişmiş: yeni mtime'ı kaydet
+                self.conn.execute(
+                    "UPDATE etl_sources SET size_bytes = ?, mtime_ns = ? WHERE source_path = ?",
+                    (stat.st_size, stat.st_mtime_ns, path)
+                )
+        
+        # Ayarı kaydedilmemiş eski yükleme bilinmeyen ayar sayılır (bir kez yeniden işlenir)
+        load_options = json.dumps(options, sort_keys=True) if options is not None else None
+        options_changed = load_options is not None and (not stored or stored[3] != load_options)
+        if options_changed and stored and not changed:
+            print(f"\n🔁 {path} yükleme ayarları değişti: {stored[3]} → {load_options}")
+        
+        self._fingerprints[path] = (stat.st_size, stat.st_mtime_ns, sha256, load_options)
+        self._decisions[path] = changed or options_changed or self.force
+        if not self._decisions[path]:
+            print(f"\n⏭️ {path} değişmedi, atlandı")
+        return self._decisions[path]
+
+    def mark_loaded(self, path):
+        size, mtime_ns, sha256, load_options = self._fingerprints[path]
+        self.conn.execute("""
+            INSERT INTO etl_sources (source_path, size_bytes, mtime_ns, sha256, loaded_at, load_options)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(source_path) DO UPDATE SET
+                size_bytes = excluded.size_bytes,
+                mtime_ns = excluded.mtime_ns,
+                sha256 = excluded.sha256,
+                loaded_at = excluded.loaded_at,
+                load_options = excluded.load_options
+        """, (path, size, mtime_ns, sha256 or file_sha256(path), datetime.now().isoformat(), load_options))
+
+def _report_changes(label, inserted, updated):
+    print(f"✓ {label}: {inserted} yeni, {updated} güncellendi")
+
+@contextmanager
+def deferred_indexes(conn, table, row_count):
+    """Çok satır yazılacaksa tablonun indekslerini kaldır, yazma bitince yeniden oluştur"""
+    if row_count < DEFER_INDEX_MIN_ROWS:
+        yield
+        return
+    
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+        "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'",
+        (table,)
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    yield
+    started = time.perf_counter()
+    for _, sql in indexes:
+        conn.execute(sql)
+    if indexes:
+        print(f"  ↳ {len(indexes)} indeks yeniden oluşturuldu ({time.perf_counter() - started:.2f}s)")
+
+def neighborhood_key(name):
+    """Mahalle adını karşılaştırma anahtarına çevir (boşluk, büyük harf, 'MAHALLESİ' eki)"""
+    key = re.sub(r'\s+', ' ', str(name).strip().upper())
+    key = re.sub(r'\s+(MAHALLESİ|MAHALLESI|MAH\.?)$', '', key)
+    return NEIGHBORHOOD_ALIASES.get(key, key)
+
+def neighborhood_lookup(conn):
+    """Normalize mahalle adı -> neighborhood_id (aynı anahtarlı kayıtlarda en eski kayıt)"""
+    rows = conn.execute("SELECT neighborhood_name, neighborhood_id FROM neighborhoods ORDER BY neighborhood_id").fetchall()
+    lookup = {}
+    for name, nid in rows:
+        lookup.setdefault(neighborhood_key(name), nid)
+    return lookup
+
+def _date_strings(days_ago, today=None):
+    """Gün farkı dizisini 'YYYY-MM-DD' dizisine çevir (her farklı gün bir kez biçimlenir)"""
+    today = today or datetime.now()
+    unique_days, inverse = np.unique(days_ago, return_inverse=True)
+    labels = np.array([(today - timedelta(days=int(d))).strftime('%Y-%m-%d') for d in unique_days], dtype=object)
+    return labels[inverse]
+
+def load_neighborhoods(conn):
+    """Mahalle verilerini yükle (normalize ad ile eşleşen mahalle varsa güncellenir)"""
+    print("\n📍 Mahalle verileri yükleniyor...")
     
-    print(f"✓ {count} mahalle yüklendi")
+    df = pd.read_csv(NEIGHBORHOODS_CSV, encoding='utf-8-sig', sep=';')
+    
+    area = df['alan'].astype(float) if 'alan' in df.columns else pd.Series(2.0, index=df.index)
+    population = df['nufus'].astype(str).str.replace('.', '', regex=False).astype(int)  # 4.371 -> 4371
+    density = np.where(area > 0, population / area.where(area > 0, 1), 5000)
+    
+    lookup = neighborhood_lookup(conn)
+    updates, inserts = [], []
+    for name, pop, dens, ar in zip(df['mahalle'].tolist(), population.tolist(), density.tolist(), area.tolist()):
+        nid = lookup.get(neighborhood_key(name))
+        if nid is None:
+            inserts.append((name, pop, dens, ar))
+        else:
+            updates.append((pop, dens, ar, nid, pop, dens, ar))
+    
+    before = conn.total_changes
+    conn.executemany("""
+        UPDATE neighborhoods
+        SET population = ?, population_density = ?, area_km2 = ?
+        WHERE neighborhood_id = ?
+        AND (population IS NOT ? OR population_density IS NOT ? OR area_km2 IS NOT ?)
+    """, updates)
+    updated = conn.total_changes - before
+    conn.executemany("""
+        INSERT OR IGNORE INTO neighborhoods (neighborhood_name, population, population_density, area_km2)
+        VALUES (?, ?, ?, ?)
+    """, inserts)
+    
+    _report_changes('Mahalleler', conn.total_changes - before - updated, updated)
 
-def load_vehicle_types():
+def load_vehicle_types(conn):
     """Araç tiplerini yükle"""
     print("\n🚛 Araç tipleri yükleniyor...")
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    types = [
-        ('Küçük Çöp Kamyonu', 3.0, 500),
-        ('Büyük Çöp Kamyonu', 8.0, 800),
-        ('Vinçli Araç', 1.0, 400)
-    ]
-    
-    for name, capacity, cost in types:
-        cursor.execute("""
-            INSERT OR IGNORE INTO vehicle_types (type_name, capacity_tons, hourly_cost)
-            VALUES (?, ?, ?)
-        """, (name, capacity, cost))
-    
-    conn.commit()
-    count = cursor.execute("SELECT COUNT(*) FROM vehicle_types").fetchone()[0]
-    conn.close()
-    
-    print(f"✓ {count} araç tipi yüklendi")
+    before_count = conn.execute("SELECT COUNT(*) FROM vehicle_types").fetchone()[0]
+    before = conn.total_changes
+    conn.executemany("""
+        INSERT INTO vehicle_types (type_name, capacity_tons, hourly_cost)
+        VALUES (?, ?, ?)
+        ON CONFLICT(type_name) DO UPDATE SET
+            capacity_tons = excluded.capacity_tons,
+            hourly_cost = excluded.hourly_cost
+        WHERE capacity_tons IS NOT excluded.capacity_tons OR hourly_cost IS NOT excluded.hourly_cost
+    """, VEHICLE_TYPES)
+    
+    inserted = conn.execute("SELECT COUNT(*) FROM vehicle_types").fetchone()[0] - before_count
+    _report_changes('Araç tipleri', inserted, conn.total_changes - before - inserted)
 
-def load_fleet():
+def load_fleet(conn):
     """Filo verilerini yükle"""
     print("\n🚗 Filo verileri yükleniyor...")
     
-    df = pd.read_csv('data/fleet.csv', encoding='utf-8-sig')
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Tip ID'lerini al ve mapping oluştur
-    type_map = {
-        'Large Garbage Truck': 2,  # Büyük Çöp Kamyonu
-        'Small Garbage Truck': 1,  # Küçük Çöp Kamyonu
-        'Crane Vehicle': 3          # Vinçli Araç
-    }
+    df = pd.read_csv(FLEET_CSV, encoding='utf-8-sig')
     
-    for _, row in df.iterrows():
-        vehicle_type = row['vehicle_type']
-        type_id = type_map.get(vehicle_type, 2)  # Default: Büyük
-        plate = f"{row['vehicle_id']}-{row['vehicle_name']}"
-        
-        cursor.execute("""
-            INSERT OR IGNORE INTO vehicles (plate_number, type_id, status)
-            VALUES (?, ?, 'active')
-        """, (plate, type_id))
+    type_ids = df['vehicle_type'].map(FLEET_TYPE_MAP).fillna(2).astype(int)  # Varsayılan: Büyük
+    plates = df['vehicle_id'].astype(str) + '-' + df['vehicle_name'].astype(str)
     
-    conn.commit()
-    count = cursor.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
-    conn.close()
+    # Plaka doğal anahtar; durum (status) yönetim tarafından değiştirilebildiği için korunur
+    before_count = conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+    before = conn.total_changes
+    conn.executemany("""
+        INSERT INTO vehicles (plate_number, type_id, status)
+        VALUES (?, ?, 'active')
+        ON CONFLICT(plate_number) DO UPDATE SET type_id = excluded.type_id
+        WHERE type_id IS NOT excluded.type_id
+    """, zip(plates.tolist(), type_ids.tolist()))
     
-    print(f"✓ {count} araç yüklendi")
+    inserted = conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0] - before_count
+    _report_changes('Araçlar', inserted, conn.total_changes - before - inserted)
+
+def generate_containers(counts, rng, today=None):
+    """Mahalle/tip sayılarından konteyner satırlarını vektörel üret
+    
+    counts: [(neighborhood_id, container_type, capacity, base_lat, base_lng, adet), ...]
+    """
+    repeats = np.array([c[5] for c in counts], dtype=np.int64)
+    n = int(repeats.sum())
+    if n == 0:
+        return []
+    
+    def expand(position, dtype=None):
+        return np.repeat(np.array([c[position] for c in counts], dtype=dtype), repeats)
+    
+    neighborhood_ids = expand(0, np.int64)
+    container_types = expand(1, object)
+    capacities = expand(2, np.int64)
+    
+    # Rastgele koordinatlar (mahalle içinde)
+    lat = expand(3, np.float64) + rng.uniform(-0.02, 0.02, n)
+    lng = expand(4, np.float64) + rng.uniform(-0.02, 0.02, n)
+    
+    # Son toplama tarihi (1-10 gün önce) ve doluluk seviyesi
+    days_ago = rng.integers(1, 11, n)
+    last_collection = _date_strings(days_ago, today)
+    fill_level = np.minimum(0.95, days_ago * 0.08 + rng.uniform(0, 0.2, n))
+    
+    return list(zip(
+        neighborhood_ids.tolist(), container_types.tolist(), capacities.tolist(),
+        lat.tolist(), lng.tolist(), last_collection.tolist(), fill_level.tolist()
+    ))
+
+def load_containers(conn, rng, scale=1):
+    """Konteyner adetlerini CSV ile uzlaştır (scale: her mahalle/tip adedinin çarpanı, yük testi için)
 
-def load_containers():
-    """Konteyner verilerini yükle"""
+    Her (mahalle, tip) için aktif konteyner sayısı hedefe getirilir: eksikse
+    önce pasifler yeniden aktifleşir, sonra yenisi üretilir; fazlaysa en yeni
+    kayıtlar pasife alınır (rapor/olay geçmişi silinmez).
+    """
     print("\n🗑️ Konteyner verileri oluşturuluyor...")
+    started = time.perf_counter()
     
-    df = pd.read_csv('data/container_counts.csv', encoding='utf-8-sig', sep=';')
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    df = pd.read_csv(CONTAINER_COUNTS_CSV, encoding='utf-8-sig', sep=';')
     
     # Mahalle ID'lerini al
-    cursor.execute("SELECT neighborhood_id, neighborhood_name FROM neighborhoods")
-    neighborhood_map = {name: nid for nid, name in cursor.fetchall()}
-    
-    total_containers = 0
-    
-    for _, row in df.iterrows():
-        mahalle = row['MAHALLE']
-        neighborhood_id = neighborhood_map.get(mahalle)
-        
-        if not neighborhood_id:
+    neighborhood_map = neighborhood_lookup(conn)
+    df['neighborhood_id'] = df['MAHALLE'].map(lambda name: neighborhood_map.get(neighborhood_key(name)))
+    unmatched = df.loc[df['neighborhood_id'].isna(), 'MAHALLE'].str.strip().tolist()
+    if unmatched:
+        print(f"  ⚠️ Eşleşmeyen mahalleler atlandı: {', '.join(unmatched)}")
+    df = df[df['neighborhood_id'].notna()]
+    
+    # Hedef adetler: (mahalle, tip) -> adet
+    targets = {}
+    specs = {}
+    for container_type, col_name, capacity, base_lat, base_lng in CONTAINER_TYPES:
+        specs[container_type] = (capacity, base_lat, base_lng)
+        if col_name not in df.columns:
             continue
-        
-        # Her mahalle için konteynerleri oluştur
-        types = [
-            ('underground', 'YERALTI KONTEYNER', 5000, 40.2, 28.9),
-            ('770lt', '770 LT KONTEYNER', 770, 40.2, 28.9),
-            ('400lt', '400 LT KONTEYNER', 400, 40.2, 28.9),
-            ('plastic', 'PLASTİK', 240, 40.2, 28.9)
-        ]
-        
-        for container_type, col_name, capacity, base_lat, base_lng in types:
-            if col_name in df.columns:
-                count = int(row[col_name]) if pd.notna(row[col_name]) else 0
-                
-                for i in range(count):
-                    # Rastgele koordinatlar (mahalle içinde)
-                    lat = base_lat + random.uniform(-0.02, 0.02)
-                    lng = base_lng + random.uniform(-0.02, 0.02)
-                    
-                    # Son toplama tarihi (1-10 gün önce)
-                    days_ago = random.randint(1, 10)
-                    last_collection = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
-                    
-                    # Doluluk seviyesi
-                    fill_level = min(0.95, days_ago * 0.08 + random.uniform(0, 0.2))
-                    
-                    cursor.execute("""
-                        INSERT INTO containers 
-                        (neighborhood_id, container_type, capacity_liters, latitude, longitude, 
-                         last_collection_date, current_fill_level, status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, 'active')
-                    """, (neighborhood_id, container_type, capacity, lat, lng, last_collection, fill_level))
-                    
-                    total_containers += 1
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"✓ {total_containers} konteyner oluşturuldu")
-
-def load_tonnage_statistics():
+        type_counts = pd.to_numeric(df[col_name], errors='coerce').fillna(0).astype(int) * scale
+        for neighborhood_id, count in zip(df['neighborhood_id'].astype(int), type_counts):
+            key = (int(neighborhood_id), container_type)
+            targets[key] = targets.get(key, 0) + int(count)
+    
+    # Mevcut adetler
+    current = {}
+    for neighborhood_id, container_type, status, count in conn.execute("""
+        SELECT neighborhood_id, container_type, status, COUNT(*)
+        FROM containers
+        GROUP BY neighborhood_id, container_type, status
+    """):
+        current[(neighborhood_id, container_type, status)] = count
+    
+    to_create = []
+    reactivated = deactivated = 0
+    for (neighborhood_id, container_type), target in targets.items():
+        diff = target - current.get((neighborhood_id, container_type, 'active'), 0)
+        if diff > 0:
+            revive = min(diff, current.get((neighborhood_id, container_type, 'inactive'), 0))
+            if revive:
+                conn.execute("""
+                    UPDATE containers SET status = 'active'
+                    WHERE container_id IN (
+                        SELECT container_id FROM containers
+                        WHERE neighborhood_id = ? AND container_type = ? AND status = 'inactive'
+                        ORDER BY container_id LIMIT ?
+                    )
+                """, (neighborhood_id, container_type, revive))
+                reactivated += revive
+            if diff > revive:
+                capacity, base_lat, base_lng = specs[container_type]
+                to_create.append((neighborhood_id, container_type, capacity, base_lat, base_lng, diff - revive))
+        elif diff < 0:
+            conn.execute("""
+                UPDATE containers SET status = 'inactive'
+                WHERE container_id IN (
+                    SELECT container_id FROM containers
+                    WHERE neighborhood_id = ? AND container_type = ? AND status = 'active'
+                    ORDER BY container_id DESC LIMIT ?
+                )
+            """, (neighborhood_id, container_type, -diff))
+            deactivated += -diff
+    
+    rows = generate_containers(to_create, rng)
+    with deferred_indexes(conn, 'containers', len(rows)):
+        conn.executemany("""
+            INSERT INTO containers
+            (neighborhood_id, container_type, capacity_liters, latitude, longitude,
+             last_collection_date, current_fill_level, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'active')
+        """, rows)
+    
+    elapsed = time.perf_counter() - started
+    print(f"✓ {len(rows)} konteyner oluşturuldu, {reactivated} yeniden aktif, {deactivated} pasife alındı "
+          f"({elapsed:.2f}s, {len(rows) / max(elapsed, 1e-9):,.0f} satır/s)")
+
+def load_tonnage_statistics(conn):
     """Tonaj istatistiklerini yükle"""
     print("\n📊 Tonaj istatistikleri yükleniyor...")
     
-    df = pd.read_csv('data/tonnages.csv', encoding='utf-8-sig')
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    for _, row in df.iterrows():
-        month = f"{row['AY']}-{row['YIL']}"
-        surface = float(row['Yer Üstü Tonaj (TON)']) if pd.notna(row.get('Yer Üstü Tonaj (TON)')) else 0
-        underground = float(row['Yer Altı Tonaj (TON)']) if pd.notna(row.get('Yer Altı Tonaj (TON)')) else 0
-        total = float(row['Toplam Tonaj (TON)']) if pd.notna(row.get('Toplam Tonaj (TON)')) else (surface + underground)
-        
-        cursor.execute("""
-            INSERT OR IGNORE INTO tonnage_statistics (month, surface_tonnage, underground_tonnage, total_tonnage)
-            VALUES (?, ?, ?, ?)
-        """, (month, surface, underground, total))
-    
-    conn.commit()
-    count = cursor.execute("SELECT COUNT(*) FROM tonnage_statistics").fetchone()[0]
-    conn.close()
-    
-    print(f"✓ {count} aylık tonaj verisi yüklendi")
+    # Bazı satırlarda fazladan sondaki virgül var; sadece başlıktaki 6 sütunu oku
+    df = pd.read_csv(TONNAGES_CSV, encoding='utf-8-sig', usecols=range(6))
+    
+    def column(name):
+        return pd.to_numeric(df[name], errors='coerce') if name in df.columns else pd.Series(np.nan, index=df.index)
+    
+    month = df['AY'].astype(str) + '-' + df['YIL'].astype(str)
+    surface = column('Yer Üstü Tonaj (TON)').fillna(0)
+    underground = column('Yer Altı Tonaj (TON)').fillna(0)
+    total = column('Toplam Tonaj (TON)').fillna(surface + underground)
+    
+    # Ay doğal anahtar (idx_tonnage_month); sadece değeri değişen aylar güncellenir
+    before_count = conn.execute("SELECT COUNT(*) FROM tonnage_statistics").fetchone()[0]
+    before = conn.total_changes
+    conn.executemany("""
+        INSERT INTO tonnage_statistics (month, surface_tonnage, underground_tonnage, total_tonnage)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(month) DO UPDATE SET
+            surface_tonnage = excluded.surface_tonnage,
+            underground_tonnage = excluded.underground_tonnage,
+            total_tonnage = excluded.total_tonnage
+        WHERE surface_tonnage IS NOT excluded.surface_tonnage
+        OR underground_tonnage IS NOT excluded.underground_tonnage
+        OR total_tonnage IS NOT excluded.total_tonnage
+    """, zip(month.tolist(), surface.tolist(), underground.tolist(), total.tolist()))
+    
+    inserted = conn.execute("SELECT COUNT(*) FROM tonnage_statistics").fetchone()[0] - before_count
+    _report_changes('Aylık tonaj', inserted, conn.total_changes - before - inserted)
 
-def generate_collection_events():
-    """Sentetik toplama olayları oluştur (model eğitimi için)"""
+def generate_events(containers, vehicles, rng, today=None):
+    """Her konteyner için 1-3 sentetik toplama olayını vektörel üret
+    
+    containers: [(container_id, capacity_liters), ...]
+    """
+    if not containers:
+        return []
+    container_ids = np.array([c[0] for c in containers], dtype=np.int64)
+    capacities = np.array([c[1] for c in containers], dtype=np.float64)
+    
+    num_events = rng.integers(1, 4, len(containers))
+    container_ids = np.repeat(container_ids, num_events)
+    capacities = np.repeat(capacities, num_events)
+    n = len(container_ids)
+    
+    # Rastgele tarih (son 60 gün)
+    collection_date = _date_strings(rng.integers(1, 61, n), today)
+    
+    # Tonaj (kapasite ve doluluk seviyesine göre), süre ve araç
+    fill_before = rng.uniform(0.6, 0.95, n)
+    tonnage = (capacities / 1000) * fill_before * rng.uniform(0.8, 1.2, n)
+    duration = rng.integers(5, 21, n)
+    vehicle_ids = rng.choice(np.array(vehicles, dtype=np.int64), n) if vehicles else np.ones(n, dtype=np.int64)
+    
+    return list(zip(
+        container_ids.tolist(), vehicle_ids.tolist(), collection_date.tolist(),
+        tonnage.tolist(), fill_before.tolist(), duration.tolist()
+    ))
+
+def generate_collection_events(conn, rng, container_limit=500):
+    """Sentetik toplama olayları oluştur (model eğitimi için; container_limit=0: tüm konteynerler)
+
+    Olayı olan konteynerler hedefe sayılır ve tekrar üretilmez; yeniden
+    çalıştırma sadece eksik kalan konteynerlere olay ekler.
+    """
     print("\n🔄 Toplama olayları oluşturuluyor...")
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Konteynerleri al
-    cursor.execute("SELECT container_id, capacity_liters FROM containers LIMIT 500")
-    containers = cursor.fetchall()
+    started = time.perf_counter()
+    
+    covered = {row[0] for row in conn.execute("SELECT DISTINCT container_id FROM collection_events")}
+    needed = (container_limit - len(covered)) if container_limit else None
+    if needed is not None and needed <= 0:
+        print(f"✓ Toplama olayları güncel ({len(covered)} konteyner)")
+        return
+    
+    # Olayı olmayan aktif konteynerleri al
+    containers = []
+    cursor = conn.execute("SELECT container_id, capacity_liters FROM containers WHERE status = 'active' ORDER BY container_id")
+    for container_id, capacity in cursor:
+        if container_id not in covered:
+            containers.append((container_id, capacity))
+            if needed is not None and len(containers) >= needed:
+                break
     
     # Araçları al
-    cursor.execute("SELECT vehicle_id FROM vehicles")
-    vehicles = [v[0] for v in cursor.fetchall()]
-    
-    events_created = 0
-    
-    for container_id, capacity in containers:
-        # Her konteyner için 1-3 toplama olayı
-        num_events = random.randint(1, 3)
-        
-        for _ in range(num_events):
-            # Rastgele tarih (son 60 gün)
-            days_ago = random.randint(1, 60)
-            collection_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
-            
-            # Tonnage (kapasite ve doluluk seviyesine göre)
-            fill_before = random.uniform(0.6, 0.95)
-            tonnage = (capacity / 1000) * fill_before * random.uniform(0.8, 1.2)
-            
-            # Süre
-            duration = random.randint(5, 20)
-            
-            # Rastgele araç
-            vehicle_id = random.choice(vehicles) if vehicles else 1
-            
-            cursor.execute("""
-                INSERT INTO collection_events 
-                (container_id, vehicle_id, collection_date, tonnage_collected, 
-                 fill_level_before, collection_duration_minutes)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (container_id, vehicle_id, collection_date, tonnage, fill_before, duration))
-            
-            events_created += 1
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"✓ {events_created} toplama olayı oluşturuldu")
+    vehicles = [v[0] for v in conn.execute("SELECT vehicle_id FROM vehicles").fetchall()]
+    
+    rows = generate_events(containers, vehicles, rng)
+    with deferred_indexes(conn, 'collection_events', len(rows)):
+        conn.executemany("""
+            INSERT INTO collection_events
+            (container_id, vehicle_id, collection_date, tonnage_collected,
+             fill_level_before, collection_duration_minutes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+    if rows:
+        container_ids, _, _, tonnages, fill_befores, _ = zip(*rows)
+        container_stats.record_events(conn, container_ids, tonnages, fill_befores)
+    
+    elapsed = time.perf_counter() - started
+    print(f"✓ {len(rows)} toplama olayı oluşturuldu ({elapsed:.2f}s, {len(rows) / max(elapsed, 1e-9):,.0f} satır/s)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Nilüfer atık verilerini SQLite veritabanına yükle')
+    parser.add_argument('--force', action='store_true',
+                        help='Değişmemiş kaynak dosyaları da yeniden işle')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='Konteyner adetleri çarpanı (yük testi için sentetik büyütme)')
+    parser.add_argument('--event-containers', type=int, default=500,
+                        help='Toplama olayı üretilecek konteyner sayısı (0: tümü)')
+    parser.add_argument('--seed', type=int, default=None, help='Tekrarlanabilir üretim için tohum')
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """Ana fonksiyon"""
+    args = parse_args(argv)
+    
     print("=" * 60)
     print("NİLÜFER BELEDİYESİ - VERİ YÜKLEME")
     print("SQLite ile Gerçek Veriler")
     print("=" * 60)
     
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    
     try:
-        load_neighborhoods()
-        load_vehicle_types()
-        load_fleet()
-        load_containers()
-        load_tonnage_statistics()
-        generate_collection_events()
+        with bulk_load() as conn:
+            ensure_etl_schema(conn)
+            container_stats.ensure_stats_schema(conn)
+            sources = SourceTracker(conn, force=args.force)
+            
+            neighborhoods_changed = sources.changed(NEIGHBORHOODS_CSV)
+            if neighborhoods_changed:
+                load_neighborhoods(conn)
+                sources.mark_loaded(NEIGHBORHOODS_CSV)
+            load_vehicle_types(conn)
+            if sources.changed(FLEET_CSV):
+                load_fleet(conn)
+                sources.mark_loaded(FLEET_CSV)
+            # Konteyner hedefleri mahalle eşleşmesine ve --scale'e de bağlı (ölçek değişince uzlaştır)
+            if sources.changed(CONTAINER_COUNTS_CSV, options={'scale': args.scale}) or neighborhoods_changed:
+                load_containers(conn, rng, scale=args.scale)
+                sources.mark_loaded(CONTAINER_COUNTS_CSV)
+            if sources.changed(TONNAGES_CSV):
+                load_tonnage_statistics(conn)
+                sources.mark_loaded(TONNAGES_CSV)
+            generate_collection_events(conn, rng, container_limit=args.event_containers)
         
         print("\n" + "=" * 60)
-        print("✅ TÜM VERİLER BAŞARIYLA YÜKLENDİ!")
+        print(f"✅ TÜM VERİLER BAŞARIYLA YÜKLENDİ! ({time.perf_counter() - started:.2f}s)")
         print("=" * 60)
         print("\n📊 Özet:")
         
@@ -266,7 +586,7 @@ def main():
             print(f"  {key}: {value}")
         
         print("\n📋 Sıradaki adım: python train_model_sqlite.py")
-        
+    
     except Exception as e:
         print(f"\n❌ Hata: {e}")
         import traceback
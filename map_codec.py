@@ -0,0 +1,101 @@
+"""
+Harita Yükü Kodlayıcı
+Konteyner haritası için sütunlu (columnar) ve paketlenmiş ikili (binary) yanıt biçimleri
+
+Sütunlu JSON: anahtar adları her satırda tekrarlanmaz, tip/mahalle/tarih
+sözlükle kodlanır, koordinatlar ORIGIN'e göre 1e-5 derece (~1.1 m) tamsayı,
+doluluk 1/1000 tamsayı olarak gönderilir.
+
+İkili biçim (little-endian):
+    'KMAP' | uint32 başlık uzunluğu | başlık JSON (4 bayta hizalı) | sütunlar
+Her sütun başlıktaki 'columns' listesinde (ad, dtype, offset) ile tanımlıdır
+ve tarayıcıda kopyalamadan TypedArray olarak okunabilmesi için 4 bayta hizalıdır.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+CODEC_VERSION = 2
+MAGIC = b'KMAP'
+COORD_SCALE = 100000      # 1e-5 derece
+FILL_SCALE = 1000
+
+# (ad, numpy dtype, JS TypedArray)
+BINARY_COLUMNS = [
+    ('id', '<u4', 'Uint32Array'),
+    ('lat', '<i4', 'Int32Array'),
+    ('lng', '<i4', 'Int32Array'),
+    ('capacity', '<u4', 'Uint32Array'),
+    ('fill_level', '<u2', 'Uint16Array'),
+    ('type', '<u2', 'Uint16Array'),
+    ('neighborhood', '<u2', 'Uint16Array'),
+    # Bildirimler mikrosaniyeli zaman damgası yazar; farklı tarih sayısı 65535'i aşabilir
+    ('last_collection', '<u4', 'Uint32Array')
+]
+DICTIONARY_COLUMNS = {'type': 'types', 'neighborhood': 'neighborhoods', 'last_collection': 'last_collections'}
+
+def _dictionary_encode(values):
+    """Değerleri ilk görülme sırasına göre sözlük + kod dizisine çevir"""
+    dictionary = {}
+    codes = [dictionary.setdefault(v, len(dictionary)) for v in values]
+    return list(dictionary), codes
+
+def encode_columnar(containers):
+    """Harita kayıtlarını (id, type, fill_level, lat, lng, capacity, neighborhood, last_collection) sütunlara çevir"""
+    n = len(containers)
+    lat = np.fromiter((c['lat'] for c in containers), dtype=np.float64, count=n)
+    lng = np.fromiter((c['lng'] for c in containers), dtype=np.float64, count=n)
+    origin = [float(lat.min()), float(lng.min())] if n else [0.0, 0.0]
+    origin = [round(v, 5) for v in origin]
+
+    payload = {
+        'format': 'columnar',
+        'version': CODEC_VERSION,
+        'count': n,
+        'origin': origin,
+        'coord_scale': COORD_SCALE,
+        'fill_scale': FILL_SCALE,
+        'id': [c['id'] for c in containers],
+        'lat': np.rint((lat - origin[0]) * COORD_SCALE).astype(np.int64).tolist(),
+        'lng': np.rint((lng - origin[1]) * COORD_SCALE).astype(np.int64).tolist(),
+        'fill_level': [int(round(c['fill_level'] * FILL_SCALE)) for c in containers],
+        'capacity': [c['capacity'] or 0 for c in containers]
+    }
+    for column, dictionary_key in DICTIONARY_COLUMNS.items():
+        dictionary, codes = _dictionary_encode([c[column] for c in containers])
+        payload[dictionary_key] = dictionary
+        payload[column] = codes
+    return payload
+
+def encode_binary(columnar):
+    """Sütunlu yükü tek bir ikili gövdeye paketle"""
+    n = columnar['count']
+    column_names = {name for name, _, _ in BINARY_COLUMNS}
+    header = {key: value for key, value in columnar.items() if key not in column_names}
+    header['format'] = 'binary'
+
+    # Başlığın son hali offset'lere bağlı; sütun yerleşimini başlık boyutundan bağımsız tut
+    layout = []
+    offset = 0
+    for name, dtype, array_type in BINARY_COLUMNS:
+        layout.append([name, array_type, offset])
+        size = n * np.dtype(dtype).itemsize
+        offset += size + (-size % 4)
+    header['columns'] = layout
+    header['body_length'] = offset
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+
+    parts = [MAGIC, struct.pack('<I', len(header_bytes)), header_bytes]
+    for name, dtype, _ in BINARY_COLUMNS:
+        values = np.asarray(columnar[name], dtype=np.int64)
+        limits = np.iinfo(dtype)
+        if len(values) and (values.min() < limits.min or values.max() > limits.max):
+            # Sessizce taşıp tarayıcıda yanlış değer göstermektense hata ver
+            raise ValueError(f"'{name}' sütunu {dtype} aralığını aşıyor ({values.min()}..{values.max()})")
+        data = values.astype(dtype).tobytes()
+        parts.append(data + b'\0' * (-len(data) % 4))
+    return b''.join(parts)
@@ -0,0 +1,365 @@
+"""
+Model Kayıt Defteri
+Sürümlü, sağlama toplamlı model dosyaları ve manifest
+
+models/manifest.json her sürüm için dosya adını, sha256 özetini, özellik
+şemasını ve metrikleri tutar; 'active' alanı servis edilen sürümü
+gösterir. Dosyalar bir kez yazılır, üzerine yazılmaz. Aktif sürümü
+değiştirmek (yayın, geri alma) sadece manifesti atomik olarak değiştirir;
+çalışan süreçler manifest değişikliğini bir sonraki istekte görür.
+
+Modeller ilk ihtiyaçta yüklenir; joblib mmap_mode ile NumPy dizileri
+bellek eşlemeli açılır (aynı dosyayı açan işçiler sayfaları paylaşır).
+
+Her sürümle birlikte derlenmiş orman dosyaları (forest_engine) da yazılır
+ve yayın sırasında sklearn çıktısıyla doğrulanır. Servis INFERENCE_ENGINE
+ile seçilen motoru yükler; derlenmiş motorda sklearn nesnesi hiç açılmaz.
+
+Kullanım: python model_registry.py [list | activate VERSION | rollback]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import joblib
+
+import feature_pipeline
+import forest_engine
+from retrain_worker import atomic_dump
+
+MODEL_DIR = 'models'
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_PREFIX = 'fill_predictor-'
+LEGACY_ARTIFACT = 'fill_predictor.pkl'   # Kayıt defteri öncesi tek dosya; ilk açılışta içe alınır
+HISTORY_LIMIT = 5
+MMAP_MODE = os.environ.get('MODEL_MMAP_MODE', 'r') or None
+MANIFEST_CHECK_S = 2.0                   # Başka süreçlerin manifest değişikliklerini yoklama aralığı
+# compiled: sklearn ile birebir aynı olasılıklar | lean: nicemlenmiş, daha az bellek | sklearn: derlenmemiş
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'compiled')
+
+class RegistryError(Exception):
+    pass
+
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_json_atomic(obj, path):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class ModelRegistry:
+    """Manifest tabanlı model deposu
+
+    active() istek yolunda çağrılır: manifest değişmediyse bellekteki
+    modeli döndürür, değiştiyse yeni aktif sürümü yükler. Dönen sözlük
+    her zaman 'model', 'version', 'trained_at' ve şema alanlarını içerir.
+    """
+
+    def __init__(self, directory=MODEL_DIR, history_limit=HISTORY_LIMIT, mmap_mode=MMAP_MODE,
+                 engine=INFERENCE_ENGINE):
+        if engine != 'sklearn' and engine not in forest_engine.MODES:
+            raise ValueError(f"Bilinmeyen çıkarım motoru: {engine}")
+        self.directory = directory
+        self.engine = engine
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.history_limit = history_limit
+        self.mmap_mode = mmap_mode
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        self._loaded = {}          # version -> model sözlüğü
+        self._failed = set()       # yüklenemeyen / uyumsuz sürümler (tekrar denenmez)
+
+    # --- manifest ---
+
+    def _read_manifest(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return self._import_legacy()
+        if mtime != self._manifest_mtime:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def manifest(self, force=False):
+        """Güncel manifest (en fazla MANIFEST_CHECK_S saniyede bir diskten kontrol edilir)"""
+        with self._lock:
+            now = time.monotonic()
+            if force or self._manifest is None or now - self._checked_at >= MANIFEST_CHECK_S:
+                self._checked_at = now
+                self._read_manifest()
+            return self._manifest
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json_atomic(manifest, self.manifest_path)
+        self._manifest = manifest
+        self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+        self._checked_at = time.monotonic()
+
+    def _import_legacy(self):
+        """Manifest yoksa eski tek dosyalı modeli ilk sürüm olarak kaydet"""
+        manifest = {'active': None, 'versions': []}
+        legacy_path = os.path.join(self.directory, LEGACY_ARTIFACT)
+        if os.path.exists(legacy_path):
+            entry = {
+                'version': 'legacy',
+                'file': LEGACY_ARTIFACT,
+                'sha256': file_sha256(legacy_path),
+                'size_bytes': os.path.getsize(legacy_path),
+                'created_at': datetime.fromtimestamp(os.path.getmtime(legacy_path)).isoformat(),
+                'source': 'legacy',
+                'metrics': {}
+            }
+            manifest = {'active': 'legacy', 'versions': [entry]}
+            try:
+                self._save_manifest(manifest)
+            except OSError as e:
+                print(f"⚠️ Model manifesti yazılamadı: {e}")
+        self._manifest = manifest
+        return manifest
+
+    def _entry(self, manifest, version):
+        for entry in manifest['versions']:
+            if entry['version'] == version:
+                return entry
+        return None
+
+    # --- okuma ---
+
+    def active(self):
+        """Aktif model sözlüğü; yüklü model yoksa None"""
+        manifest = self.manifest()
+        version = manifest.get('active')
+        if version is None:
+            return None
+        model_data = self._loaded.get(version)
+        if model_data is not None or version in self._failed:
+            return model_data
+        return self.load(version)
+
+    def load(self, version):
+        """Sürümü diskten yükle: sağlama toplamı ve özellik şeması doğrulanır"""
+        with self._lock:
+            if version in self._loaded:
+                return self._loaded[version]
+            entry = self._entry(self.manifest(), version)
+            if entry is None:
+                raise RegistryError(f"Model sürümü bulunamadı: {version}")
+
+            started = time.perf_counter()
+            engine_entry = entry.get('engines', {}).get(self.engine)
+            try:
+                if engine_entry is not None:
+                    # Derlenmiş motor yayında doğrulandı: sklearn nesnesi yüklenmez
+                    model_data = self._normalize({'model': self._read_artifact(engine_entry)}, entry)
+                else:
+                    model_data = self._normalize(self._read_artifact(entry), entry)
+                    if self.engine != 'sklearn':
+                        model_data['model'] = forest_engine.CompiledForest.from_sklearn(model_data['model'], self.engine)
+            except (OSError, RegistryError, ValueError, EOFError, ImportError, AttributeError) as e:
+                print(f"⚠️ Model {version} yüklenemedi: {e}")
+                self._failed.add(version)
+                return None
+            model_data['engine'] = self.engine
+
+            if not feature_pipeline.is_compatible(model_data):
+                print(f"⚠️ Model {version} özellik şeması uyumsuz, yeniden eğitim gerekli")
+                self._failed.add(version)
+                return None
+
+            # Sadece aktif ve bir önceki sürüm bellekte tutulur
+            keep = {version, self._manifest.get('active')}
+            self._loaded = {v: m for v, m in self._loaded.items() if v in keep}
+            self._loaded[version] = model_data
+            print(f"✓ Model yüklendi: {version} [{self.engine}] ({time.perf_counter() - started:.2f}s)")
+            return model_data
+
+    def _read_artifact(self, entry):
+        path = os.path.join(self.directory, entry['file'])
+        if file_sha256(path) != entry['sha256']:
+            raise RegistryError(f"{entry['file']} sağlama toplamı manifestle uyuşmuyor")
+        return joblib.load(path, mmap_mode=self.mmap_mode)
+
+    @staticmethod
+    def _normalize(raw, entry):
+        """Eski kayıt biçimlerini tek şemaya çevir (version / feature_columns eksik olabilir)"""
+        model_data = dict(raw) if isinstance(raw, dict) else {'model': raw}
+        model_data['version'] = entry['version']
+        model_data.setdefault('trained_at', entry.get('trained_at') or entry.get('created_at'))
+        for key in ('feature_schema_version', 'feature_columns'):
+            if key not in model_data and key in entry:
+                model_data[key] = entry[key]
+        for key, value in entry.get('metrics', {}).items():
+            model_data.setdefault(key, value)
+        return model_data
+
+    def versions(self):
+        manifest = self.manifest()
+        return [dict(entry, active=entry['version'] == manifest.get('active')) for entry in manifest['versions']]
+
+    # --- yazma ---
+
+    def publish(self, model, metrics=None, source='', activate=True, validation_X=None):
+        """Yeni sürümü yaz, manifeste ekle ve (varsayılan) aktif yap; sürüm adını döndür
+
+        validation_X verilirse derlenmiş motorlar bu örneklerde sklearn ile
+        karşılaştırılır; 'compiled' motor birebir aynı değilse yazılmaz.
+        """
+        trained_at = datetime.now()
+        with self._lock:
+            manifest = self.manifest(force=True)
+            known = {entry['version'] for entry in manifest['versions']}
+            version = f"v1.{trained_at.strftime('%Y%m%d%H%M%S')}"
+            suffix = 1
+            while version in known:
+                suffix += 1
+                version = f"v1.{trained_at.strftime('%Y%m%d%H%M%S')}.{suffix}"
+
+            model_data = {
+                'model': model,
+                'version': version,
+                **feature_pipeline.schema_metadata(),
+                **(metrics or {}),
+                'trained_at': trained_at.isoformat()
+            }
+            file_name = f"{ARTIFACT_PREFIX}{version}.pkl"
+            path = os.path.join(self.directory, file_name)
+            atomic_dump(model_data, path)
+
+            entry = {
+                'version': version,
+                'file': file_name,
+                'sha256': file_sha256(path),
+                'size_bytes': os.path.getsize(path),
+                'created_at': datetime.now().isoformat(),
+                'trained_at': model_data['trained_at'],
+                'source': source,
+                'model_class': type(model).__name__,
+                'metrics': dict(metrics or {}),
+                'engines': self._publish_engines(model, version, validation_X),
+                **feature_pipeline.schema_metadata()
+            }
+            manifest = {
+                'active': version if activate else manifest.get('active'),
+                'versions': manifest['versions'] + [entry]
+            }
+            self._prune(manifest)
+            self._save_manifest(manifest)
+            self._failed.discard(version)
+            return version
+
+    def _publish_engines(self, model, version, validation_X):
+        """Derlenmiş orman dosyalarını yaz; mod -> {dosya, sha256, doğrulama farkı}"""
+        if not hasattr(model, 'estimators_') and not hasattr(model, 'tree_'):
+            return {}
+        engines = {}
+        for mode in forest_engine.MODES:
+            try:
+                forest = forest_engine.CompiledForest.from_sklearn(model, mode)
+            except ValueError as e:
+                print(f"⚠️ {mode} motoru derlenemedi: {e}")
+                continue
+            max_abs_diff = forest_engine.validate(forest, model, validation_X) if validation_X is not None else None
+            if mode == 'compiled' and max_abs_diff:
+                print(f"⚠️ Derlenmiş motor sklearn'den farklı (en büyük fark {max_abs_diff:.2e}), yazılmadı")
+                continue
+            file_name = f"{ARTIFACT_PREFIX}{version}.{mode}.pkl"
+            path = os.path.join(self.directory, file_name)
+            atomic_dump(forest, path)
+            engines[mode] = {
+                'file': file_name,
+                'sha256': file_sha256(path),
+                'size_bytes': os.path.getsize(path),
+                'nbytes': forest.nbytes,
+                'node_count': forest.node_count,
+                'validated_rows': 0 if validation_X is None else len(validation_X),
+                'max_abs_diff': max_abs_diff
+            }
+        return engines
+
+    def _prune(self, manifest):
+        """En yeni history_limit sürüm ve aktif sürüm dışındakileri sil"""
+        keep = manifest['versions'][-self.history_limit:]
+        active = self._entry(manifest, manifest['active'])
+        if active is not None and active not in keep:
+            keep.insert(0, active)
+        for entry in manifest['versions']:
+            if entry not in keep and entry['file'] != LEGACY_ARTIFACT:
+                files = [entry['file']] + [engine['file'] for engine in entry.get('engines', {}).values()]
+                for name in files:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+        manifest['versions'] = [e for e in manifest['versions'] if e in keep or e['file'] == LEGACY_ARTIFACT]
+
+    def activate(self, version):
+        """Kayıtlı bir sürümü aktif yap (dosya doğrulanmadan aktif edilmez)"""
+        with self._lock:
+            manifest = self.manifest(force=True)
+            if self._entry(manifest, version) is None:
+                raise RegistryError(f"Model sürümü bulunamadı: {version}")
+            self._failed.discard(version)
+            if self.load(version) is None:
+                raise RegistryError(f"Model sürümü yüklenemedi: {version}")
+            self._save_manifest({**manifest, 'active': version})
+            return version
+
+    def rollback(self):
+        """Aktif sürümden bir önceki kayıtlı sürüme dön"""
+        with self._lock:
+            manifest = self.manifest(force=True)
+            versions = [entry['version'] for entry in manifest['versions']]
+            active = manifest.get('active')
+            if active not in versions or versions.index(active) == 0:
+                raise RegistryError("Geri alınacak önceki sürüm yok")
+            return self.activate(versions[versions.index(active) - 1])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Model kayıt defteri')
+    parser.add_argument('command', nargs='?', default='list', choices=['list', 'activate', 'rollback'])
+    parser.add_argument('version', nargs='?')
+    parser.add_argument('--dir', default=MODEL_DIR)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    registry = ModelRegistry(args.dir)
+    try:
+        if args.command == 'activate':
+            if not args.version:
+                print("❌ Sürüm belirtin")
+                return 1
+            print(f"✓ Aktif sürüm: {registry.activate(args.version)}")
+        elif args.command == 'rollback':
+            print(f"✓ Geri alındı, aktif sürüm: {registry.rollback()}")
+        for entry in registry.versions():
+            marker = '*' if entry['active'] else ' '
+            metrics = ', '.join(f"{k}={v:.3f}" for k, v in entry.get('metrics', {}).items() if isinstance(v, (int, float)))
+            print(f" {marker} {entry['version']:<24} {entry['created_at'][:19]}  {entry.get('source', '')}  {metrics}")
+    except RegistryError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+"""
+Tahmin Önbelleği
+(container_id, model sürümü) anahtarlı LRU/TTL önbellek ve predictions
+tablosuna toplu geri yazma
+
+Tahmin girdileri sadece bildirim, toplama ya da yeniden eğitimle değişir;
+zaman özellikleri (son toplamadan geçen saat) için kayıtlar TTL ile
+eskir. Her konteynerin bir nesil sayacı vardır: yazma yolu
+invalidate(container_id) çağırır, hesap sürerken gelen bir yazma bayat
+sonucun önbelleğe girmesini engeller.
+
+predictions tablosu sınırlı tutulur: aktif model sürümü değişince diğer
+sürümlerin satırları, her durumda PREDICTION_RETENTION_DAYS günden eskiler silinir.
+"""
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+PREDICTION_TTL_S = 300
+MAX_ENTRIES = 200000
+WRITE_BATCH_ROWS = 1000
+WRITE_FLUSH_S = 2.0
+WRITE_QUEUE_ROWS = 100000
+PREDICTION_RETENTION_DAYS = 7
+PRUNE_INTERVAL_S = 600
+
+PREDICTION_PRUNE = "DELETE FROM predictions WHERE model_version != ? OR predicted_at < ?"
+
+PREDICTION_INSERT = """
+    INSERT INTO predictions
+    (container_id, model_version, predicted_fill_level, confidence_score, is_full, predicted_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+class PredictionCache:
+    """İş parçacığı güvenli LRU + TTL tahmin önbelleği"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=PREDICTION_TTL_S):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()     # (container_id, version) -> (expires_at, value)
+        self._generations = {}            # container_id -> int
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0, 'model_swaps': 0}
+
+    def _sync_version(self, version):
+        """Model sürümü değiştiyse eski sürümün kayıtlarını at (kilit altında çağrılır)"""
+        if version != self._version:
+            if self._version is not None:
+                self._stats['model_swaps'] += 1
+            self._entries.clear()
+            self._version = version
+
+    def snapshot(self, container_ids):
+        """Hesaptan önce nesil sayaçları; put_many'ye geri verilir"""
+        with self._lock:
+            return {cid: self._generations.get(cid, 0) for cid in container_ids}
+
+    def get_many(self, container_ids, version):
+        """Önbellekteki tahminler ({id: değer}) ve eksik id listesi"""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            self._sync_version(version)
+            for cid in container_ids:
+                key = (cid, version)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found[cid] = entry[1]
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    missing.append(cid)
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(missing)
+        return found, missing
+
+    def put_many(self, values, version, generations):
+        """Hesaplanan tahminleri sakla; hesap sırasında geçersizleşen konteynerler atlanır"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if version != self._version:
+                return
+            for cid, value in values.items():
+                if self._generations.get(cid, 0) != generations.get(cid, 0):
+                    continue
+                self._entries[(cid, version)] = (expires_at, value)
+                self._entries.move_to_end((cid, version))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, container_id):
+        """Konteynere yazıldı: önbellekteki kaydını düşür, süren hesabın sonucunu reddet"""
+        with self._lock:
+            self._generations[container_id] = self._generations.get(container_id, 0) + 1
+            self._entries.pop((container_id, self._version), None)
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            for cid in {cid for cid, _ in self._entries}:
+                self._generations[cid] = self._generations.get(cid, 0) + 1
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        total = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'entries': len(self._entries),
+            'model_version': self._version,
+            'hit_rate': round(self._stats['hits'] / total, 4) if total else 0.0
+        }
+
+class PredictionWriter:
+    """Hesaplanan tahminleri predictions tablosuna arka planda toplu yazar
+
+    İstek yolu sadece kuyruğa ekler; tek yazıcı iş parçacığı WRITE_FLUSH_S
+    aralıklarla ya da WRITE_BATCH_ROWS dolunca tek işlemde executemany
+    yapar. Kuyruk doluysa satırlar düşürülür ve sayılır (istek beklemez).
+    Yazılan sürüm değişince (aktivasyon, geri alma, yeniden eğitim) ve
+    prune_interval_s aralıklarla eski satırları aynı iş parçacığında siler.
+    """
+
+    def __init__(self, connection_factory, batch_rows=WRITE_BATCH_ROWS, flush_s=WRITE_FLUSH_S,
+                 max_pending=WRITE_QUEUE_ROWS, retention_days=PREDICTION_RETENTION_DAYS,
+                 prune_interval_s=PRUNE_INTERVAL_S):
+        self.connection_factory = connection_factory   # db_pool.ConnectionPool.connection gibi bağlam yöneticisi
+        self.batch_rows = batch_rows
+        self.flush_s = flush_s
+        self.retention_days = retention_days
+        self.prune_interval_s = prune_interval_s
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._version = None
+        self._next_prune = 0.0
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'errors': 0, 'pruned': 0}
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, rows):
+        """rows: (container_id, model_version, fill_probability, confidence, is_full) demetleri"""
+        self._ensure_started()
+        predicted_at = datetime.now().isoformat()
+        for row in rows:
+            try:
+                self._queue.put_nowait((*row, predicted_at))
+                self.stats['queued'] += 1
+            except queue.Full:
+                self.stats['dropped'] += 1
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_s
+            while len(batch) < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        version = batch[-1][1]
+        prune = version != self._version or time.monotonic() >= self._next_prune
+        try:
+            with self.connection_factory() as conn:
+                conn.executemany(PREDICTION_INSERT, batch)
+                if prune:
+                    cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+                    self.stats['pruned'] += conn.execute(PREDICTION_PRUNE, (version, cutoff)).rowcount
+                conn.commit()
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            if prune:
+                self._version = version
+                self._next_prune = time.monotonic() + self.prune_interval_s
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Tahminler yazılamadı ({len(batch)} satır): {e}")
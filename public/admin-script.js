@@ -141,14 +141,10 @@ async function runSimulation() {
 async function calculateSimulation(fleetChanges, parameters) {
     // Gerçek veritabanı verilerini API'den çek
     try {
-        const statsResponse = await fetch('/api/dashboard/stats');
-        const stats = await statsResponse.json();
-        
-        const fleetResponse = await fetch('/api/fleet/summary');
-        const fleetData = await fleetResponse.json();
-        
-        const tonnageResponse = await fetch('/api/tonnage/monthly');
-        const tonnageData = await tonnageResponse.json();
+        // Sayaçlar canlı akıştan gelir; filo ve tonaj sadece yükleyici yazınca yeniden çekilir
+        const stats = await getLiveData('stats');
+        const fleetData = await getLiveData('fleet');
+        const tonnageData = await getLiveData('tonnage');
         
         // Gerçek filo bilgileri
         const currentFleet = {
@@ -759,6 +755,11 @@ let fleetMap = null;
 let routeData = null;
 let routeLayers = {};
 let selectedVehicleId = null;
+let containerLayer = null;
+let routeWatch = null;  // { plan, version, active, inflight, again }
+let containerMarkers = {};
+
+const ROUTE_COLORS = ['#E74C3C', '#3498DB', '#2ECC71', '#F39C12', '#9B59B6', '#1ABC9C', '#E67E22', '#34495E', '#E91E63', '#FF5722'];
 
 function optimizeRoutes() {
     const button = event.target;
@@ -773,6 +774,7 @@ function optimizeRoutes() {
                 displayRouteSummary(data.summary);
                 displayVehicleList(data.routes);
                 initializeMap();
+                watchRouteChanges(data.summary.plan);
             } else {
                 alert('Hata: ' + data.message);
             }
@@ -834,62 +836,13 @@ function initializeMap() {
         attribution: '© OpenStreetMap contributors'
     }).addTo(fleetMap);
     
+    // Rotaların altında tüm konteynerler (doluluk rengine göre)
+    loadContainerLayer();
+    
     // Tüm rotalar için layer grupları oluştur
-    const colors = ['#E74C3C', '#3498DB', '#2ECC71', '#F39C12', '#9B59B6', '#1ABC9C', '#E67E22', '#34495E', '#E91E63', '#FF5722'];
     routeLayers = {};
-    
     routeData.routes.forEach((route, index) => {
-        const color = colors[index % colors.length];
-        const layerGroup = L.layerGroup();
-        
-        if (route.route_points && route.route_points.length > 0) {
-            // Gerçek yol geometrisini kullan (OSRM'den gelen)
-            const routeLine = route.route_geometry && route.route_geometry.length > 0 
-                ? route.route_geometry 
-                : route.route_points;
-            
-            // Rota çizgisi (gerçek yollar)
-            const polyline = L.polyline(routeLine, {
-                color: color,
-                weight: 4,
-                opacity: 0.8
-            });
-            layerGroup.addLayer(polyline);
-            
-            // Konteyner marker'ları
-            route.route_points.forEach((point, idx) => {
-                const marker = L.circleMarker(point, {
-                    radius: 7,
-                    fillColor: color,
-                    color: '#fff',
-                    weight: 2,
-                    opacity: 1,
-                    fillOpacity: 0.9
-                });
-                
-                marker.bindPopup(`
-                    <strong>${route.plate_number}</strong><br>
-                    Konteyner #${idx + 1}<br>
-                    Tip: ${route.container_details[idx].container_type}
-                `);
-                
-                layerGroup.addLayer(marker);
-            });
-            
-            // Başlangıç marker'ı
-            const startMarker = L.marker(route.route_points[0], {
-                icon: L.divIcon({
-                    html: `<div style="background: ${color}; color: white; border-radius: 50%; width: 30px; height: 30px; display: flex; align-items: center; justify-content: center; font-weight: bold; border: 2px solid white;">${index + 1}</div>`,
-                    className: '',
-                    iconSize: [30, 30]
-                })
-            });
-            
-            startMarker.bindPopup(`<strong>Başlangıç</strong><br>${route.plate_number}`);
-            layerGroup.addLayer(startMarker);
-        }
-        
-        routeLayers[route.vehicle_id] = layerGroup;
+        routeLayers[route.vehicle_id] = buildRouteLayer(route, index);
     });
     
     // Tüm rotaları haritaya ekle (başlangıçta hepsi görünür)
@@ -902,6 +855,192 @@ function initializeMap() {
     }
 }
 
+function buildRouteLayer(route, index) {
+    const color = ROUTE_COLORS[index % ROUTE_COLORS.length];
+    const layerGroup = L.layerGroup();
+    
+    if (route.route_points && route.route_points.length > 0) {
+        // Gerçek yol geometrisini kullan (OSRM'den gelen)
+        const routeLine = route.route_geometry && route.route_geometry.length > 0 
+            ? route.route_geometry 
+            : route.route_points;
+        
+        // Rota çizgisi (gerçek yollar)
+        const polyline = L.polyline(routeLine, {
+            color: color,
+            weight: 4,
+            opacity: 0.8
+        });
+        layerGroup.addLayer(polyline);
+        
+        // Konteyner marker'ları
+        route.route_points.forEach((point, idx) => {
+            const marker = L.circleMarker(point, {
+                radius: 7,
+                fillColor: color,
+                color: '#fff',
+                weight: 2,
+                opacity: 1,
+                fillOpacity: 0.9
+            });
+            
+            marker.bindPopup(`
+                <strong>${route.plate_number}</strong><br>
+                Konteyner #${idx + 1}<br>
+                Tip: ${route.container_details[idx].container_type}
+            `);
+            
+            layerGroup.addLayer(marker);
+        });
+        
+        // Başlangıç marker'ı
+        const startMarker = L.marker(route.route_points[0], {
+            icon: L.divIcon({
+                html: `<div style="background: ${color}; color: white; border-radius: 50%; width: 30px; height: 30px; display: flex; align-items: center; justify-content: center; font-weight: bold; border: 2px solid white;">${index + 1}</div>`,
+                className: '',
+                iconSize: [30, 30]
+            })
+        });
+        
+        startMarker.bindPopup(`<strong>Başlangıç</strong><br>${route.plate_number}`);
+        layerGroup.addLayer(startMarker);
+    }
+    
+    return layerGroup;
+}
+
+// ============== ARTIMLI ROTA GÜNCELLEMELERİ ==============
+// Bildirimlerle değişen rotalar sunucuda artımlı onarılır; sadece değişen araçlar çekilir.
+// Canlı akış varsa 'routes' olayı tetikler, yoksa long polling ile beklenir.
+async function watchRouteChanges(plan) {
+    if (routeWatch) routeWatch.active = false;
+    if (!plan) return;
+    const watch = { plan: plan.id, version: plan.version, active: true, inflight: false, again: false };
+    routeWatch = watch;
+    if (window.EventSource) return;
+    
+    while (watch.active) {
+        if (!await fetchRouteChanges(watch, 25)) {
+            await new Promise(resolve => setTimeout(resolve, 5000));
+        }
+    }
+}
+
+async function fetchRouteChanges(watch, wait) {
+    try {
+        const res = await fetch(`/api/fleet/routes/changes?plan=${watch.plan}&since=${watch.version}&wait=${wait}`);
+        if (!watch.active || !res.ok) return false;
+        const data = await res.json();
+        watch.plan = data.plan;
+        watch.version = data.version;
+        if (data.reset || data.routes.length || data.emptied.length) {
+            applyRouteChanges(data);
+        }
+        return true;
+    } catch (e) {
+        console.error('Rota güncelleme hatası:', e);
+        return false;
+    }
+}
+
+async function refreshRoutes(event) {
+    const watch = routeWatch;
+    if (!watch || !watch.active) return;
+    if (event && event.plan === watch.plan && event.version <= watch.version) return;
+    if (watch.inflight) {
+        watch.again = true;
+        return;
+    }
+    watch.inflight = true;
+    do {
+        watch.again = false;
+        await fetchRouteChanges(watch, 0);
+    } while (watch.again && watch.active);
+    watch.inflight = false;
+}
+
+function applyRouteChanges(data) {
+    if (!routeData || !fleetMap) return;
+    
+    if (data.reset) {
+        Object.values(routeLayers).forEach(layer => fleetMap.removeLayer(layer));
+        routeLayers = {};
+        routeData.routes = [];
+    }
+    
+    const removed = new Set(data.emptied);
+    routeData.routes = routeData.routes.filter(r => !removed.has(r.vehicle_id));
+    removed.forEach(vehicleId => {
+        if (routeLayers[vehicleId]) {
+            fleetMap.removeLayer(routeLayers[vehicleId]);
+            delete routeLayers[vehicleId];
+        }
+    });
+    
+    data.routes.forEach(route => {
+        const index = routeData.routes.findIndex(r => r.vehicle_id === route.vehicle_id);
+        if (index >= 0) {
+            routeData.routes[index] = route;
+        } else {
+            routeData.routes.push(route);
+        }
+    });
+    
+    // Değişen araçların katmanlarını yeniden çiz (renk sırası listedeki konuma bağlı)
+    data.routes.forEach(route => {
+        const index = routeData.routes.findIndex(r => r.vehicle_id === route.vehicle_id);
+        if (routeLayers[route.vehicle_id]) {
+            fleetMap.removeLayer(routeLayers[route.vehicle_id]);
+        }
+        routeLayers[route.vehicle_id] = buildRouteLayer(route, index);
+        if (selectedVehicleId === null || selectedVehicleId === route.vehicle_id) {
+            routeLayers[route.vehicle_id].addTo(fleetMap);
+        }
+    });
+    
+    const summary = routeData.summary;
+    summary.assigned_containers = routeData.routes.reduce((sum, r) => sum + r.total_containers, 0);
+    summary.total_distance_km = Math.round(routeData.routes.reduce((sum, r) => sum + r.total_distance_km, 0) * 100) / 100;
+    summary.total_time_hours = Math.round(routeData.routes.reduce((sum, r) => sum + r.estimated_time_min, 0) / 60 * 100) / 100;
+    if (data.unassigned_containers) summary.unassigned_containers = data.unassigned_containers;
+    displayRouteSummary(summary);
+    displayVehicleList(routeData.routes);
+    if (selectedVehicleId !== null) {
+        displaySelectedVehicleDetails(selectedVehicleId);
+    }
+}
+
+async function loadContainerLayer() {
+    try {
+        // İkili harita verisi (script.js içindeki decodeContainerMapBinary ile çözülür)
+        const containers = await fetchContainerMap('binary');
+        const renderer = L.canvas({ padding: 0.5 });
+        
+        containerMarkers = {};
+        containerLayer = L.layerGroup(containers.map(c => {
+            const color = fillColor(c.fill_level);
+            return containerMarkers[c.id] = L.circleMarker([c.lat, c.lng], {
+                renderer: renderer,
+                radius: 3,
+                fillColor: color,
+                color: color,
+                weight: 0,
+                fillOpacity: 0.5
+            }).bindPopup(`
+                <strong>Konteyner #${c.id}</strong><br>
+                Doluluk: ${(c.fill_level * 100).toFixed(0)}%<br>
+                Mahalle: ${c.neighborhood}
+            `);
+        }));
+        
+        containerLayer.addTo(fleetMap);
+        containerLayer.eachLayer(layer => layer.bringToBack());
+        console.log(`✓ ${containers.length} konteyner haritaya eklendi`);
+    } catch (e) {
+        console.error('Konteyner katmanı yükleme hatası:', e);
+    }
+}
+
 function selectVehicle(vehicleId) {
     selectedVehicleId = vehicleId;
     
@@ -987,5 +1126,83 @@ function displayRouteDetails(routes) {
     // Bu fonksiyon artık kullanılmıyor - selectVehicle kullanılıyor
 }
 
+// ============== CANLI AKIŞ ==============
+// /api/stream (SSE) farkları yayınlar; sayaçlar, konteyner renkleri ve rotalar yerinde güncellenir
+const liveData = { stats: null, fleet: null, tonnage: null };
+const LIVE_ENDPOINTS = { stats: '/api/dashboard/stats', fleet: '/api/fleet/summary', tonnage: '/api/tonnage/monthly' };
+
+async function getLiveData(name) {
+    if (!liveData[name]) {
+        const response = await fetch(LIVE_ENDPOINTS[name]);
+        liveData[name] = await response.json();
+    }
+    return liveData[name];
+}
+
+function fillColor(fillLevel) {
+    return fillLevel >= 0.75 ? '#E74C3C' : fillLevel >= 0.50 ? '#F39C12' : '#2ECC71';
+}
+
+function displayLiveStats(stats) {
+    const element = document.getElementById('liveStats');
+    if (!element) return;
+    element.textContent = `Canlı: ${stats.full_containers} dolu konteyner (%${(stats.fill_rate * 100).toFixed(1)}) • ` +
+        `bugün ${stats.today_reports} bildirim • toplam ${stats.total_reports} bildirim, ` +
+        `%${(stats.verification_rate * 100).toFixed(1)} doğrulanmış`;
+}
+
+function updateContainerMarker(container) {
+    const marker = containerMarkers[container.id];
+    if (!marker) return;
+    const color = fillColor(container.fill_level);
+    marker.setStyle({ fillColor: color, color: color });
+    const popup = marker.getPopup();
+    if (popup) {
+        popup.setContent(popup.getContent().replace(/Doluluk: \d+%/, `Doluluk: ${(container.fill_level * 100).toFixed(0)}%`));
+    }
+}
+
+function connectLiveStream() {
+    if (!window.EventSource) return;
+    const stream = new EventSource('/api/stream');
+    const on = (type, handler) => stream.addEventListener(type, e => handler(JSON.parse(e.data)));
+    
+    on('counters', stats => {
+        liveData.stats = stats;
+        displayLiveStats(stats);
+    });
+    on('container', updateContainerMarker);
+    on('routes', refreshRoutes);
+    on('dataset', data => {
+        // Yükleyici yazdı: sadece değişen parçalar bir sonraki kullanımda yeniden çekilir
+        if (data.changed.includes('fleet')) liveData.fleet = null;
+        if (data.changed.includes('tonnage') || data.changed.includes('events')) liveData.tonnage = null;
+        if (data.changed.includes('containers') && fleetMap && containerLayer) {
+            fleetMap.removeLayer(containerLayer);
+            loadContainerLayer();
+        }
+    });
+    on('resync', () => {
+        // Kaçırılan olaylar var: anlık görüntüleri yeniden çek
+        liveData.fleet = null;
+        liveData.tonnage = null;
+        if (routeWatch) {
+            routeWatch.plan = 0;
+            refreshRoutes(null);
+        }
+        if (fleetMap && containerLayer) {
+            fleetMap.removeLayer(containerLayer);
+            loadContainerLayer();
+        }
+    });
+    stream.onerror = () => {
+        // EventSource kendisi yeniden bağlanır (Last-Event-ID ile)
+        const element = document.getElementById('liveStats');
+        if (element) element.textContent = 'Canlı veri bağlantısı yeniden kuruluyor...';
+    };
+}
+
+document.addEventListener('DOMContentLoaded', connectLiveStream);
+
 // ============== INITIALIZATION ==============
 console.log('Admin dashboard loaded successfully');
@@ -359,6 +359,60 @@ comparisonRows.forEach(row => {
     });
 });
 
+// ============== CONTAINER MAP DECODER ==============
+// /api/containers/map?format=columnar|binary yanıtlarını harita kayıtlarına çevirir:
+// {id, type, fill_level, lat, lng, capacity, neighborhood, last_collection}
+function decodeContainerMap(payload) {
+    const count = payload.count;
+    const [originLat, originLng] = payload.origin;
+    const containers = new Array(count);
+    
+    for (let i = 0; i < count; i++) {
+        containers[i] = {
+            id: payload.id[i],
+            type: payload.types[payload.type[i]],
+            fill_level: payload.fill_level[i] / payload.fill_scale,
+            lat: originLat + payload.lat[i] / payload.coord_scale,
+            lng: originLng + payload.lng[i] / payload.coord_scale,
+            capacity: payload.capacity[i],
+            neighborhood: payload.neighborhoods[payload.neighborhood[i]],
+            last_collection: payload.last_collections[payload.last_collection[i]]
+        };
+    }
+    return containers;
+}
+
+// İkili biçim: 'KMAP' | uint32 başlık uzunluğu | başlık JSON | 4 bayta hizalı sütunlar
+// Sütunlar kopyalanmadan TypedArray olarak okunur (little-endian, tüm yaygın tarayıcılar)
+function decodeContainerMapBinary(buffer) {
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'KMAP') {
+        throw new Error('Geçersiz harita verisi');
+    }
+    
+    const headerLength = new DataView(buffer).getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const bodyStart = 8 + headerLength;
+    const arrayTypes = { Uint32Array, Int32Array, Uint16Array };
+    
+    header.columns.forEach(([name, arrayType, offset]) => {
+        header[name] = new arrayTypes[arrayType](buffer, bodyStart + offset, header.count);
+    });
+    return decodeContainerMap(header);
+}
+
+async function fetchContainerMap(format = 'binary') {
+    const response = await fetch(`/api/containers/map?format=${format}`);
+    if (!response.ok) {
+        throw new Error(`Harita verisi alınamadı (HTTP ${response.status})`);
+    }
+    
+    if (format === 'binary') {
+        return decodeContainerMapBinary(await response.arrayBuffer());
+    }
+    return decodeContainerMap(await response.json());
+}
+
 // ============== RESPONSIVE MENU (for mobile - future enhancement) ==============
 console.log('Smart Waste Management System initialized');
 console.log('Frontend loaded successfully');
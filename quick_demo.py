@@ -6,6 +6,8 @@ import sqlite3
 import random
 from datetime import datetime, timedelta
 
+import container_stats
+
 DB_PATH = 'nilufer_waste.db'
 
 def quick_load():
@@ -100,6 +102,9 @@ def quick_load():
             
             event_count += 1
     
+    # Olaylar tek tek yazıldı; geçmiş istatistiklerini tek seferde yeniden hesapla
+    container_stats.ensure_stats_schema(conn)
+    container_stats.rebuild(conn)
     conn.commit()
     
     print(f"✓ {len(neighborhoods)} mahalle")
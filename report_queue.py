@@ -0,0 +1,200 @@
+"""
+Bildirim Kuyruğu
+Vatandaş bildirimlerini istek iş parçacığı dışında, toplu işlemlerle yazan tek yazıcı
+
+İstek yolu bildirimi doğrulayıp kuyruğa ekler ve bir bilet numarası
+döndürür. Tek yazıcı iş parçacığı kuyrukta biriken bildirimleri tek
+işlemde (group commit) uygular: SQLite yazma kilidi bildirim başına
+değil, grup başına bir kez alınır. Kuyruk FIFO ve yazıcı tek olduğundan
+aynı kullanıcının bildirimleri geliş sırasıyla uygulanır; güven puanı
+her bildirimde bir öncekinin sonucunu görür.
+
+Her bildirim kendi SAVEPOINT'i içinde uygulanır; hatalı bir bildirim
+grubun geri kalanını geri almaz.
+"""
+
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+GROUP_MAX_REPORTS = 200
+GROUP_LINGER_S = 0.005     # İlk bildirimden sonra grubun dolması için kısa bekleme
+MAX_PENDING = 10000
+RESULT_RETENTION = 50000   # Bilet sonuçları (en eski önce atılır)
+LATENCY_SAMPLES = 1000
+
+class QueueFull(Exception):
+    """Kuyruk dolu; istemci daha sonra yeniden denemeli"""
+
+class ReportQueue:
+    """Group commit yapan tek yazıcılı bildirim kuyruğu
+
+    apply(conn, report) bir bildirimi açık işlem içinde uygular ve sonucu
+    döndürür; on_committed(results) commit'ten sonra (önbellek
+    geçersizleştirme, yeniden eğitim tetikleme gibi) yan etkiler için
+    yazıcı iş parçacığında çağrılır.
+    """
+
+    def __init__(self, connection_factory, apply, on_committed=None, group_max=GROUP_MAX_REPORTS,
+                 linger_s=GROUP_LINGER_S, max_pending=MAX_PENDING, result_retention=RESULT_RETENTION):
+        self.connection_factory = connection_factory   # db_pool.ConnectionPool.connection gibi bağlam yöneticisi
+        self.apply = apply
+        self.on_committed = on_committed
+        self.group_max = group_max
+        self.linger_s = linger_s
+        self.result_retention = result_retention
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._results = OrderedDict()     # bilet -> sonuç
+        self._results_lock = threading.Lock()
+        self._tickets = 0
+        self._ticket_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._pending = set()             # kuyrukta ya da yazılmakta olan biletler
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._commit_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._wait_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'applied': 0,
+            'failed': 0,
+            'groups': 0,
+            'group_errors': 0,
+            'max_depth': 0,
+            'max_group_size': 0,
+            'last_commit_at': None
+        }
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='report-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, report):
+        """Bildirimi kuyruğa ekle, bilet numarasını döndür; kuyruk doluysa QueueFull"""
+        self._ensure_started()
+        with self._ticket_lock:
+            self._tickets += 1
+            ticket = self._tickets
+        with self._idle:
+            self._pending.add(ticket)
+        try:
+            self._queue.put_nowait((ticket, time.perf_counter(), report))
+        except queue.Full:
+            with self._idle:
+                self._pending.discard(ticket)
+            self._stats['rejected'] += 1
+            raise QueueFull(f"Bildirim kuyruğu dolu ({self._queue.maxsize})")
+        self._stats['submitted'] += 1
+        self._stats['max_depth'] = max(self._stats['max_depth'], self._queue.qsize())
+        return ticket
+
+    def status(self, ticket):
+        """('done', sonuç), ('queued', None) ya da bilinmeyen/süresi geçmiş bilet için ('unknown', None)"""
+        with self._results_lock:
+            result = self._results.get(ticket)
+        if result is not None:
+            return 'done', result
+        with self._idle:
+            if ticket in self._pending:
+                return 'queued', None
+        return 'unknown', None
+
+    def drain(self, timeout=None):
+        """Kuyruktaki tüm bildirimler uygulanana kadar bekle (kapanış ve betikler için)"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def _next_group(self):
+        group = [self._queue.get()]
+        deadline = time.perf_counter() + self.linger_s
+        while len(group) < self.group_max:
+            try:
+                group.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                group.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        while True:
+            group = self._next_group()
+            results = {}
+            try:
+                results = self._write_group(group)
+            except Exception as e:
+                self._stats['group_errors'] += 1
+                print(f"❌ Bildirim grubu yazılamadı ({len(group)} bildirim): {e}")
+                results = {ticket: {'error': f'Yazma hatası: {e}'} for ticket, _, _ in group}
+            finally:
+                self._store(results)
+                with self._idle:
+                    self._pending.difference_update(ticket for ticket, _, _ in group)
+                    self._idle.notify_all()
+
+    def _write_group(self, group):
+        results = {}
+        with self.connection_factory() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for ticket, _, report in group:
+                conn.execute("SAVEPOINT report")
+                try:
+                    results[ticket] = self.apply(conn, report)
+                    conn.execute("RELEASE SAVEPOINT report")
+                    self._stats['applied'] += 1
+                except Exception as e:
+                    conn.execute("ROLLBACK TO SAVEPOINT report")
+                    conn.execute("RELEASE SAVEPOINT report")
+                    results[ticket] = {'error': str(e)}
+                    self._stats['failed'] += 1
+            started = time.perf_counter()
+            conn.commit()
+            committed = time.perf_counter()
+
+        self._commit_ms.append((committed - started) * 1000)
+        self._wait_ms.extend((committed - enqueued) * 1000 for _, enqueued, _ in group)
+        self._stats['groups'] += 1
+        self._stats['max_group_size'] = max(self._stats['max_group_size'], len(group))
+        self._stats['last_commit_at'] = datetime.now().isoformat()
+
+        if self.on_committed:
+            try:
+                self.on_committed([result for result in results.values() if 'error' not in result])
+            except Exception as e:
+                print(f"⚠️ Bildirim sonrası işlemler başarısız: {e}")
+        return results
+
+    def _store(self, results):
+        with self._results_lock:
+            self._results.update(results)
+            while len(self._results) > self.result_retention:
+                self._results.popitem(last=False)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        """Kuyruk derinliği, grup boyutları ve commit / uçtan uca gecikme yüzdelikleri"""
+        stats = dict(self._stats)
+        stats['depth'] = self.depth()
+        written = stats['applied'] + stats['failed']
+        stats['avg_group_size'] = round(written / stats['groups'], 2) if stats['groups'] else 0.0
+        for name, samples in (('commit_ms', self._commit_ms), ('enqueue_to_commit_ms', self._wait_ms)):
+            ordered = sorted(samples)
+            stats[name] = {
+                'p50': round(ordered[len(ordered) // 2], 3) if ordered else None,
+                'p95': round(ordered[int(len(ordered) * 0.95)], 3) if ordered else None,
+                'max': round(ordered[-1], 3) if ordered else None
+            }
+        return stats
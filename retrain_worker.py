@@ -0,0 +1,98 @@
+"""
+Arka Plan Model Eğitimi
+Bildirim isteklerini bloklamadan modeli yeniden eğiten iş parçacığı
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import joblib
+
+def atomic_dump(obj, path):
+    """Geçici dosyaya yaz, sonra atomik rename ile yerine koy
+
+    Okuyucular ya eski ya yeni dosyayı görür, yarım yazılmış dosyayı asla.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class RetrainWorker:
+    """Tek iş parçacıklı, birleştirmeli (coalescing) yeniden eğitim kuyruğu
+
+    Kuyrukta en fazla bir bekleyen iş tutulur: eğitim sürerken gelen
+    istekler tek bir takip eğitiminde birleşir, patlama halinde gelen
+    bildirimler yalnızca bir fit tetikler.
+    """
+
+    def __init__(self, train_fn, on_success=None):
+        self.train_fn = train_fn
+        self.on_success = on_success
+        self._jobs = queue.Queue(maxsize=1)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            'requested': 0,
+            'coalesced': 0,
+            'completed': 0,
+            'failed': 0,
+            'running': False,
+            'last_duration_s': None,
+            'last_finished_at': None
+        }
+
+    def _ensure_started(self):
+        """İş parçacığını ilk istekte başlat (Flask reloader ile çift başlamasın)"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='retrain-worker', daemon=True)
+                self._thread.start()
+
+    def submit(self, reason=''):
+        """Eğitim iste; zaten bekleyen bir iş varsa onunla birleştirilir"""
+        self._ensure_started()
+        self.stats['requested'] += 1
+        try:
+            self._jobs.put_nowait(reason)
+            return True
+        except queue.Full:
+            self.stats['coalesced'] += 1
+            return False
+
+    def pending(self):
+        """Bekleyen iş var mı"""
+        return not self._jobs.empty()
+
+    def _run(self):
+        while True:
+            reason = self._jobs.get()
+            self.stats['running'] = True
+            started = time.perf_counter()
+            try:
+                print(f"🔄 Arka planda model yeniden eğitiliyor ({reason})...")
+                success = self.train_fn()
+            except Exception as e:
+                print(f"❌ Arka plan eğitim hatası: {e}")
+                success = False
+
+            self.stats['running'] = False
+            self.stats['last_duration_s'] = round(time.perf_counter() - started, 3)
+            self.stats['last_finished_at'] = datetime.now().isoformat()
+
+            if success:
+                self.stats['completed'] += 1
+                if self.on_success:
+                    self.on_success()
+            else:
+                self.stats['failed'] += 1
+
+            self._jobs.task_done()
@@ -0,0 +1,392 @@
+"""
+Rota Planı Deposu
+Son optimize edilmiş planı bellekte tutar, doluluk değişikliklerini artımlı uygular
+
+Tam çözüm (route_solver) sadece /api/fleet/optimize-routes ile yapılır. Sonra
+gelen her doluluk değişikliği plana tek konteyner olarak işlenir:
+
+- Eşiği geçen yeni konteyner, kapasite ve vardiya süresine uyan en ucuz
+  ekleme yerine (tüm turların tüm kenarları, vektörel) konur.
+- Plandaki konteynerin doluluğu artıp turu kapasiteyi aşarsa çıkarılıp
+  yeniden eklenir; eşiğin altına inen (boşaltılan) konteyner çıkarılır ve
+  boşalan yere atanamamış en dolu konteynerler denenir.
+- Yerel onarım (2-opt + or-opt) sadece değişen turlarda, kısa süre
+  sınırıyla çalışır.
+
+Her değişiklik sürüm sayacını artırır; değişen araçlar wait_for_changes ile
+bekleyen istemcilere (admin sayfası) bildirilir. Tam çözüm sürerken gelen
+değişiklikler günlüğe alınır ve yeni plan yüklenince üzerine yeniden uygulanır.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import route_solver
+
+FULL_THRESHOLD = 0.7            # optimize-routes sorgusuyla aynı eşik
+REPAIR_TIME_LIMIT_S = 0.02      # Değişen tur başına yerel onarım süresi
+UNASSIGNED_RETRY = 5            # Boşalan yere denenecek atanamamış konteyner sayısı
+APPLY_SAMPLES = 1000
+
+_EPS = 1e-9
+
+def _distances_km(lats, lngs, lat, lng):
+    """Noktalardan (lat, lng) noktasına yol mesafesi tahmini (km), vektörel"""
+    p1 = np.radians(lats)
+    p2 = math.radians(lat)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * math.cos(p2) * np.sin((math.radians(lng) - np.radians(lngs)) / 2) ** 2
+    return 2 * route_solver.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))) * route_solver.ROAD_FACTOR
+
+class _Trip:
+    """Depoda başlayıp biten tek boşaltma turu; koordinat ve kenar dizileri önbellekli"""
+
+    __slots__ = ('stops', 'load', 'lats', 'lngs', 'edges')
+
+    def __init__(self, stops, depot):
+        self.stops = list(stops)
+        self.refresh(depot)
+
+    def refresh(self, depot):
+        self.load = sum(route_solver.container_load_tons(c) for c in self.stops)
+        self.lats = np.array([depot[0]] + [c['latitude'] for c in self.stops] + [depot[0]], dtype=np.float64)
+        self.lngs = np.array([depot[1]] + [c['longitude'] for c in self.stops] + [depot[1]], dtype=np.float64)
+        p1, p2 = np.radians(self.lats[:-1]), np.radians(self.lats[1:])
+        dlng = np.radians(self.lngs[1:] - self.lngs[:-1])
+        a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlng / 2) ** 2
+        self.edges = 2 * route_solver.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))) * route_solver.ROAD_FACTOR
+
+    @property
+    def km(self):
+        return float(self.edges.sum()) if self.stops else 0.0
+
+class RoutePlanStore:
+    """Artımlı güncellenen, değişiklikleri bekleyenlere bildiren rota planı"""
+
+    def __init__(self, full_threshold=FULL_THRESHOLD, repair_time_s=REPAIR_TIME_LIMIT_S):
+        self.full_threshold = full_threshold
+        self.repair_time_s = repair_time_s
+        self._vehicles = []          # araç sözlükleri (plan sırası)
+        self._trips = {}             # vehicle_id -> [_Trip] (max_trips adet)
+        self._where = {}             # container_id -> (vehicle_id, tur sırası)
+        self._unassigned = {}        # container_id -> konteyner
+        self._depot = None
+        self._options = {}
+        self._plan_id = 0
+        self._version = 0
+        self._route_versions = {}    # vehicle_id -> son değiştiği sürüm
+        self._rebuilds = 0           # süren tam çözüm sayısı
+        self._journal = []           # tam çözüm sürerken gelen konteynerler
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._apply_ms = deque(maxlen=APPLY_SAMPLES)
+        self._stats = {'updates': 0, 'inserted': 0, 'removed': 0, 'reinserted': 0,
+                       'unassigned_added': 0, 'ignored': 0, 'plans_loaded': 0}
+
+    # ---------- tam çözüm ----------
+    def begin_rebuild(self):
+        """Tam çözümden önce (veritabanı okunmadan) çağrılır; load'a verilecek jeton"""
+        with self._lock:
+            self._rebuilds += 1
+            return len(self._journal)
+
+    def abort_rebuild(self):
+        with self._lock:
+            self._end_rebuild()
+
+    def _end_rebuild(self):
+        self._rebuilds = max(0, self._rebuilds - 1)
+        if not self._rebuilds:
+            self._journal.clear()
+
+    def load(self, plan, vehicles, token=None, max_trips=route_solver.DEFAULT_MAX_TRIPS,
+             shift_minutes=route_solver.DEFAULT_SHIFT_MIN, speed_kmh=route_solver.AVG_SPEED_KMH,
+             service_min=route_solver.SERVICE_MIN_PER_CONTAINER):
+        """route_solver planını aktif plan yap; çözüm sırasında gelen değişiklikleri yeniden uygula"""
+        depot = (plan['depot']['latitude'], plan['depot']['longitude'])
+        by_vehicle = {route['vehicle']['vehicle_id']: route for route in plan['routes']}
+        with self._lock:
+            self._vehicles = [dict(v) for v in vehicles]
+            self._depot = depot
+            self._options = {
+                'max_trips': max(1, int(max_trips)),
+                'shift_minutes': shift_minutes,
+                'km_to_min': 60.0 / speed_kmh,
+                'service_min': service_min
+            }
+            self._trips, self._where = {}, {}
+            for vehicle in self._vehicles:
+                planned = by_vehicle.get(vehicle['vehicle_id'])
+                stops = [trip['stops'] for trip in planned['trips']] if planned else []
+                stops += [[]] * (self._options['max_trips'] - len(stops))
+                self._trips[vehicle['vehicle_id']] = [_Trip(s, depot) for s in stops]
+                for t, trip_stops in enumerate(stops):
+                    for c in trip_stops:
+                        self._where[c['container_id']] = (vehicle['vehicle_id'], t)
+            self._unassigned = {c['container_id']: c for c in plan['unassigned']}
+            self._plan_id += 1
+            self._version += 1
+            self._route_versions = {v['vehicle_id']: self._version for v in self._vehicles}
+            self._stats['plans_loaded'] += 1
+
+            replay = self._journal[token:] if token is not None else []
+            if token is not None:
+                self._end_rebuild()
+            for container in replay:
+                self._apply_one(container)
+            self._changed.notify_all()
+            return self._plan_id, self._version
+
+    # ---------- artımlı güncelleme ----------
+    def apply(self, containers):
+        """Konteynerlerin güncel durumunu (optimize sorgusuyla aynı alanlar) plana işle
+
+        Değişen araç id'lerini döndürür; plan yoksa ya da değişiklik yoksa boş küme.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            if self._rebuilds:
+                self._journal.extend(dict(c) for c in containers)
+            if self._depot is None:
+                return set()
+            changed = set()
+            for container in containers:
+                changed |= self._apply_one(dict(container))
+            if changed:
+                self._version += 1
+                for vehicle_id in changed:
+                    self._route_versions[vehicle_id] = self._version
+                self._changed.notify_all()
+            self._apply_ms.append((time.perf_counter() - started) * 1000)
+            return changed
+
+    def _apply_one(self, container):
+        self._stats['updates'] += 1
+        container_id = container['container_id']
+        eligible = (container.get('status', 'active') == 'active'
+                    and container.get('latitude') is not None and container.get('longitude') is not None
+                    and (container.get('current_fill_level') or 0) >= self.full_threshold)
+
+        changed = set()
+        where = self._where.get(container_id)
+        if where is not None:
+            vehicle_id, t = where
+            trip = self._trips[vehicle_id][t]
+            i = next(k for k, c in enumerate(trip.stops) if c['container_id'] == container_id)
+            if not eligible:
+                self._remove(vehicle_id, t, i)
+                changed.add(vehicle_id)
+                self._stats['removed'] += 1
+                changed |= self._retry_unassigned()
+                return changed
+            trip.stops[i] = container
+            trip.refresh(self._depot)
+            changed.add(vehicle_id)
+            if trip.load <= self._capacity(vehicle_id) + _EPS and self._within_shift(vehicle_id):
+                return changed
+            # Tur kapasiteyi ya da araç vardiya süresini aştı: konteyneri çıkarıp en ucuz uygun yere yeniden ekle
+            self._remove(vehicle_id, t, i)
+            self._stats['reinserted'] += 1
+            return changed | self._place(container)
+
+        if not eligible:
+            if self._unassigned.pop(container_id, None) is None:
+                self._stats['ignored'] += 1
+            return changed
+        self._unassigned.pop(container_id, None)
+        return self._place(container)
+
+    def _place(self, container):
+        inserted = self._insert(container)
+        if inserted is None:
+            self._unassigned[container['container_id']] = container
+            self._stats['unassigned_added'] += 1
+            return set()
+        return inserted
+
+    def _capacity(self, vehicle_id):
+        return float(self._vehicle(vehicle_id).get('capacity_tons') or 0)
+
+    def _vehicle(self, vehicle_id):
+        return next(v for v in self._vehicles if v['vehicle_id'] == vehicle_id)
+
+    def _trip_minutes(self, trip):
+        if not trip.stops:
+            return 0.0
+        return trip.km * self._options['km_to_min'] + len(trip.stops) * self._options['service_min']
+
+    def _within_shift(self, vehicle_id):
+        shift_minutes = self._options['shift_minutes']
+        if not shift_minutes:
+            return True
+        return sum(self._trip_minutes(trip) for trip in self._trips[vehicle_id]) <= shift_minutes + _EPS
+
+    def _remove(self, vehicle_id, t, i):
+        trip = self._trips[vehicle_id][t]
+        container = trip.stops.pop(i)
+        del self._where[container['container_id']]
+        trip.refresh(self._depot)
+        return container
+
+    def _insert(self, container):
+        """Kapasite ve vardiya süresine uyan en ucuz ekleme; uygun yer yoksa None"""
+        demand = route_solver.container_load_tons(container)
+        lat, lng = container['latitude'], container['longitude']
+        km_to_min = self._options['km_to_min']
+        service_min = self._options['service_min']
+        shift_minutes = self._options['shift_minutes']
+
+        best = None
+        for vehicle in self._vehicles:
+            vehicle_id = vehicle['vehicle_id']
+            capacity = float(vehicle.get('capacity_tons') or 0)
+            trips = self._trips[vehicle_id]
+            vehicle_minutes = sum(self._trip_minutes(trip) for trip in trips)
+            for t, trip in enumerate(trips):
+                if trip.load + demand > capacity + _EPS:
+                    continue
+                d = _distances_km(trip.lats, trip.lngs, lat, lng)
+                cost = d[:-1] + d[1:] - (trip.edges if trip.stops else 0.0)
+                p = int(np.argmin(cost))
+                added = float(cost[p])
+                if shift_minutes and vehicle_minutes + added * km_to_min + service_min > shift_minutes + _EPS:
+                    continue
+                if best is None or added < best[0]:
+                    best = (added, vehicle_id, t, p)
+
+        if best is None:
+            return None
+
+        _, vehicle_id, t, p = best
+        trip = self._trips[vehicle_id][t]
+        previous = list(trip.stops)
+        trip.stops.insert(p, container)
+        self._repair(trip)
+        if not self._within_shift(vehicle_id):
+            # Ekleme sonrası tur süresi yine de vardiyayı aşıyor: geri al
+            trip.stops = previous
+            trip.refresh(self._depot)
+            return None
+        for t_index, planned in enumerate(self._trips[vehicle_id]):
+            for c in planned.stops:
+                self._where[c['container_id']] = (vehicle_id, t_index)
+        self._stats['inserted'] += 1
+        return {vehicle_id}
+
+    def _repair(self, trip):
+        """Değişen turda kısa süreli 2-opt + or-opt"""
+        if len(trip.stops) >= 3:
+            lats = [self._depot[0]] + [c['latitude'] for c in trip.stops]
+            lngs = [self._depot[1]] + [c['longitude'] for c in trip.stops]
+            M = route_solver.haversine_matrix(lats, lngs).tolist()
+            order = route_solver.improve_tour(M, time.perf_counter() + self.repair_time_s)
+            trip.stops = [trip.stops[k - 1] for k in order]
+        trip.refresh(self._depot)
+
+    def _retry_unassigned(self):
+        """Boşalan kapasiteye atanamamış en dolu konteynerleri yerleştirmeyi dene"""
+        changed = set()
+        waiting = sorted(self._unassigned.values(), key=lambda c: -(c.get('current_fill_level') or 0))
+        for container in waiting[:UNASSIGNED_RETRY]:
+            inserted = self._insert(container)
+            if inserted is not None:
+                del self._unassigned[container['container_id']]
+                changed |= inserted
+        return changed
+
+    # ---------- okuma / bildirim ----------
+    def _planned_route(self, vehicle):
+        trips = []
+        for trip in self._trips[vehicle['vehicle_id']]:
+            if not trip.stops:
+                continue
+            trips.append({
+                'stops': [dict(c) for c in trip.stops],
+                'load_tons': trip.load,
+                'distance_km': trip.km,
+                'time_min': self._trip_minutes(trip)
+            })
+        if not trips:
+            return None
+        capacity = float(vehicle.get('capacity_tons') or 0)
+        return {
+            'vehicle': dict(vehicle),
+            'trips': trips,
+            'total_containers': sum(len(t['stops']) for t in trips),
+            'total_distance_km': sum(t['distance_km'] for t in trips),
+            'total_time_min': sum(t['time_min'] for t in trips),
+            'total_load_tons': sum(t['load_tons'] for t in trips),
+            'max_trip_load_pct': max(t['load_tons'] for t in trips) / capacity * 100 if capacity > 0 else 0
+        }
+
+    def snapshot(self, vehicle_ids=None):
+        """route_solver plan biçiminde (kopya) plan; vehicle_ids verilirse sadece o araçlar
+
+        'emptied' rotası boşalan (haritadan kaldırılacak) araç id'leridir.
+        """
+        with self._lock:
+            if self._depot is None:
+                return None
+            routes, emptied = [], []
+            for vehicle in self._vehicles:
+                if vehicle_ids is not None and vehicle['vehicle_id'] not in vehicle_ids:
+                    continue
+                planned = self._planned_route(vehicle)
+                if planned is None:
+                    emptied.append(vehicle['vehicle_id'])
+                else:
+                    routes.append(planned)
+            return {
+                'plan_id': self._plan_id,
+                'version': self._version,
+                'routes': routes,
+                'emptied': emptied,
+                'unassigned': [dict(c) for c in self._unassigned.values()],
+                'depot': {'latitude': self._depot[0], 'longitude': self._depot[1]}
+            }
+
+    def plan_version(self):
+        """(plan id, sürüm)"""
+        with self._lock:
+            return self._plan_id, self._version
+
+    def wait_for_changes(self, plan_id, since, timeout):
+        """since sürümünden sonra değişen araç id'lerini bekle
+
+        Döndürür: (plan_id, sürüm, değişen araç id'leri ya da plan değiştiyse None).
+        Zaman aşımında değişen küme boş olur; plan hiç yoksa (None, 0, None).
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                if self._depot is None:
+                    return None, 0, None
+                if plan_id != self._plan_id:
+                    return self._plan_id, self._version, None
+                if self._version > since:
+                    changed = {vid for vid, version in self._route_versions.items() if version > since}
+                    return self._plan_id, self._version, changed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._plan_id, self._version, set()
+                self._changed.wait(remaining)
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._apply_ms)
+            return {
+                **self._stats,
+                'plan_id': self._plan_id,
+                'version': self._version,
+                'planned_containers': len(self._where),
+                'unassigned': len(self._unassigned),
+                'rebuilding': self._rebuilds > 0,
+                'apply_ms': {
+                    'p50': round(ordered[len(ordered) // 2], 3) if ordered else None,
+                    'p95': round(ordered[int(len(ordered) * 0.95)], 3) if ordered else None,
+                    'max': round(ordered[-1], 3) if ordered else None
+                }
+            }
@@ -0,0 +1,549 @@
+"""
+Rota Optimizasyonu - Kapasiteli Araç Rotalama (CVRP)
+Ağ çağrısı yapmadan: haversine mesafe matrisi, sweep kurulum, 2-opt / or-opt iyileştirme
+
+Büyük problemlerde (DENSE_MATRIX_MAX_NODES üstü) n x n matris kurulmaz:
+mesafeler koordinatlardan istendikçe hesaplanır ve turlar arası ekleme/taşıma
+sadece düğümün en yakın NEIGHBOR_COUNT komşusuna bitişik kenarlarda aranır.
+"""
+
+import math
+import time
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+ROAD_FACTOR = 1.3                 # Kuş uçuşu mesafeden yol mesafesine yaklaşık çarpan
+AVG_SPEED_KMH = 35
+SERVICE_MIN_PER_CONTAINER = 5
+TONS_PER_LITER = 0.0002           # Dolu 1 litre ~ 0.2 kg
+DEFAULT_SHIFT_MIN = 8 * 60
+DEFAULT_MAX_TRIPS = 3             # Araç başına vardiyada en fazla boşaltma turu
+DEFAULT_TIME_LIMIT_S = 2.0
+DENSE_MATRIX_MAX_NODES = 2000     # float32 matris ~16 MB; üstünde komşu listeleri kullanılır
+NEIGHBOR_COUNT = 24
+CONSTRUCT_TIME_SHARE = 0.4        # Kurulum turlarının iyileştirmesine ayrılan süre payı
+
+_EPS = 1e-9
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """İki nokta arası kuş uçuşu mesafe (km)"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat = p2 - p1
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+def haversine_matrix(lats, lngs, road_factor=ROAD_FACTOR, chunk=512):
+    """Tüm noktalar arası yol mesafesi tahmini (km), float32 matris
+
+    Bellek tepe değerini sınırlamak için satır blokları halinde hesaplanır.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    n = len(lat)
+    out = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, chunk):
+        end = min(n, start + chunk)
+        dlat = lat[start:end, None] - lat[None, :]
+        dlng = lng[start:end, None] - lng[None, :]
+        a = np.sin(dlat / 2) ** 2 + cos_lat[start:end, None] * cos_lat[None, :] * np.sin(dlng / 2) ** 2
+        out[start:end] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))) * road_factor
+    return out
+
+class PointDistances:
+    """Yoğun matris yerine koordinatlardan istendikçe hesaplanan yol mesafesi (km)
+
+    D[i, j] indekslemesi matrisle aynıdır: tekil indeks, dizi ve np.ix_ ile
+    alt matris desteklenir (numpy yayınlaması).
+    """
+
+    def __init__(self, lats, lngs, road_factor=ROAD_FACTOR):
+        self.lat = np.radians(np.asarray(lats, dtype=np.float64))
+        self.lng = np.radians(np.asarray(lngs, dtype=np.float64))
+        self.cos_lat = np.cos(self.lat)
+        self.road_factor = road_factor
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, key):
+        i, j = key
+        a = (np.sin((self.lat[j] - self.lat[i]) / 2) ** 2
+             + self.cos_lat[i] * self.cos_lat[j] * np.sin((self.lng[j] - self.lng[i]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0))) * self.road_factor
+
+def container_load_tons(container):
+    """Konteynerdeki tahmini atık ağırlığı (ton)"""
+    return (container.get('capacity_liters') or 0) * (container.get('current_fill_level') or 0) * TONS_PER_LITER
+
+# ============== TUR İÇİ İYİLEŞTİRME ==============
+def _route_length(route, M):
+    return sum(M[route[i]][route[i + 1]] for i in range(len(route) - 1))
+
+def _two_opt(route, M, deadline):
+    """Kesişen kenarları ters çevirerek kaldır (ilk iyileştirme)"""
+    n = len(route)
+    improved_any = False
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, n - 2):
+            a, b = route[i - 1], route[i]
+            Ma, Mb = M[a], M[b]
+            dab = Ma[b]
+            for j in range(i + 1, n - 1):
+                c, d = route[j], route[j + 1]
+                if Ma[c] + Mb[d] - dab - M[c][d] < -_EPS:
+                    route[i:j + 1] = route[i:j + 1][::-1]
+                    b = route[i]
+                    Mb = M[b]
+                    dab = Ma[b]
+                    improved = improved_any = True
+    return improved_any
+
+def _or_opt(route, M, deadline):
+    """1-3 uzunluğundaki segmentleri (gerekirse ters) daha iyi konuma taşı"""
+    n = len(route)
+    improved_any = False
+    for seg_len in (1, 2, 3):
+        i = 1
+        while i + seg_len <= n - 1:
+            if time.perf_counter() >= deadline:
+                return improved_any
+            j = i + seg_len
+            prev, nxt = route[i - 1], route[j]
+            first, last = route[i], route[j - 1]
+            gain = M[prev][first] + M[last][nxt] - M[prev][nxt]
+
+            best_delta, best_pos, best_rev = -_EPS, None, False
+            for p in range(n - 1):
+                if i - 1 <= p <= j - 1:
+                    continue
+                u, v = route[p], route[p + 1]
+                Muv = M[u][v]
+                delta = M[u][first] + M[last][v] - Muv - gain
+                if delta < best_delta:
+                    best_delta, best_pos, best_rev = delta, p, False
+                delta = M[u][last] + M[first][v] - Muv - gain
+                if delta < best_delta:
+                    best_delta, best_pos, best_rev = delta, p, True
+
+            if best_pos is None:
+                i += 1
+                continue
+
+            segment = route[i:j]
+            if best_rev:
+                segment.reverse()
+            del route[i:j]
+            insert_at = best_pos + 1 if best_pos < i else best_pos + 1 - seg_len
+            route[insert_at:insert_at] = segment
+            improved_any = True
+    return improved_any
+
+def improve_tour(M, deadline):
+    """Depoda (0) başlayıp biten tur için 2-opt + or-opt; duraklar 1..n-1
+
+    M yerel mesafe matrisi (liste listesi, saf Python döngüleri hızlı kalır).
+    İyileştirilmiş durak sırasını (depo hariç, M indeksleriyle) döndürür.
+    """
+    route = list(range(len(M))) + [0]
+    while time.perf_counter() < deadline:
+        changed = _two_opt(route, M, deadline)
+        changed = _or_opt(route, M, deadline) or changed
+        if not changed:
+            break
+    return route[1:-1]
+
+# ============== TUR KENARLARI ==============
+class _TripEdges:
+    """Turların ekleme adayı kenarları; değişen tur update(t) ile tek başına yenilenir
+
+    Komşu listesi yoksa tüm kenarlar aday olur (birleşik diziler tembel
+    kurulur). Komşu listesi varsa düğümün komşularına bitişik kenarlar ile
+    her turun depo kenarları aday olur.
+    """
+
+    def __init__(self, trips, n_nodes, neighbors=None):
+        self.trips = trips
+        self.neighbors = neighbors
+        self.node_trip = np.full(n_nodes, -1, dtype=np.int64)
+        self.node_pos = np.zeros(n_nodes, dtype=np.int64)
+        self.node_prev = np.zeros(n_nodes, dtype=np.int64)
+        self.node_next = np.zeros(n_nodes, dtype=np.int64)
+        self.first = np.zeros(len(trips), dtype=np.int64)
+        self.last = np.zeros(len(trips), dtype=np.int64)
+        self.length = np.zeros(len(trips), dtype=np.int64)
+        self._members = [np.empty(0, dtype=np.int64)] * len(trips)
+        self._parts = [None] * len(trips)
+        self._merged = None
+        for t in range(len(trips)):
+            self.update(t)
+
+    def update(self, t):
+        old = self._members[t]
+        self.node_trip[old[self.node_trip[old] == t]] = -1
+        nodes = np.array(self.trips[t], dtype=np.int64)
+        route = np.concatenate([[0], nodes, [0]]).astype(np.int64)
+        if len(nodes):
+            self.node_trip[nodes] = t
+            self.node_pos[nodes] = np.arange(len(nodes))
+            self.node_prev[nodes] = route[:-2]
+            self.node_next[nodes] = route[2:]
+        self._members[t] = nodes
+        self.first[t] = route[1]
+        self.last[t] = route[-2]
+        self.length[t] = len(nodes)
+        if self.neighbors is None:
+            k = len(route) - 1
+            self._parts[t] = (route[:-1], route[1:], np.full(k, t), np.arange(k))
+            self._merged = None
+
+    def candidates(self, node):
+        """(önceki, sonraki, tur, ekleme sırası) dizileri"""
+        if self.neighbors is None:
+            if self._merged is None:
+                self._merged = tuple(np.concatenate(arrays) for arrays in zip(*self._parts))
+            return self._merged
+        near = self.neighbors[node]
+        near = near[self.node_trip[near] >= 0]
+        trip_of = self.node_trip[near]
+        pos = self.node_pos[near]
+        all_trips = np.arange(len(self.trips))
+        return (
+            np.concatenate([np.zeros(len(all_trips), dtype=np.int64), self.last, self.node_prev[near], near]),
+            np.concatenate([self.first, np.zeros(len(all_trips), dtype=np.int64), near, self.node_next[near]]),
+            np.concatenate([all_trips, all_trips, trip_of, trip_of]),
+            np.concatenate([np.zeros(len(all_trips), dtype=np.int64), self.length, pos, pos + 1])
+        )
+
+# ============== ÇÖZÜCÜ ==============
+class RouteSolver:
+    """Heterojen filo, çoklu tur ve vardiya süresi kısıtlı CVRP çözücü
+
+    - Düğüm 0 depo, 1..n konteynerlerdir.
+    - Her araç en fazla `max_trips` tur yapar; her tur depoda başlar ve biter,
+      tur yükü aracın kapasitesini aşamaz.
+    - Aracın toplam süresi (yol + konteyner başına servis) `shift_minutes` ile sınırlıdır.
+    """
+
+    def __init__(self, vehicles, containers, depot=None, max_trips=DEFAULT_MAX_TRIPS,
+                 shift_minutes=DEFAULT_SHIFT_MIN, speed_kmh=AVG_SPEED_KMH,
+                 service_min=SERVICE_MIN_PER_CONTAINER, seed=42,
+                 time_limit=DEFAULT_TIME_LIMIT_S, max_restarts=20, distance_matrix=None):
+        self.vehicles = list(vehicles)
+        self.containers = list(containers)
+        self.max_trips = max(1, int(max_trips))
+        self.shift_minutes = shift_minutes
+        self.speed_kmh = speed_kmh
+        self.service_min = service_min
+        self.seed = seed
+        self.time_limit = time_limit
+        self.max_restarts = max(1, int(max_restarts))
+
+        lats = np.array([c['latitude'] for c in self.containers], dtype=np.float64)
+        lngs = np.array([c['longitude'] for c in self.containers], dtype=np.float64)
+        if depot is None:
+            depot = (float(lats.mean()), float(lngs.mean())) if len(lats) else (0.0, 0.0)
+        self.depot = (float(depot[0]), float(depot[1]))
+
+        node_lats = np.concatenate([[self.depot[0]], lats])
+        node_lngs = np.concatenate([[self.depot[1]], lngs])
+        large = len(self.containers) + 1 > DENSE_MATRIX_MAX_NODES
+        if distance_matrix is not None:
+            self.D = distance_matrix
+        elif large:
+            self.D = PointDistances(node_lats, node_lngs)
+        else:
+            self.D = haversine_matrix(node_lats, node_lngs)
+        # Büyük problemde turlar arası aday kenarlar en yakın komşularla sınırlı
+        self.neighbors = None
+        if large:
+            import spatial_index
+            near = spatial_index.nearest_neighbors(lats, lngs, NEIGHBOR_COUNT) + 1
+            self.neighbors = np.vstack([np.zeros((1, near.shape[1]), dtype=np.int64), near])
+        self.demand = np.concatenate([[0.0], [container_load_tons(c) for c in self.containers]])
+        self.angles = np.arctan2(lats - self.depot[0], lngs - self.depot[1])
+        self.capacity = np.array([float(v.get('capacity_tons') or 0) for v in self.vehicles])
+        self.km_to_min = 60.0 / speed_kmh
+
+    # ---------- yardımcılar ----------
+    def _trip_km(self, nodes):
+        if not nodes:
+            return 0.0
+        route = np.array([0] + nodes + [0], dtype=np.int64)
+        return float(self.D[route[:-1], route[1:]].sum(dtype=np.float64))
+
+    def _trip_minutes(self, nodes):
+        return self._trip_km(nodes) * self.km_to_min + len(nodes) * self.service_min if nodes else 0.0
+
+    def _optimize_trip(self, nodes, deadline):
+        """Tur içi 2-opt + or-opt; yerel matris ile saf Python döngüleri hızlı kalır"""
+        if len(nodes) < 3 or time.perf_counter() >= deadline:
+            return nodes
+        idx = [0] + nodes
+        order = improve_tour(self.D[np.ix_(idx, idx)].tolist(), deadline)
+        return [idx[k] for k in order]
+
+    # ---------- kurulum ----------
+    def _construct(self, start_angle):
+        """Sweep: açıya göre sıralanan konteynerleri sırayla tur kapasitesine doldur"""
+        n_vehicles = len(self.vehicles)
+        trips = [[] for _ in range(n_vehicles * self.max_trips)]
+        loads = np.zeros(len(trips))
+        pending = []
+
+        # Önce tüm araçların ilk turu (büyük kapasite önce), sonra ikinci turlar...
+        by_capacity = sorted(range(n_vehicles), key=lambda v: -self.capacity[v])
+        slots = [t * n_vehicles + v for t in range(self.max_trips) for v in by_capacity]
+
+        order = np.argsort((self.angles - start_angle) % (2 * np.pi)) + 1
+        slot_pos = 0
+        for node in order.tolist():
+            dem = self.demand[node]
+            while slot_pos < len(slots):
+                slot = slots[slot_pos]
+                cap = self.capacity[slot % n_vehicles]
+                if loads[slot] + dem <= cap + _EPS:
+                    trips[slot].append(node)
+                    loads[slot] += dem
+                    break
+                if not trips[slot] and dem > cap:
+                    # Bu araca hiç sığmıyor; sonra uygun bir tura eklenecek
+                    pending.append(node)
+                    break
+                slot_pos += 1
+            else:
+                pending.append(node)
+        return trips, loads, pending
+
+    # ---------- turlar arası taşıma / ekleme ----------
+    def _trip_edges(self, trips):
+        return _TripEdges(trips, len(self.containers) + 1, self.neighbors)
+
+    def _vehicle_minutes(self, trips):
+        n_vehicles = len(self.vehicles)
+        minutes = np.zeros(n_vehicles)
+        for t, nodes in enumerate(trips):
+            if nodes:
+                minutes[t % n_vehicles] += self._trip_minutes(nodes)
+        return minutes
+
+    def _best_insertion(self, node, trips, loads, vmin, edges, exclude_trip=None, gain=0.0):
+        """Kapasite ve vardiya süresine uyan en ucuz ekleme yeri (vektörel)"""
+        prev, nxt, trip_of, pos = edges.candidates(node)
+        n_vehicles = len(self.vehicles)
+        D = self.D
+        ins = D[prev, node].astype(np.float64) + D[node, nxt] - D[prev, nxt]
+
+        trip_cap = self.capacity[trip_of % n_vehicles]
+        feasible = loads[trip_of] + self.demand[node] <= trip_cap + _EPS
+        if exclude_trip is not None:
+            feasible &= trip_of != exclude_trip
+        if self.shift_minutes:
+            veh = trip_of % n_vehicles
+            added = ins * self.km_to_min + self.service_min
+            if exclude_trip is not None:
+                same_vehicle = veh == exclude_trip % n_vehicles
+                added = np.where(same_vehicle, (ins - gain) * self.km_to_min, added)
+            feasible &= vmin[veh] + added <= self.shift_minutes + _EPS
+
+        if not feasible.any():
+            return None
+        ins = np.where(feasible, ins, np.inf)
+        k = int(np.argmin(ins))
+        return float(ins[k]), int(trip_of[k]), int(pos[k])
+
+    def _relocate_pass(self, trips, loads, vmin, rng, deadline):
+        """Her konteyneri başka bir tura taşımayı dene; toplam km azalıyorsa uygula"""
+        n_vehicles = len(self.vehicles)
+        node_trip = {}
+        for t, nodes in enumerate(trips):
+            for node in nodes:
+                node_trip[node] = t
+
+        edges = self._trip_edges(trips)
+        touched = set()
+        moved = 0
+        nodes_order = list(node_trip)
+        rng.shuffle(nodes_order)
+        for node in nodes_order:
+            if time.perf_counter() >= deadline:
+                break
+            t_from = node_trip[node]
+            route = trips[t_from]
+            i = route.index(node)
+            prev = route[i - 1] if i > 0 else 0
+            nxt = route[i + 1] if i + 1 < len(route) else 0
+            gain = float(self.D[prev, node]) + float(self.D[node, nxt]) - float(self.D[prev, nxt])
+
+            best = self._best_insertion(node, trips, loads, vmin, edges, exclude_trip=t_from, gain=gain)
+            if best is None or best[0] - gain >= -1e-6:
+                continue
+
+            _, t_to, p = best
+            route.pop(i)
+            trips[t_to].insert(p, node)
+            loads[t_from] -= self.demand[node]
+            loads[t_to] += self.demand[node]
+            vmin[t_from % n_vehicles] -= gain * self.km_to_min + self.service_min
+            vmin[t_to % n_vehicles] += best[0] * self.km_to_min + self.service_min
+            node_trip[node] = t_to
+            touched.update((t_from, t_to))
+            moved += 1
+            edges.update(t_from)
+            edges.update(t_to)
+        return moved, touched
+
+    def _insert_pending(self, pending, trips, loads, vmin, deadline):
+        """Atanamamış konteynerleri en ucuz uygun konuma ekle (dolu olanlar önce)
+
+        Süre dolarsa kalanlar atanmamış döner.
+        """
+        n_vehicles = len(self.vehicles)
+        unassigned = []
+        pending = sorted(pending, key=lambda node: -self.containers[node - 1].get('current_fill_level', 0))
+        edges = self._trip_edges(trips)
+        for i, node in enumerate(pending):
+            if time.perf_counter() >= deadline:
+                unassigned.extend(pending[i:])
+                break
+            best = self._best_insertion(node, trips, loads, vmin, edges)
+            if best is None:
+                unassigned.append(node)
+                continue
+            cost, t, p = best
+            trips[t].insert(p, node)
+            loads[t] += self.demand[node]
+            vmin[t % n_vehicles] += cost * self.km_to_min + self.service_min
+            edges.update(t)
+        return unassigned
+
+    def _enforce_shift(self, trips, loads, deadline):
+        """Vardiyayı aşan araçların son duraklarını çıkar
+
+        Plan her durumda vardiyaya uymalı; süre dolduysa duraklar tek tek
+        yerine son turlar bütünüyle bırakılır.
+        """
+        if not self.shift_minutes:
+            return []
+        n_vehicles = len(self.vehicles)
+        D = self.D
+        dropped = []
+        for v in range(n_vehicles):
+            vehicle_trips = [t * n_vehicles + v for t in range(self.max_trips)]
+            minutes = sum(self._trip_minutes(trips[t]) for t in vehicle_trips)
+            while minutes > self.shift_minutes + _EPS:
+                last = max((t for t in vehicle_trips if trips[t]), default=None)
+                if last is None:
+                    break
+                route = trips[last]
+                if time.perf_counter() >= deadline:
+                    minutes -= self._trip_minutes(route)
+                    dropped.extend(route)
+                    route.clear()
+                    loads[last] = 0.0
+                    continue
+                node = route.pop()
+                prev = route[-1] if route else 0
+                minutes -= float(D[prev, node] + D[node, 0] - D[prev, 0]) * self.km_to_min + self.service_min
+                loads[last] -= self.demand[node]
+                dropped.append(node)
+        return dropped
+
+    # ---------- ana döngü ----------
+    def _attempt(self, start_angle, rng, deadline):
+        trips, loads, pending = self._construct(start_angle)
+        # Ekleme ve vardiya onarımına süre kalması için ilk iyileştirme sınırlı
+        now = time.perf_counter()
+        construct_deadline = now + max(deadline - now, 0.0) * CONSTRUCT_TIME_SHARE
+        trips = [self._optimize_trip(nodes, construct_deadline) for nodes in trips]
+        pending += self._enforce_shift(trips, loads, deadline)
+        vmin = self._vehicle_minutes(trips)
+        unassigned = self._insert_pending(pending, trips, loads, vmin, deadline)
+
+        while time.perf_counter() < deadline:
+            moved, touched = self._relocate_pass(trips, loads, vmin, rng, deadline)
+            for t in touched:
+                trips[t] = self._optimize_trip(trips[t], deadline)
+            vmin = self._vehicle_minutes(trips)
+            if unassigned:
+                unassigned = self._insert_pending(unassigned, trips, loads, vmin, deadline)
+            if not moved:
+                break
+
+        total_km = sum(self._trip_km(nodes) for nodes in trips)
+        return trips, loads, unassigned, total_km
+
+    def solve(self):
+        """Planı hesapla: zaman sınırı içinde farklı başlangıç açılarıyla yeniden başlat, en iyisini tut"""
+        started = time.perf_counter()
+        deadline = started + self.time_limit
+        rng = np.random.default_rng(self.seed)
+
+        best = None
+        restarts = 0
+        if self.vehicles and self.containers:
+            while restarts < self.max_restarts:
+                start_angle = float(rng.uniform(-np.pi, np.pi))
+                result = self._attempt(start_angle, rng, deadline)
+                restarts += 1
+                score = (len(result[2]), result[3])
+                if best is None or score < best[0]:
+                    best = (score, result)
+                if time.perf_counter() >= deadline:
+                    break
+
+        return self._build_plan(best[1] if best else None, restarts, time.perf_counter() - started)
+
+    def _build_plan(self, result, restarts, elapsed):
+        n_vehicles = len(self.vehicles)
+        routes = []
+        if result is None:
+            trips, loads = [[] for _ in range(n_vehicles * self.max_trips)], np.zeros(n_vehicles * self.max_trips)
+            unassigned = list(range(1, len(self.containers) + 1))
+        else:
+            trips, loads, unassigned, _ = result
+
+        for v, vehicle in enumerate(self.vehicles):
+            vehicle_trips = []
+            for t in range(self.max_trips):
+                nodes = trips[t * n_vehicles + v]
+                if not nodes:
+                    continue
+                km = self._trip_km(nodes)
+                vehicle_trips.append({
+                    'stops': [self.containers[node - 1] for node in nodes],
+                    'load_tons': float(loads[t * n_vehicles + v]),
+                    'distance_km': km,
+                    'time_min': self._trip_minutes(nodes)
+                })
+            if not vehicle_trips:
+                continue
+            capacity = self.capacity[v]
+            routes.append({
+                'vehicle': vehicle,
+                'trips': vehicle_trips,
+                'total_containers': sum(len(t['stops']) for t in vehicle_trips),
+                'total_distance_km': sum(t['distance_km'] for t in vehicle_trips),
+                'total_time_min': sum(t['time_min'] for t in vehicle_trips),
+                'total_load_tons': sum(t['load_tons'] for t in vehicle_trips),
+                'max_trip_load_pct': max(t['load_tons'] for t in vehicle_trips) / capacity * 100 if capacity > 0 else 0
+            })
+
+        return {
+            'routes': routes,
+            'unassigned': [self.containers[node - 1] for node in unassigned],
+            'depot': {'latitude': self.depot[0], 'longitude': self.depot[1]},
+            'total_distance_km': sum(r['total_distance_km'] for r in routes),
+            'total_time_min': sum(r['total_time_min'] for r in routes),
+            'restarts': restarts,
+            'elapsed_s': elapsed,
+            'seed': self.seed
+        }
+
+def solve(vehicles, containers, **options):
+    """Kısa yol: RouteSolver(...).solve()"""
+    return RouteSolver(vehicles, containers, **options).solve()
@@ -0,0 +1,280 @@
+"""
+Yol Rotası Sağlayıcıları
+Eşzamanlı OSRM istemcisi, kalıcı rota önbelleği ve çevrimdışı haversine sağlayıcı
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from route_solver import AVG_SPEED_KMH, ROAD_FACTOR, haversine_km
+
+OSRM_URL = os.environ.get('OSRM_URL', 'http://router.project-osrm.org')
+OSRM_TIMEOUT_S = float(os.environ.get('OSRM_TIMEOUT_S', 10))
+ROUTING_WORKERS = int(os.environ.get('ROUTING_WORKERS', 16))
+# Varsayılan: çalışma dizininden bağımsız, nilufer_waste.db ile aynı dizin
+ROUTE_CACHE_PATH = os.environ.get(
+    'ROUTE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_cache.db')
+)
+ROUTE_CACHE_MAX_AGE_DAYS = 30
+
+ROUTING_SECONDS = metrics.Histogram('routing_request_duration_seconds', 'Rota sağlayıcı çağrı süresi', ['provider'])
+ROUTING_REQUESTS = metrics.Counter('routing_requests_total', 'Rota sağlayıcı çağrıları', ['provider', 'result'])
+ROUTE_CACHE_LOOKUPS = metrics.Counter('routing_cache_lookups_total', 'Kalıcı rota önbelleği aramaları', ['result'])
+ROUTING_FALLBACKS = metrics.Counter('routing_fallbacks_total', 'Yedek sağlayıcıya düşen rotalar', ['provider'])
+
+class RoutingError(Exception):
+    """Sağlayıcı rota üretemedi"""
+
+class RoutingBackend:
+    """Rota sağlayıcı arayüzü
+
+    route() tek bir koordinat dizisi ([[lon, lat], ...]) için
+    {'geometry', 'distance_km', 'duration_min', 'provider'} döndürür,
+    başarısızlıkta RoutingError fırlatır. route_many() aynı sırada liste
+    döndürür; başarısız öğeler için RoutingError nesnesi koyar.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'errors': 0, 'latency_total_s': 0.0, 'latency_max_s': 0.0}
+
+    def route(self, coordinates):
+        raise NotImplementedError
+
+    def route_many(self, coordinate_lists, deadline=None):
+        results = []
+        for coordinates in coordinate_lists:
+            try:
+                results.append(self.route(coordinates))
+            except RoutingError as e:
+                results.append(e)
+        return results
+
+    def _record(self, started, error=False):
+        elapsed = time.perf_counter() - started
+        ROUTING_SECONDS.labels(self.name).observe(elapsed)
+        ROUTING_REQUESTS.labels(self.name, 'error' if error else 'ok').inc()
+        with self._stats_lock:
+            self.stats['calls'] += 1
+            self.stats['errors'] += int(error)
+            self.stats['latency_total_s'] += elapsed
+            self.stats['latency_max_s'] = max(self.stats['latency_max_s'], elapsed)
+
+class HaversineBackend(RoutingBackend):
+    """Çevrimdışı sağlayıcı: düz çizgi geometri, yol çarpanlı mesafe, ortalama hızla süre"""
+
+    name = 'haversine'
+
+    def __init__(self, road_factor=ROAD_FACTOR, speed_kmh=AVG_SPEED_KMH):
+        super().__init__()
+        self.road_factor = road_factor
+        self.speed_kmh = speed_kmh
+
+    def route(self, coordinates):
+        started = time.perf_counter()
+        distance = sum(
+            haversine_km(lat1, lon1, lat2, lon2)
+            for (lon1, lat1), (lon2, lat2) in zip(coordinates, coordinates[1:])
+        ) * self.road_factor
+        self._record(started)
+        return {
+            'geometry': [list(c) for c in coordinates],
+            'distance_km': distance,
+            'duration_min': distance / self.speed_kmh * 60,
+            'provider': self.name
+        }
+
+class OSRMBackend(RoutingBackend):
+    """OSRM HTTP istemcisi: bağlantı havuzlu oturum, iş parçacığı havuzuyla eşzamanlı çağrılar"""
+
+    name = 'osrm'
+
+    def __init__(self, base_url=OSRM_URL, timeout=OSRM_TIMEOUT_S, max_workers=ROUTING_WORKERS):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='osrm')
+
+    def route(self, coordinates):
+        started = time.perf_counter()
+        coords_str = ';'.join(f"{lon},{lat}" for lon, lat in coordinates)
+        url = f"{self.base_url}/route/v1/driving/{coords_str}?overview=full&geometries=geojson"
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RoutingError(f"OSRM HTTP {response.status_code}")
+            data = response.json()
+            if data.get('code') != 'Ok' or not data.get('routes'):
+                raise RoutingError(f"OSRM yanıtı: {data.get('code')}")
+        except RoutingError:
+            self._record(started, error=True)
+            raise
+        except (requests.RequestException, ValueError) as e:
+            self._record(started, error=True)
+            raise RoutingError(str(e)) from e
+
+        self._record(started)
+        route = data['routes'][0]
+        return {
+            'geometry': route['geometry']['coordinates'],
+            'distance_km': route['distance'] / 1000,
+            'duration_min': route['duration'] / 60,
+            'provider': self.name
+        }
+
+    def route_many(self, coordinate_lists, deadline=None):
+        """Tüm rotaları paralel iste; toplam süre en yavaş tek çağrıyla sınırlı"""
+        futures = [self._executor.submit(self.route, coords) for coords in coordinate_lists]
+        remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        wait(futures, timeout=remaining)
+
+        results = []
+        for future in futures:
+            if not future.done():
+                future.cancel()
+                ROUTING_REQUESTS.labels(self.name, 'timeout').inc()
+                results.append(RoutingError('Süre aşıldı'))
+                continue
+            try:
+                results.append(future.result())
+            except RoutingError as e:
+                results.append(e)
+        return results
+
+class RouteCache:
+    """Koordinat dizisine göre anahtarlanan kalıcı rota önbelleği (ayrı SQLite dosyası)"""
+
+    def __init__(self, path=ROUTE_CACHE_PATH, max_age_days=ROUTE_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age_s = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_cache (
+                cache_key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                geometry TEXT NOT NULL,
+                distance_km REAL NOT NULL,
+                duration_min REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def key(provider, coordinates):
+        # 6 ondalık ~10 cm; aynı dizi her zaman aynı anahtarı üretir
+        text = provider + '|' + ';'.join(f"{lon:.6f},{lat:.6f}" for lon, lat in coordinates)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, provider, coordinate_lists):
+        keys = [self.key(provider, coords) for coords in coordinate_lists]
+        found = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key, geometry, distance_km, duration_min, created_at FROM route_cache "
+                "WHERE cache_key IN (SELECT value FROM json_each(?))",
+                (json.dumps(keys),)
+            ).fetchall()
+        now = time.time()
+        for cache_key, geometry, distance_km, duration_min, created_at in rows:
+            if now - created_at <= self.max_age_s:
+                found[cache_key] = {
+                    'geometry': json.loads(geometry),
+                    'distance_km': distance_km,
+                    'duration_min': duration_min,
+                    'provider': provider,
+                    'cached': True
+                }
+        results = [found.get(k) for k in keys]
+        hits = sum(r is not None for r in results)
+        self.stats['hits'] += hits
+        self.stats['misses'] += len(keys) - hits
+        return results
+
+    def put_many(self, provider, coordinate_lists, results):
+        rows = [
+            (self.key(provider, coords), provider, json.dumps(r['geometry']), r['distance_km'], r['duration_min'], time.time())
+            for coords, r in zip(coordinate_lists, results)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO route_cache VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+class CachedBackend(RoutingBackend):
+    """Önbellekte olmayan rotaları iç sağlayıcıdan toplu iste, sonuçları sakla"""
+
+    def __init__(self, inner, cache):
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+
+    def route(self, coordinates):
+        result = self.route_many([coordinates])[0]
+        if isinstance(result, RoutingError):
+            raise result
+        return result
+
+    def route_many(self, coordinate_lists, deadline=None):
+        results = self.cache.get_many(self.inner.name, coordinate_lists)
+        missing = [i for i, r in enumerate(results) if r is None]
+        ROUTE_CACHE_LOOKUPS.labels('hit').inc(len(results) - len(missing))
+        ROUTE_CACHE_LOOKUPS.labels('miss').inc(len(missing))
+        if missing:
+            fetched = self.inner.route_many([coordinate_lists[i] for i in missing], deadline=deadline)
+            ok = [(coordinate_lists[i], r) for i, r in zip(missing, fetched) if not isinstance(r, RoutingError)]
+            self.cache.put_many(self.inner.name, [c for c, _ in ok], [r for _, r in ok])
+            for i, r in zip(missing, fetched):
+                results[i] = r
+        return results
+
+class FallbackBackend(RoutingBackend):
+    """Birincil sağlayıcı başarısız olursa (ya da süre dolarsa) yedek sağlayıcıyı kullan"""
+
+    def __init__(self, primary, fallback):
+        super().__init__()
+        self.primary = primary
+        self.fallback = fallback
+        self.name = primary.name
+
+    def route(self, coordinates):
+        return self.route_many([coordinates])[0]
+
+    def route_many(self, coordinate_lists, deadline=None):
+        results = self.primary.route_many(coordinate_lists, deadline=deadline)
+        for i, r in enumerate(results):
+            if isinstance(r, RoutingError):
+                ROUTING_FALLBACKS.labels(self.fallback.name).inc()
+                results[i] = self.fallback.route(coordinate_lists[i])
+        return results
+
+def create_backend(kind=None, cache_path=ROUTE_CACHE_PATH):
+    """Ortam ayarına göre sağlayıcı zinciri: osrm (önbellekli, haversine yedekli) veya haversine"""
+    kind = kind or os.environ.get('ROUTING_BACKEND', 'osrm')
+    offline = HaversineBackend()
+    if kind == 'haversine':
+        return offline
+    if kind != 'osrm':
+        raise ValueError(f"Bilinmeyen rota sağlayıcı: {kind}")
+    return FallbackBackend(CachedBackend(OSRMBackend(), RouteCache(cache_path)), offline)
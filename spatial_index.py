@@ -0,0 +1,275 @@
+"""
+Konteyner Mekânsal İndeksi
+Bellek içi ızgara (grid) indeksi: en yakın k konteyner ve dikdörtgen alan sorguları
+"""
+
+import heapq
+import math
+import threading
+
+import numpy as np
+
+from route_solver import haversine_km
+
+# ~0.002 derece ≈ 220 m enlem; 100k konteynerlik şehirde hücre başına ~10-15 konteyner
+CELL_SIZE_DEG = 0.002
+KM_PER_DEG_LAT = 111.32
+
+CONTAINER_INDEX_QUERY = """
+    SELECT
+        c.container_id,
+        c.container_type,
+        c.current_fill_level,
+        c.latitude,
+        c.longitude,
+        c.capacity_liters,
+        n.neighborhood_name,
+        c.last_collection_date
+    FROM containers c
+    LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
+    WHERE c.status = 'active'
+    AND c.latitude IS NOT NULL
+    AND c.longitude IS NOT NULL
+"""
+
+class ContainerIndex:
+    """Aktif konteynerler için ızgara tabanlı mekânsal indeks
+
+    Her konteyner (enlem, boylam) hücresine yerleştirilir. Yazmalar
+    upsert/update/remove ile tek konteyner üzerinde artımlı uygulanır;
+    tam yeniden yükleme sadece açılışta yapılır.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE_DEG):
+        self.cell_size = cell_size
+        self._cells = {}      # (row, col) -> set(container_id)
+        self._items = {}      # container_id -> kayıt sözlüğü
+        self._extent = None   # [min_row, max_row, min_col, max_col]; silmede küçülmez (yalnızca üst sınır)
+        self._lock = threading.RLock()
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def load(self, conn):
+        """Veritabanındaki tüm aktif konteynerlerle indeksi baştan kur"""
+        rows = conn.execute(CONTAINER_INDEX_QUERY).fetchall()
+        with self._lock:
+            self._cells.clear()
+            self._items.clear()
+            self._extent = None
+            for row in rows:
+                self._insert(self._row_to_item(row))
+        return len(rows)
+
+    @staticmethod
+    def _row_to_item(row):
+        return {
+            'id': row[0],
+            'type': row[1],
+            'fill_level': float(row[2] or 0),
+            'lat': float(row[3]),
+            'lng': float(row[4]),
+            'capacity': row[5],
+            'neighborhood': row[6],
+            'last_collection': row[7]
+        }
+
+    def _insert(self, item):
+        row, col = cell = self._cell(item['lat'], item['lng'])
+        self._items[item['id']] = item
+        self._cells.setdefault(cell, set()).add(item['id'])
+        if self._extent is None:
+            self._extent = [row, row, col, col]
+        else:
+            extent = self._extent
+            extent[0], extent[1] = min(extent[0], row), max(extent[1], row)
+            extent[2], extent[3] = min(extent[2], col), max(extent[3], col)
+
+    def _discard(self, container_id):
+        item = self._items.pop(container_id, None)
+        if item is None:
+            return None
+        cell = self._cell(item['lat'], item['lng'])
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(container_id)
+            if not members:
+                del self._cells[cell]
+        return item
+
+    def upsert(self, item):
+        """Konteyneri ekle ya da (konumu değişmiş olabilir) yenisiyle değiştir"""
+        with self._lock:
+            self._discard(item['id'])
+            self._insert(dict(item))
+
+    def update(self, container_id, **fields):
+        """Konum dışı alanları yerinde güncelle (ör. fill_level, last_collection)"""
+        with self._lock:
+            item = self._items.get(container_id)
+            if item is None:
+                return False
+            if ('lat' in fields and fields['lat'] != item['lat']) or ('lng' in fields and fields['lng'] != item['lng']):
+                self.upsert({**item, **fields})
+            else:
+                item.update(fields)
+            return True
+
+    def remove(self, container_id):
+        with self._lock:
+            return self._discard(container_id) is not None
+
+    def get(self, container_id):
+        with self._lock:
+            item = self._items.get(container_id)
+            return dict(item) if item else None
+
+    def __len__(self):
+        return len(self._items)
+
+    def nearby(self, lat, lng, k=10, max_km=None):
+        """(lat, lng) noktasına en yakın k konteyner, yakından uzağa, distance_km ile
+
+        Halkalar halinde genişleyen hücre taraması: k aday bulunduğunda ve
+        sonraki halkanın en yakın noktası k'ıncı adaydan uzaksa durur.
+        """
+        if k <= 0:
+            return []
+        row0, col0 = self._cell(lat, lng)
+        # Bir hücrenin km cinsinden en dar kenarı (boylam enleme göre daralır)
+        cell_km = self.cell_size * KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01)
+        best = []   # (-mesafe, id) max-heap
+        with self._lock:
+            if not self._items:
+                return []
+            min_row, max_row, min_col, max_col = self._extent
+            max_ring = max(abs(row0 - min_row), abs(row0 - max_row), abs(col0 - min_col), abs(col0 - max_col))
+            # Halka taraması dolu hücre sayısını aşacaksa (nokta şehrin çok dışında) doğrudan tümünü tara
+            if (2 * max_ring + 1) ** 2 > 4 * len(self._cells):
+                scan_limit = math.isqrt(4 * len(self._cells)) // 2
+            else:
+                scan_limit = max_ring
+            ring = 0
+            while ring <= max_ring:
+                if ring > scan_limit:
+                    best = []
+                    for container_id, item in self._items.items():
+                        self._consider(best, k, haversine_km(lat, lng, item['lat'], item['lng']), container_id, max_km)
+                    break
+                # Bu halkadaki hiçbir nokta (ring - 1) hücreden daha yakın olamaz
+                ring_min_km = max(ring - 1, 0) * cell_km
+                if max_km is not None and ring_min_km > max_km:
+                    break
+                if len(best) >= k and ring_min_km > -best[0][0]:
+                    break
+                for cell in self._ring_cells(row0, col0, ring):
+                    for container_id in self._cells.get(cell, ()):
+                        item = self._items[container_id]
+                        self._consider(best, k, haversine_km(lat, lng, item['lat'], item['lng']), container_id, max_km)
+                ring += 1
+
+            result = []
+            for neg_distance, container_id in sorted(best, key=lambda x: (-x[0], x[1])):
+                item = dict(self._items[container_id])
+                item['distance_km'] = round(-neg_distance, 4)
+                result.append(item)
+        return result
+
+    @staticmethod
+    def _consider(best, k, distance, container_id, max_km):
+        if max_km is not None and distance > max_km:
+            return
+        if len(best) < k:
+            heapq.heappush(best, (-distance, container_id))
+        elif distance < -best[0][0]:
+            heapq.heapreplace(best, (-distance, container_id))
+
+    @staticmethod
+    def _ring_cells(row0, col0, ring):
+        if ring == 0:
+            yield (row0, col0)
+            return
+        for col in range(col0 - ring, col0 + ring + 1):
+            yield (row0 - ring, col)
+            yield (row0 + ring, col)
+        for row in range(row0 - ring + 1, row0 + ring):
+            yield (row, col0 - ring)
+            yield (row, col0 + ring)
+
+    def bbox(self, min_lat, min_lng, max_lat, max_lng, limit=None):
+        """Dikdörtgen içindeki konteynerler (container_id sırasıyla)"""
+        row_lo, col_lo = self._cell(min_lat, min_lng)
+        row_hi, col_hi = self._cell(max_lat, max_lng)
+        with self._lock:
+            n_cells = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+            if n_cells > len(self._cells):
+                # Kutu indeksten büyük: boş hücreleri gezmek yerine dolu hücreleri tara
+                candidates = (
+                    cid for (row, col), members in self._cells.items()
+                    if row_lo <= row <= row_hi and col_lo <= col <= col_hi
+                    for cid in members
+                )
+            else:
+                candidates = (
+                    cid for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1)
+                    for cid in self._cells.get((row, col), ())
+                )
+            found = []
+            for container_id in candidates:
+                item = self._items[container_id]
+                if min_lat <= item['lat'] <= max_lat and min_lng <= item['lng'] <= max_lng:
+                    found.append(item)
+            found.sort(key=lambda item: item['id'])
+            if limit is not None:
+                found = found[:limit]
+            return [dict(item) for item in found]
+
+def nearest_neighbors(lats, lngs, k):
+    """Her nokta için yaklaşık en yakın k noktanın indeksleri (kendisi hariç), (n, k) dizi
+
+    Toplu sorgu: noktalar hücre başına ~k nokta düşecek boyutta bir ızgaraya
+    konur; her hücrenin üyeleri çevresindeki hücrelerin noktalarıyla tek
+    vektörel işlemde karşılaştırılır, aday k'dan azsa halka genişletilir.
+    Hücre kenarındaki noktalarda sonuç yaklaşıktır (rota adayları için yeterli).
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    n = len(lats)
+    k = min(int(k), n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64)
+
+    # Şehir ölçeğinde düzlem yaklaşımı (km)
+    y = lats * KM_PER_DEG_LAT
+    x = lngs * KM_PER_DEG_LAT * math.cos(math.radians(float(lats.mean())))
+    span = max(float(x.max() - x.min()), float(y.max() - y.min()), 1e-6)
+    cell = span * math.sqrt(k / n)
+    cols = np.floor((x - x.min()) / cell).astype(np.int64)
+    rows = np.floor((y - y.min()) / cell).astype(np.int64)
+    width, height = int(cols.max()) + 1, int(rows.max()) + 1
+
+    keys = rows * width + cols
+    order = np.argsort(keys, kind='stable')
+    cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    members = {int(key): order[start:start + count] for key, start, count in zip(cell_keys, starts, counts)}
+
+    result = np.empty((n, k), dtype=np.int64)
+    for key, idx in members.items():
+        row0, col0 = divmod(key, width)
+        ring = 1
+        while True:
+            candidates = np.concatenate([
+                members[row * width + col]
+                for row in range(max(row0 - ring, 0), min(row0 + ring, height - 1) + 1)
+                for col in range(max(col0 - ring, 0), min(col0 + ring, width - 1) + 1)
+                if row * width + col in members
+            ])
+            if len(candidates) > k or ring >= max(width, height):
+                break
+            ring += 1
+        d = (x[idx, None] - x[None, candidates]) ** 2 + (y[idx, None] - y[None, candidates]) ** 2
+        d[idx[:, None] == candidates[None, :]] = np.inf
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        nearest = np.take_along_axis(nearest, np.argsort(np.take_along_axis(d, nearest, axis=1), axis=1), axis=1)
+        result[idx] = candidates[nearest]
+    return result
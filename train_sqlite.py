@@ -3,14 +3,13 @@ Model Eğitimi - SQLite
 """
 
 import sqlite3
-import pandas as pd
-import numpy as np
-from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
-import joblib
-import os
+
+import container_stats
+import feature_pipeline
+import model_registry
 
 DB_PATH = 'nilufer_waste.db'
 
@@ -22,29 +21,9 @@ def train_model():
     
     # Veriyi yükle
     conn = sqlite3.connect(DB_PATH)
-    
-    query = """
-    SELECT 
-        c.container_id,
-        c.container_type,
-        c.capacity_liters,
-        c.last_collection_date,
-        c.current_fill_level,
-        n.population,
-        n.population_density,
-        n.area_km2,
-        COUNT(DISTINCT ce.event_id) as collection_count,
-        AVG(ce.tonnage_collected) as avg_tonnage,
-        AVG(ce.fill_level_before) as avg_fill_before
-    FROM containers c
-    LEFT JOIN neighborhoods n ON c.neighborhood_id = n.neighborhood_id
-    LEFT JOIN collection_events ce ON c.container_id = ce.container_id
-    WHERE c.status = 'active'
-    GROUP BY c.container_id
-    HAVING collection_count > 0
-    """
-    
-    df = pd.read_sql_query(query, conn)
+    container_stats.ensure_stats_schema(conn)
+    conn.commit()
+    df = feature_pipeline.fetch_training_frame(conn)
     conn.close()
     
     print(f"\n📊 {len(df)} konteyner verisi yüklendi")
@@ -53,51 +32,9 @@ def train_model():
         print("\n⚠️ Yeterli veri yok!")
         return False
     
-    # Özellikler oluştur
-    features = []
-    
-    for _, row in df.iterrows():
-        # Zaman özellikleri
-        if row['last_collection_date']:
-            last_date = datetime.fromisoformat(row['last_collection_date'])
-            hours_since = (datetime.now() - last_date).total_seconds() / 3600
-        else:
-            hours_since = 168
-        
-        days_since = hours_since / 24
-        
-        now = datetime.now()
-        day_of_week = now.weekday()
-        is_weekend = int(now.weekday() >= 5)
-        month = now.month
-        season = (month % 12) // 3
-        
-        # Konteyner özellikleri
-        capacity = row['capacity_liters']
-        container_type_map = {'underground': 4, '770lt': 3, '400lt': 2, 'plastic': 1}
-        container_type_encoded = container_type_map.get(row['container_type'], 2)
-        
-        # Nüfus özellikleri
-        population = row['population'] if row['population'] else 10000
-        pop_density = row['population_density'] if row['population_density'] else 5000
-        area = row['area_km2'] if row['area_km2'] else 2.0
-        
-        # Tarihsel
-        avg_tonnage = row['avg_tonnage'] if row['avg_tonnage'] else 0.5
-        avg_fill = row['avg_fill_before'] if row['avg_fill_before'] else 0.5
-        collection_count = row['collection_count']
-        capacity_usage = (avg_tonnage / (capacity / 1000)) if capacity > 0 else 0.5
-        
-        feature_vector = [
-            hours_since, days_since, day_of_week, is_weekend, month, season,
-            capacity, container_type_encoded, population, pop_density, area,
-            avg_tonnage, avg_fill, collection_count, capacity_usage
-        ]
-        
-        features.append(feature_vector)
-    
-    X = np.array(features)
-    y = (df['current_fill_level'] >= 0.75).astype(int).values
+    # Özellikler oluştur (servis ile aynı vektörel hat)
+    X = feature_pipeline.build_feature_matrix(df)
+    y = feature_pipeline.build_labels(df)
     
     print(f"✓ {X.shape[1]} özellik oluşturuldu")
     print(f"\n📊 Sınıf Dağılımı:")
@@ -133,16 +70,11 @@ def train_model():
     print("\n📋 Rapor:")
     print(classification_report(y_test, y_pred_test, target_names=['Dolu Değil', 'Dolu']))
     
-    # Kaydet
-    os.makedirs('models', exist_ok=True)
-    model_data = {
-        'model': model,
-        'version': 'v1.0.0',
-        'trained_at': datetime.now().isoformat()
-    }
-    
-    joblib.dump(model_data, 'models/fill_predictor.pkl')
-    print("\n💾 Model kaydedildi: models/fill_predictor.pkl")
+    # Kaydet: kayıt defterine yeni sürüm (çalışan servis manifest değişikliğini görür)
+    version = model_registry.ModelRegistry().publish(
+        model, metrics={'test_accuracy': test_acc}, source='train_sqlite', validation_X=X_test
+    )
+    print(f"\n💾 Model kaydedildi: {version} (models/{model_registry.MANIFEST_NAME})")
     
     return True
 
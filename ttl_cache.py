@@ -0,0 +1,76 @@
+"""
+Süreli Önbellek
+Dashboard gibi sık okunan toplamlar için yazmalarla geçersizleşen süreli önbellek
+"""
+
+import threading
+import time
+
+class TTLCache:
+    """Anahtar başına süreli (TTL) önbellek
+
+    - Aynı anahtar için eşzamanlı ıskalamalarda hesap yalnızca bir kez yapılır.
+    - Her geçersizleştirme anahtarın nesil sayacını artırır; hesap sürerken
+      gelen bir yazma, bayat sonucun önbelleğe yazılmasını engeller.
+    """
+
+    def __init__(self, default_ttl=5.0):
+        self.default_ttl = default_ttl
+        self._entries = {}        # key -> (expires_at, value)
+        self._generations = {}    # key -> int
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Önbellekte varsa döndür, yoksa `compute()` ile hesaplayıp sakla"""
+        found, value = self._lookup(key)
+        if found:
+            self._stats['hits'] += 1
+            return value
+
+        with self._key_lock(key):
+            # Beklerken başka bir istek hesaplamış olabilir
+            found, value = self._lookup(key)
+            if found:
+                self._stats['hits'] += 1
+                return value
+
+            self._stats['misses'] += 1
+            generation = self._generations.get(key, 0)
+            value = compute()
+
+            with self._lock:
+                if self._generations.get(key, 0) == generation:
+                    self._entries[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+            return value
+
+    def invalidate(self, *keys):
+        """Verilen anahtarları (anahtar verilmezse tümünü) geçersiz kıl"""
+        with self._lock:
+            targets = keys or list(set(self._entries) | set(self._generations))
+            for key in targets:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        total = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'entries': len(self._entries),
+            'hit_rate': round(self._stats['hits'] / total, 4) if total else 0.0
+        }